@@ -11,7 +11,7 @@ from alembic import context
 from app.core.database import Base
 from app.core.config import settings
 # Import models to register them with Base
-from app.models import user, product, order, payment, address, shipment, cart, coupon
+from app.models import user, product, order, payment, address, shipment, cart, coupon, idempotency
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -0,0 +1,36 @@
+"""Add full-text and trigram search indexes on products
+
+Revision ID: 5b7d2e9a1c34
+Revises: 8e2b6f0c4a17
+Create Date: 2026-10-18 11:20:37.518204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b7d2e9a1c34'
+down_revision = '8e2b6f0c4a17'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    # Must match app.models.product.search_document() exactly for queries to use it
+    op.create_index(
+        'ix_products_search', 'products',
+        [sa.text("(setweight(to_tsvector('simple', coalesce(name, '')), 'A') || "
+                 "setweight(to_tsvector('simple', coalesce(description, '')), 'B'))")],
+        unique=False, postgresql_using='gin',
+    )
+    op.create_index(
+        'ix_products_name_trgm', 'products', ['name'],
+        unique=False, postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'},
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_products_name_trgm', table_name='products')
+    op.drop_index('ix_products_search', table_name='products')
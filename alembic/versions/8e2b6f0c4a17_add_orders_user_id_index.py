@@ -0,0 +1,24 @@
+"""Add (user_id, id) index on orders for keyset pagination
+
+Revision ID: 8e2b6f0c4a17
+Revises: 3c9a1e5d7b20
+Create Date: 2026-10-18 10:05:12.904117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8e2b6f0c4a17'
+down_revision = '3c9a1e5d7b20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_orders_user_id_id', 'orders', ['user_id', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_orders_user_id_id', table_name='orders')
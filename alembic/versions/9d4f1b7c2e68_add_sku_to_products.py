@@ -0,0 +1,27 @@
+"""Add sku to products
+
+Revision ID: 9d4f1b7c2e68
+Revises: 5b7d2e9a1c34
+Create Date: 2026-10-18 14:05:12.384917
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d4f1b7c2e68'
+down_revision = '5b7d2e9a1c34'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('products', sa.Column('sku', sa.String(length=64), nullable=True))
+    # Unique: the conflict target of catalog import upserts (NULLs do not collide)
+    op.create_index(op.f('ix_products_sku'), 'products', ['sku'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_products_sku'), table_name='products')
+    op.drop_column('products', 'sku')
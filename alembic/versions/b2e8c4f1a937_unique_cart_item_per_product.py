@@ -0,0 +1,39 @@
+"""Unique (cart_id, product_id) on cart_items
+
+Revision ID: b2e8c4f1a937
+Revises: 9d4f1b7c2e68
+Create Date: 2026-10-18 16:20:41.118305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b2e8c4f1a937'
+down_revision = '9d4f1b7c2e68'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Concurrent adds could create several lines for one product: merge them into the oldest first
+    op.execute("""
+        UPDATE cart_items SET quantity = (
+            SELECT SUM(other.quantity) FROM cart_items AS other
+            WHERE other.cart_id = cart_items.cart_id AND other.product_id = cart_items.product_id
+        )
+        WHERE id IN (
+            SELECT MIN(id) FROM cart_items GROUP BY cart_id, product_id HAVING COUNT(*) > 1
+        )
+    """)
+    op.execute("""
+        DELETE FROM cart_items WHERE id NOT IN (
+            SELECT MIN(id) FROM cart_items GROUP BY cart_id, product_id
+        )
+    """)
+    op.create_index('ix_cart_items_cart_id_product_id', 'cart_items', ['cart_id', 'product_id'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_cart_items_cart_id_product_id', table_name='cart_items')
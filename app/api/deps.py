@@ -8,36 +8,53 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.core import security
 from app.core.config import settings
 from app.core.database import get_db
+from app.core.principals import claims_are_current, get_principal, is_revoked
 from app.models.user import User
 from app.repositories.user_repo import UserRepository
 from app.schemas.user import TokenData
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/login")
 
-async def get_current_user(
-    db: AsyncSession = Depends(get_db),
-    token: str = Depends(oauth2_scheme)
-) -> User:
-    credentials_exception = HTTPException(
+def credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+async def get_token_payload(token: str = Depends(oauth2_scheme)) -> dict:
+    """Verified payload of the bearer token: 401 when invalid, expired or revoked."""
     try:
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
-        )
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
-        token_data = TokenData(email=email)
+        payload = security.verified_tokens.decode(token)
+        token_data = TokenData(email=payload.get("sub"))
     except (JWTError, ValidationError):
-        raise credentials_exception
-    
+        raise credentials_exception()
+    if token_data.email is None or await is_revoked(payload):
+        raise credentials_exception()
+    return payload
+
+async def get_current_user(
+    db: AsyncSession = Depends(get_db),
+    payload: dict = Depends(get_token_payload)
+) -> User:
+    """
+    The user a bearer token stands for. Tokens carrying principal claims are
+    served from the token and the principals cache without a query while
+    revocation is on (see app/core/principals.py); otherwise, and for older
+    tokens, the user row is read.
+    """
+    if claims_are_current():
+        user = await get_principal(payload)
+        if user is not None:
+            return user
+
     user_repo = UserRepository(db)
-    user = await user_repo.get_by_email(email=token_data.email)
+    if payload.get("uid") is not None:
+        user = await user_repo.get(payload["uid"])
+    else:
+        user = await user_repo.get_by_email(email=payload["sub"])
     if user is None:
-        raise credentials_exception
+        raise credentials_exception()
     return user
 
 async def get_current_active_user(
@@ -3,7 +3,7 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from app.api import deps
-from app.core.database import get_db
+from app.core.database import get_db, get_read_db
 from app.models.address import Address
 from app.models.user import User
 from app.schemas.address import AddressCreate, AddressUpdate, AddressResponse
@@ -47,7 +47,7 @@ async def create_address(
 async def read_addresses(
     skip: int = 0,
     limit: int = 100,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(deps.get_current_active_user)
 ):
     """
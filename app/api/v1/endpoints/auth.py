@@ -30,3 +30,10 @@ async def login(
     from app.schemas.user import UserLogin
     user_login = UserLogin(email=form_data.username, password=form_data.password)
     return await auth_service.authenticate_user(user_login)
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(
+    token_payload: dict = Depends(deps.get_token_payload)
+):
+    """Revoke the bearer token (no effect with TOKEN_REVOCATION disabled: it lives until it expires)."""
+    AuthService.logout(token_payload)
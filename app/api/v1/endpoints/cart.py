@@ -1,20 +1,34 @@
-from fastapi import APIRouter, Depends, status
+from typing import Literal
+from fastapi import APIRouter, Depends, Query, status
 from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
 from app.core.database import get_db
 from app.api.deps import get_current_user
 from app.models.user import User
-from app.schemas.cart import Cart, CartItemCreate
+from app.schemas.cart import Cart, CartDelta, CartItemCreate, CartLine
 from app.repositories.cart_repo import CartRepository
 from app.repositories.product_repo import ProductRepository
-from app.services.cart_service import CartService
+from app.services.cart_service import CartService, MemoryCartService
 
 router = APIRouter()
 
 def get_cart_service(db: AsyncSession = Depends(get_db)):
     cart_repo = CartRepository(db)
     product_repo = ProductRepository(db)
+    if settings.CART_ENGINE == "memory":
+        # Same operations; responses are pre-encoded JSON
+        return MemoryCartService(product_repo)
     return CartService(cart_repo, product_repo)
 
+# Response of cart mutations: the whole cart, or only the changed line and the totals
+CartView = Literal["cart", "delta"]
+VIEW_QUERY = Query("cart", description="delta: return only the changed line and the cart totals")
+
+async def _mutation_response(service: CartService, user_id: int, line: CartLine, view: CartView):
+    if view == "delta":
+        return CartDelta(item=line, totals=await service.get_totals(user_id))
+    return await service.get_my_cart(user_id)
+
 @router.get("/", response_model=Cart)
 async def get_my_cart(
     current_user: User = Depends(get_current_user),
@@ -22,15 +36,15 @@ async def get_my_cart(
 ):
     return await service.get_my_cart(current_user.id)
 
-@router.post("/items", response_model=Cart) # Returning full cart is easier for frontend
+@router.post("/items", response_model=Cart | CartDelta) # Returning full cart is easier for frontend
 async def add_item_to_cart(
     item_in: CartItemCreate,
+    view: CartView = VIEW_QUERY,
     current_user: User = Depends(get_current_user),
     service: CartService = Depends(get_cart_service)
 ):
-    user_id = current_user.id
-    await service.add_item(user_id, item_in)
-    return await service.get_my_cart(user_id)
+    line = await service.add_item(current_user.id, item_in)
+    return await _mutation_response(service, current_user.id, line, view)
 
 @router.delete("/items/{item_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def remove_item_from_cart(
@@ -40,14 +54,16 @@ async def remove_item_from_cart(
 ):
     await service.remove_item(current_user.id, item_id)
 
-@router.put("/items/{item_id}", response_model=Cart)
+@router.put("/items/{item_id}", response_model=Cart | CartDelta)
 async def update_cart_item_quantity(
     item_id: int,
     quantity: int,
+    view: CartView = VIEW_QUERY,
     current_user: User = Depends(get_current_user),
     service: CartService = Depends(get_cart_service)
 ):
-    return await service.update_item_quantity(current_user.id, item_id, quantity)
+    line = await service.update_item_quantity(current_user.id, item_id, quantity)
+    return await _mutation_response(service, current_user.id, line, view)
 
 @router.delete("/", status_code=status.HTTP_204_NO_CONTENT)
 async def clear_cart(
@@ -1,10 +1,11 @@
 from typing import List
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.core.database import get_db
+from app.core.database import get_db, get_read_db
+from app.core.pagination import NEXT_CURSOR_HEADER
 from app.api.deps import get_current_user
 from app.models.user import User
-from app.schemas.order import Order
+from app.schemas.order import Order, OrderSummary
 from app.repositories.order_repo import OrderRepository
 from app.repositories.cart_repo import CartRepository
 from app.repositories.product_repo import ProductRepository
@@ -22,6 +23,9 @@ def get_order_service(db: AsyncSession = Depends(get_db)):
     product_repo = ProductRepository(db)
     return OrderService(order_repo, cart_repo, product_repo)
 
+def get_order_read_service(db: AsyncSession = Depends(get_read_db)):
+    return get_order_service(db)
+
 from pydantic import BaseModel
 
 class CheckoutRequest(BaseModel):
@@ -31,11 +35,19 @@ class CheckoutRequest(BaseModel):
 @router.post("/checkout", response_model=Order)
 async def checkout(
     request: CheckoutRequest,
+    idempotency_key: str | None = Header(default=None),
     current_user: User = Depends(get_current_user),
     service: OrderService = Depends(get_order_service)
 ):
     try:
         logger.info(f"CHECKOUT: Starting for user_id={current_user.id}")
+        if idempotency_key is not None:
+            # Retries with the same key get the original order back, untouched
+            body, replayed = await service.checkout_idempotent(
+                current_user.id, idempotency_key, request.shipping_address_id, request.coupon_code
+            )
+            headers = {"Idempotent-Replayed": "true"} if replayed else {}
+            return Response(content=body, media_type="application/json", headers=headers)
         result = await service.checkout(current_user.id, request.shipping_address_id, request.coupon_code)
         logger.info(f"CHECKOUT: Success! Order id={result.id}")
         return result
@@ -48,16 +60,43 @@ async def checkout(
 
 @router.get("/", response_model=List[Order])
 async def get_my_orders(
+    response: Response,
+    limit: int = Query(default=20, ge=1, le=100),
+    after: str | None = None,
     current_user: User = Depends(get_current_user),
-    service: OrderService = Depends(get_order_service)
+    service: OrderService = Depends(get_order_read_service)
+):
+    """
+    The user's orders, newest first, one page at a time. Pass the
+    X-Next-Cursor header of a page as ``after`` to get the next one.
+    """
+    orders, next_cursor = await service.get_my_orders(current_user.id, limit, after)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return orders
+
+@router.get("/summary", response_model=List[OrderSummary])
+async def get_my_order_summaries(
+    response: Response,
+    limit: int = Query(default=20, ge=1, le=100),
+    after: str | None = None,
+    current_user: User = Depends(get_current_user),
+    service: OrderService = Depends(get_order_read_service)
 ):
-    return await service.get_my_orders(current_user.id)
+    """
+    Order history list: totals, status, item count and a thumbnail per order,
+    from a single query. Paginated like GET /orders/.
+    """
+    summaries, next_cursor = await service.get_my_order_summaries(current_user.id, limit, after)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return summaries
 
 @router.get("/{order_id}", response_model=Order)
 async def get_order(
     order_id: int,
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     order_repo = OrderRepository(db)
     order = await order_repo.get_order(order_id)
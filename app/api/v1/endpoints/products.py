@@ -1,35 +1,92 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import List, Literal
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.api import deps
-from app.core.database import get_db
+from app.core.database import get_db, get_read_db
 from app.repositories.product_repo import ProductRepository
-from app.services.product_service import ProductService
-from app.schemas.product import ProductCreate, ProductResponse, ProductUpdate, CategoryCreate, CategoryResponse
+from app.services.product_service import MAX_BATCH_IDS, MAX_BULK_UPDATE_ITEMS, ProductService
+from app.services.product_import_service import ImportFormat, ProductImportService
+from app.schemas.product import ProductCreate, ProductResponse, ProductUpdate, CategoryCreate, CategoryResponse, Suggestion, ProductFacets, ProductBatchItem, ProductImportReport, ProductBulkUpdateItem, ProductBulkUpdateResult
 from app.models.user import User
+import logging
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 
-@router.get("/", response_model=List[ProductResponse])
+@router.get("/", response_model=List[ProductResponse] | List[ProductBatchItem])
 async def read_products(
     skip: int = 0, limit: int = 100,
+    ids: str | None = Query(None, description=f"Comma-separated product ids (at most {MAX_BATCH_IDS})"),
     search: str | None = None,
     category_id: int | None = None,
-    db: AsyncSession = Depends(get_db)
+    after: str | None = None,
+    min_price: float | None = Query(None, ge=0),
+    max_price: float | None = Query(None, ge=0),
+    in_stock: bool = False,
+    is_active: bool | None = None,
+    sort: Literal["price_asc", "price_desc", "newest"] | None = None,
+    if_none_match: str | None = Header(default=None),
+    db: AsyncSession = Depends(get_read_db)
 ):
+    """
+    List products by id (by relevance when searching, or by ``sort``). Pass the
+    X-Next-Cursor header of a page as ``after`` to get the next one (constant
+    cost at any depth, unlike ``skip``). The price range is [min_price, max_price).
+
+    With ``ids``, returns exactly those products in the order asked, as
+    ProductBatchItem with ``found: false`` for unknown ids; the other
+    parameters are ignored.
+    """
     repo = ProductRepository(db)
     service = ProductService(repo)
-    return await service.get_all_products(skip=skip, limit=limit, search=search, category_id=category_id)
+    if ids is not None:
+        try:
+            product_ids = [int(part) for part in ids.split(",") if part.strip()]
+        except ValueError:
+            raise HTTPException(status_code=400, detail="ids must be comma-separated integers")
+        if not product_ids or len(product_ids) > MAX_BATCH_IDS:
+            raise HTTPException(status_code=400, detail=f"Between 1 and {MAX_BATCH_IDS} ids are allowed")
+        cached = await service.get_products_batch(product_ids)
+        return cached.to_response(if_none_match)
+    # Cached, pre-encoded JSON is returned as-is (no ORM / Pydantic work on a hit)
+    cached = await service.get_all_products(
+        skip=skip, limit=limit, search=search, category_id=category_id, after=after,
+        min_price=min_price, max_price=max_price, in_stock=in_stock, is_active=is_active, sort=sort
+    )
+    return cached.to_response(if_none_match)
+
+@router.get("/facets", response_model=ProductFacets)
+async def read_product_facets(
+    search: str | None = None,
+    category_id: int | None = None,
+    min_price: float | None = Query(None, ge=0),
+    max_price: float | None = Query(None, ge=0),
+    in_stock: bool = False,
+    is_active: bool | None = None,
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Facet counts for the listing with the same filters: products per category
+    and per price bucket. Each facet ignores its own filter.
+    """
+    service = ProductService(ProductRepository(db))
+    return await service.get_facets(
+        search=search, category_id=category_id, min_price=min_price, max_price=max_price,
+        in_stock=in_stock, is_active=is_active
+    )
 
 # Categories MUST come BEFORE /{product_id} so FastAPI matches them first
 @router.get("/categories", response_model=List[CategoryResponse])
 async def read_categories(
-    skip: int = 0, limit: int = 100, db: AsyncSession = Depends(get_db)
+    skip: int = 0, limit: int = 100,
+    if_none_match: str | None = Header(default=None),
+    db: AsyncSession = Depends(get_read_db)
 ):
     repo = ProductRepository(db)
     service = ProductService(repo)
-    return await service.get_categories(skip=skip, limit=limit)
+    cached = await service.get_categories(skip=skip, limit=limit)
+    return cached.to_response(if_none_match)
 
 @router.post("/categories", response_model=CategoryResponse)
 async def create_category(
@@ -41,17 +98,65 @@ async def create_category(
     service = ProductService(repo)
     return await service.create_category(category_in)
 
+@router.post("/import", response_model=ProductImportReport)
+async def import_products(
+    request: Request,
+    format: ImportFormat | None = None,
+    current_user: User = Depends(deps.get_current_active_superuser)
+):
+    """
+    Bulk upsert by SKU from the raw request body: NDJSON (one product per line)
+    or CSV with a header row. ``format`` defaults from the Content-Type
+    (``text/csv`` is CSV, anything else NDJSON). The body is streamed and
+    written in chunks; invalid rows are skipped and listed in the report.
+    """
+    if format is None:
+        format = "csv" if request.headers.get("content-type", "").startswith("text/csv") else "ndjson"
+
+    def log_progress(report: ProductImportReport):
+        logger.info(f"Product import progress: {report.processed} rows read, {report.failed} failed")
+
+    return await ProductImportService().import_stream(request.stream(), format, on_progress=log_progress)
+
+@router.patch("/bulk", response_model=ProductBulkUpdateResult)
+async def bulk_update_products(
+    items: List[ProductBulkUpdateItem],
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(deps.get_current_active_superuser)
+):
+    """
+    Change price, stock (absolute ``stock_quantity`` or relative ``stock_delta``)
+    and ``is_active`` of many products in one statement. Unknown ids are listed
+    in ``not_found``; the others are updated even then.
+    """
+    if not items or len(items) > MAX_BULK_UPDATE_ITEMS:
+        raise HTTPException(status_code=400, detail=f"Between 1 and {MAX_BULK_UPDATE_ITEMS} items are allowed")
+    if len({item.id for item in items}) != len(items):
+        raise HTTPException(status_code=400, detail="Each product id may appear only once")
+    service = ProductService(ProductRepository(db))
+    return await service.bulk_update(items)
+
+@router.get("/suggest", response_model=List[Suggestion])
+async def suggest_products(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(8, ge=1, le=20)
+):
+    """Search-as-you-type: product and category names with a word starting with ``q``."""
+    return ProductService.suggest(q, limit)
+
 # Dynamic path param routes AFTER static paths
 @router.get("/{product_id}", response_model=ProductResponse)
 async def read_product(
-    product_id: int, db: AsyncSession = Depends(get_db)
+    product_id: int,
+    if_none_match: str | None = Header(default=None),
+    db: AsyncSession = Depends(get_read_db)
 ):
     repo = ProductRepository(db)
     service = ProductService(repo)
-    product = await service.get_product(product_id)
-    if not product:
+    cached = await service.get_product(product_id)
+    if not cached:
         raise HTTPException(status_code=404, detail="Product not found")
-    return product
+    return cached.to_response(if_none_match)
 
 @router.post("/", response_model=ProductResponse)
 async def create_product(
@@ -2,7 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from app.api import deps
-from app.core.database import get_db
+from app.core.database import get_db, get_read_db
 from app.models.user import User
 from app.models.order import Order, OrderStatus
 from app.services.shipping_service import ShippingService
@@ -69,7 +69,7 @@ async def update_shipment_status(
 @router.get("/shipments/order/{order_id}", response_model=ShipmentResponse)
 async def get_order_shipment(
     order_id: int,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(deps.get_current_active_user)
 ):
     """
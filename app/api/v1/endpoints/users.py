@@ -1,7 +1,11 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.api import deps
 from app.schemas.user import UserResponse
 from app.models.user import User
+from app.core.database import get_db
+from app.repositories.user_repo import UserRepository
+from app.services.auth_service import AuthService
 
 router = APIRouter()
 
@@ -10,3 +14,27 @@ async def read_users_me(
     current_user: User = Depends(deps.get_current_active_user),
 ):
     return current_user
+
+async def _set_active(user_id: int, is_active: bool, db: AsyncSession) -> User:
+    user = await AuthService(UserRepository(db)).set_user_active(user_id, is_active)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    return user
+
+@router.post("/{user_id}/deactivate", response_model=UserResponse)
+async def deactivate_user(
+    user_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(deps.get_current_active_superuser),
+):
+    """Deactivate a user and revoke their tokens."""
+    return await _set_active(user_id, False, db)
+
+@router.post("/{user_id}/activate", response_model=UserResponse)
+async def activate_user(
+    user_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(deps.get_current_active_superuser),
+):
+    """Reactivate a user (their existing tokens are revoked: they log in again)."""
+    return await _set_active(user_id, True, db)
@@ -1,105 +1,352 @@
 """
-Centralized in-memory cache manager using cachetools.
+Centralized cache manager with pluggable storage backends.
 
 Provides TTL-based caching for frequently accessed, rarely-changing data
-like products and categories. Each cache is a separate TTLCache instance
-with configurable maxsize and TTL.
+like products and categories. Each namespace has its own size budget, TTL
+and eviction policy (``DEFAULT_NAMESPACES``, overridable per deployment via
+``settings.CACHE_NAMESPACES``); storage is delegated to a backend (see app/core/cache_backends.py) chosen
+by ``settings.CACHE_BACKEND`` - per-process memory by default, or a store
+shared by every worker.
 
 Usage:
     from app.core.cache import cache_manager
 
-    # Get from cache or None
+    # Get from cache or None (aget / aget_many in async code keep a shared
+    # backend's I/O off the event loop)
     data = cache_manager.get("products", cache_key)
+    data = await cache_manager.aget("products", cache_key)
+
+    # Several keys in one backend pass ({key: value} for the hits)
+    found = await cache_manager.aget_many("products", [key_1, key_2])
 
     # Set in cache
     cache_manager.set("products", cache_key, data)
 
+    # Get, or load once on a miss (concurrent misses share the load)
+    data = await cache_manager.get_or_load("products", cache_key, load_products)
+
     # Invalidate a specific namespace (e.g. on product update)
     cache_manager.invalidate("products")
+
+    # Or only the entries tagged with what changed
+    cache_manager.set("products", cache_key, data, tags={"product:42"})
+    cache_manager.invalidate_tags("product:42")
+
+    # Declare a namespace at runtime (budget in bytes of serialized entries)
+    cache_manager.register_namespace("principals", CacheNamespaceConfig(ttl=60, maxsize=4 * 1024 * 1024))
+
+Hot read endpoints store a ``CachedResponse`` (pre-encoded JSON bytes plus
+an ETag) rather than ORM objects, so a cache hit skips both the database and
+Pydantic serialization:
+
+    cached = CachedResponse.from_json(adapter.dump_json(data))
+    cache_manager.set("product_detail", key, cached)
+    return cached.to_response(if_none_match)
 """
 
-from cachetools import TTLCache
-import threading
+from typing import Any, Awaitable, Callable, Iterable, MutableSet, NamedTuple
+from fastapi import Response
+from app.core.cache_backends import CacheBackend, MemoryBackend, create_backend
+from app.core.config import CacheNamespaceConfig, settings
+from app.core.metrics import metrics
+import asyncio
+import hashlib
+import math
+import pickle
+import random
+import sys
+import time
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+class CachedResponse:
+    """Immutable, pre-serialized JSON response body with its ETag and extra headers."""
+
+    __slots__ = ("body", "etag", "headers")
+
+    def __init__(self, body: bytes, etag: str, headers: dict[str, str] | None = None):
+        self.body = body
+        self.etag = etag
+        self.headers = headers
+
+    @classmethod
+    def from_json(cls, body: bytes, headers: dict[str, str] | None = None) -> "CachedResponse":
+        """Wrap encoded JSON bytes, deriving a strong ETag from the content."""
+        digest = hashlib.blake2b(body, digest_size=16).hexdigest()
+        return cls(body, f'"{digest}"', headers)
+
+    def to_response(self, if_none_match: str | None = None) -> Response:
+        """Build the HTTP response, answering 304 when the client copy is current."""
+        headers = {"ETag": self.etag, **(self.headers or {})}
+        if if_none_match and self.etag in (tag.strip() for tag in if_none_match.split(",")):
+            return Response(status_code=304, headers=headers)
+        return Response(content=self.body, media_type="application/json", headers=headers)
+
+
+# Per-namespace cache metrics (exported on /metrics)
+cache_hits = metrics.counter("cache_hits_total", "Cache lookups served from cache", ["namespace"])
+cache_misses = metrics.counter("cache_misses_total", "Cache lookups that missed", ["namespace"])
+cache_sets = metrics.counter("cache_sets_total", "Values written to the cache", ["namespace"])
+cache_evictions = metrics.counter(
+    "cache_evictions_total", "Entries dropped for capacity or age", ["namespace", "reason"]
+)
+cache_invalidations = metrics.counter(
+    "cache_invalidations_total", "Explicit invalidations (namespace, key or tag)", ["namespace", "kind"]
+)
+cache_load_seconds = metrics.histogram(
+    "cache_load_seconds", "Time spent in get_or_load loaders on a miss or early refresh", ["namespace"]
+)
+
+
+class CacheEntry(NamedTuple):
+    """Envelope stored in the backend: the value plus refresh bookkeeping."""
+    value: Any
+    expires_at: float   # Wall-clock expiry (shared backends compare across processes)
+    delta: float        # Seconds the loader took to produce the value
+
+
+# Built-in namespaces. Budgets are in bytes: a page of 100 products weighs
+# far more than a single product, so counting entries would either starve
+# the detail cache or let listings grow unbounded.
+DEFAULT_NAMESPACES = {
+    "products_list": CacheNamespaceConfig(ttl=300, maxsize=32 * 1024 * 1024),
+    "product_detail": CacheNamespaceConfig(ttl=300, maxsize=16 * 1024 * 1024),
+    "categories": CacheNamespaceConfig(ttl=1800, maxsize=1024 * 1024),
+    # Auth (app/core/principals.py). Revocations must outlive the tokens they revoke, and
+    # are counted rather than weighed so the budget is explicit: evicting one re-admits a token.
+    "principals": CacheNamespaceConfig(ttl=settings.PRINCIPAL_CACHE_TTL, maxsize=4 * 1024 * 1024),
+    "token_revocations": CacheNamespaceConfig(
+        ttl=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60, maxsize=1_000_000, weigher="count"
+    ),
+}
+
+# Rough per-entry bookkeeping (envelope, key, dict slot) added to each weight
+ENTRY_OVERHEAD = 200
+
+
+def weigh_entry(entry: CacheEntry) -> int:
+    """Approximate memory held by a cached entry, in bytes."""
+    value = entry.value
+    if isinstance(value, CachedResponse):
+        return len(value.body) + len(value.etag) + ENTRY_OVERHEAD
+    try:
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)) + ENTRY_OVERHEAD
+    except Exception:
+        return sys.getsizeof(value) + ENTRY_OVERHEAD
+
+
 class CacheManager:
-    """Thread-safe in-memory cache manager with namespaced TTL caches."""
+    """Namespaced TTL cache facade over a pluggable storage backend."""
 
-    def __init__(self):
-        self._lock = threading.Lock()
-        self._caches: dict[str, TTLCache] = {}
+    def __init__(
+        self,
+        backend: CacheBackend | None = None,
+        early_refresh_beta: float = 1.0,
+        namespaces: dict[str, CacheNamespaceConfig] | None = None,
+    ):
+        self.backend = backend or MemoryBackend()
+        self.early_refresh_beta = early_refresh_beta
 
-        # Define cache configurations: namespace -> (maxsize, ttl_seconds)
-        self._configs = {
-            "products_list": (128, 300),    # 128 entries, 5 min TTL
-            "product_detail": (256, 300),   # 256 entries, 5 min TTL
-            "categories": (1, 1800),        # 1 entry, 30 min TTL
-        }
+        # In-flight loads for get_or_load: (namespace, key) -> Future
+        self._inflight: dict[tuple[str, str], asyncio.Future] = {}
+
+        # namespace -> CacheNamespaceConfig
+        self._configs: dict[str, CacheNamespaceConfig] = {}
+        # Per-namespace overrides (CACHE_NAMESPACES), applied field by field to every registration
+        self._overrides = dict(namespaces or {})
 
         # Initialize caches
-        for name, (maxsize, ttl) in self._configs.items():
-            self._caches[name] = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.backend.on_evict = lambda namespace, reason, count: cache_evictions.inc(
+            namespace, reason, amount=count
+        )
+        for name in {**DEFAULT_NAMESPACES, **self._overrides}:
+            self.register_namespace(name, DEFAULT_NAMESPACES.get(name, CacheNamespaceConfig()))
+
+    def register_namespace(self, namespace: str, config: CacheNamespaceConfig):
+        """
+        Declare a namespace, or replace the sizing of an existing one. Only
+        the fields an override sets replace those of ``config``. Resizing
+        drops the namespace's current entries.
+        """
+        override = self._overrides.get(namespace)
+        if override is not None:
+            config = config.model_copy(update=override.model_dump(exclude_unset=True))
+        self._configs[namespace] = config
+        getsizeof = weigh_entry if config.weigher == "bytes" else None
+        self.backend.configure(namespace, config, getsizeof)
+        logger.info(
+            f"CACHE NAMESPACE: {namespace} (maxsize={config.maxsize} {config.weigher}, "
+            f"ttl={config.ttl}s, {config.policy})"
+        )
 
     def get(self, namespace: str, key: str):
         """Get a value from cache. Returns None on miss."""
-        cache = self._caches.get(namespace)
-        if cache is None:
+        return self._hit(namespace, key, self.backend.get(namespace, key))
+
+    async def aget(self, namespace: str, key: str):
+        """``get`` for async code: a shared backend does its I/O off the event loop."""
+        return self._hit(namespace, key, await self.backend.aget(namespace, key))
+
+    def _hit(self, namespace: str, key: str, entry: CacheEntry | None):
+        if entry is None:
+            cache_misses.inc(namespace)
             return None
-        with self._lock:
-            value = cache.get(key)
-            if value is not None:
-                logger.debug(f"CACHE HIT: {namespace}:{key}")
-            return value
+        cache_hits.inc(namespace)
+        logger.debug(f"CACHE HIT: {namespace}:{key}")
+        return entry.value
 
-    def set(self, namespace: str, key: str, value):
-        """Set a value in cache."""
-        cache = self._caches.get(namespace)
-        if cache is None:
+    def get_many(self, namespace: str, keys: Iterable[str]) -> dict[str, Any]:
+        """Get several values in one backend pass. Returns {key: value} for the hits only."""
+        keys = list(keys)
+        return self._hits(namespace, keys, self.backend.get_many(namespace, keys))
+
+    async def aget_many(self, namespace: str, keys: Iterable[str]) -> dict[str, Any]:
+        """``get_many`` for async code."""
+        keys = list(keys)
+        return self._hits(namespace, keys, await self.backend.aget_many(namespace, keys))
+
+    def _hits(self, namespace: str, keys: list[str], entries: dict[str, CacheEntry]) -> dict[str, Any]:
+        if entries:
+            cache_hits.inc(namespace, amount=len(entries))
+        if len(keys) > len(entries):
+            cache_misses.inc(namespace, amount=len(keys) - len(entries))
+        return {key: entry.value for key, entry in entries.items()}
+
+    def set(self, namespace: str, key: str, value, delta: float = 0.0, tags: Iterable[str] = ()):
+        """Set a value in cache, optionally tagged for invalidate_tags()."""
+        config = self._configs.get(namespace)
+        if config is None:
             return
-        with self._lock:
-            cache[key] = value
-            logger.debug(f"CACHE SET: {namespace}:{key}")
+        self.backend.set(namespace, key, CacheEntry(value, time.time() + config.ttl, delta), tags)
+        cache_sets.inc(namespace)
+        logger.debug(f"CACHE SET: {namespace}:{key}")
+
+    def _should_refresh_early(self, entry: CacheEntry) -> bool:
+        """
+        Probabilistic early expiration (XFetch): the closer an entry is to
+        expiry, and the slower it was to load, the more likely a request is
+        to refresh it ahead of time. Refreshes of hot keys are thereby spread
+        out instead of all landing on the instant the TTL runs out.
+        """
+        if self.early_refresh_beta <= 0 or entry.delta <= 0:
+            return False
+        jitter = -entry.delta * self.early_refresh_beta * math.log(1.0 - random.random())
+        return time.time() + jitter >= entry.expires_at
+
+    async def get_or_load(
+        self,
+        namespace: str,
+        key: str,
+        loader: Callable[[], Awaitable[Any]],
+        tags: MutableSet[str] | None = None,
+    ):
+        """
+        Return the cached value, or load it with single-flight protection.
+
+        Concurrent misses for the same key wait on one ``loader()`` call
+        instead of each querying the database. When an entry is picked for
+        early refresh, only the request that wins runs the loader; everyone
+        else keeps getting the current value until it is replaced. A loader
+        returning None is not cached. If the request running the loader is
+        cancelled, one of the waiters runs its own loader in its place.
+
+        ``tags`` is read after the loader returns, so the loader may add the
+        tags it discovers (e.g. the ids of the products it loaded).
+        """
+        entry = await self.backend.aget(namespace, key)
+        if entry is not None and not self._should_refresh_early(entry):
+            cache_hits.inc(namespace)
+            logger.debug(f"CACHE HIT: {namespace}:{key}")
+            return entry.value
+        # An early refresh still serves a cached value, so it counts as a hit
+        (cache_hits if entry is not None else cache_misses).inc(namespace)
+
+        flight_key = (namespace, key)
+        while (inflight := self._inflight.get(flight_key)) is not None:
+            if entry is not None:
+                return entry.value
+            logger.debug(f"CACHE WAIT: {namespace}:{key}")
+            try:
+                return await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                # The leader was cancelled (e.g. its client went away), not this request:
+                # wait for, or become, the next leader instead of failing too
+                if not inflight.cancelled() or asyncio.current_task().cancelling():
+                    raise
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[flight_key] = future
+        try:
+            start = time.perf_counter()
+            value = await loader()
+            delta = time.perf_counter() - start
+            cache_load_seconds.observe(namespace, value=delta)
+            if value is not None:
+                self.set(namespace, key, value, delta=delta, tags=tags or ())
+            future.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as exc:
+            future.set_exception(exc)
+            future.exception()  # Mark retrieved: there may be no waiters
+            raise
+        finally:
+            del self._inflight[flight_key]
 
     def invalidate(self, namespace: str):
         """Clear all entries in a namespace."""
-        cache = self._caches.get(namespace)
-        if cache is None:
-            return
-        with self._lock:
-            cache.clear()
-            logger.info(f"CACHE INVALIDATED: {namespace}")
+        self.backend.clear(namespace)
+        cache_invalidations.inc(namespace, "namespace")
+        logger.info(f"CACHE INVALIDATED: {namespace}")
 
     def invalidate_key(self, namespace: str, key: str):
         """Remove a specific key from a namespace."""
-        cache = self._caches.get(namespace)
-        if cache is None:
+        self.backend.delete(namespace, key)
+        cache_invalidations.inc(namespace, "key")
+        logger.debug(f"CACHE KEY REMOVED: {namespace}:{key}")
+
+    def invalidate_tags(self, *tags: str):
+        """Remove every cached entry carrying any of the given tags."""
+        if not tags:
             return
-        with self._lock:
-            cache.pop(key, None)
-            logger.debug(f"CACHE KEY REMOVED: {namespace}:{key}")
+        self.backend.invalidate_tags(tags)
+        cache_invalidations.inc("*", "tag", amount=len(tags))
+        logger.debug(f"CACHE TAGS INVALIDATED: {', '.join(tags)}")
 
     def invalidate_all(self):
         """Clear all caches."""
-        with self._lock:
-            for cache in self._caches.values():
-                cache.clear()
-            logger.info("ALL CACHES INVALIDATED")
+        self.backend.clear_all()
+        cache_invalidations.inc("*", "all")
+        logger.info("ALL CACHES INVALIDATED")
 
     def stats(self) -> dict:
-        """Get cache stats for monitoring."""
-        with self._lock:
-            return {
-                name: {
-                    "size": len(cache),
-                    "maxsize": cache.maxsize,
-                    "ttl": cache.ttl,
-                }
-                for name, cache in self._caches.items()
-            }
+        """Get cache stats for monitoring (counters are for this worker)."""
+        return self._with_counters(self.backend.stats())
+
+    async def astats(self) -> dict:
+        """``stats`` for async code: a shared backend queries its usage off the event loop."""
+        return self._with_counters(await self.backend.astats())
+
+    def _with_counters(self, stats: dict) -> dict:
+        for name, ns_stats in stats.items():
+            hits, misses = cache_hits.get(name), cache_misses.get(name)
+            ns_stats.update({
+                "hits": int(hits),
+                "misses": int(misses),
+                "hit_ratio": round(hits / (hits + misses), 4) if hits + misses else None,
+                "sets": int(cache_sets.get(name)),
+                "evictions": int(cache_evictions.get(name, "size") + cache_evictions.get(name, "expired")),
+            })
+        return stats
 
 
 # Singleton instance
-cache_manager = CacheManager()
+cache_manager = CacheManager(
+    create_backend(settings.CACHE_BACKEND, settings.CACHE_SQLITE_PATH, settings.CACHE_SYNC_INTERVAL),
+    early_refresh_beta=settings.CACHE_EARLY_REFRESH_BETA,
+    namespaces=settings.CACHE_NAMESPACES,
+)
@@ -0,0 +1,785 @@
+"""
+Storage backends for the CacheManager.
+
+A backend stores values per namespace with a TTL and a size budget (entry
+count, or bytes when the manager supplies a weigher). Three backends are available, selected with ``settings.CACHE_BACKEND``:
+
+    memory  - per-process cachetools TTLCaches (default, fastest, not shared)
+    sqlite  - a SQLite file shared by every worker on the host
+    tiered  - memory L1 in front of the shared SQLite L2; invalidations are
+              published to the L2 event table and replayed by other workers
+
+Values written to a shared backend are pickled, so they must be plain data
+(e.g. ``CachedResponse``), never live ORM objects.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable
+from cachetools import Cache, LFUCache, TTLCache
+from app.core.config import CacheNamespaceConfig
+import asyncio
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class CacheBackend:
+    """Interface implemented by every cache backend."""
+
+    # Whether every worker on the host sees the same entries
+    shared = False
+
+    # Called as on_evict(namespace, reason, count) when entries are dropped
+    # for capacity ("size") or age ("expired") rather than invalidated
+    on_evict: Callable[[str, str, int], None] | None = None
+
+    def _evicted(self, namespace: str, reason: str, count: int):
+        if count and self.on_evict is not None:
+            self.on_evict(namespace, reason, count)
+
+    def configure(self, namespace: str, config: CacheNamespaceConfig,
+                  getsizeof: Callable[[object], int] | None = None):
+        """
+        Declare (or resize) a namespace. ``config.maxsize`` is measured with
+        ``getsizeof`` (entry weight in bytes); without it every entry weighs 1.
+        """
+        raise NotImplementedError
+
+    def get(self, namespace: str, key: str):
+        """Return the stored value, or None on miss."""
+        raise NotImplementedError
+
+    def get_many(self, namespace: str, keys: Iterable[str]) -> dict[str, object]:
+        """Return {key: value} for the keys that hit (backends override this to batch the lookups)."""
+        values = {}
+        for key in keys:
+            value = self.get(namespace, key)
+            if value is not None:
+                values[key] = value
+        return values
+
+    async def aget(self, namespace: str, key: str):
+        """``get`` for async callers; backends doing blocking I/O run it off the event loop."""
+        return self.get(namespace, key)
+
+    async def aget_many(self, namespace: str, keys: Iterable[str]) -> dict[str, object]:
+        """``get_many`` for async callers."""
+        return self.get_many(namespace, keys)
+
+    def set(self, namespace: str, key: str, value, tags: Iterable[str] = ()):
+        """Store a value, replacing any previous value and tags for the key."""
+        raise NotImplementedError
+
+    def delete(self, namespace: str, key: str):
+        raise NotImplementedError
+
+    def invalidate_tags(self, tags: Iterable[str]):
+        """Remove every entry (in any namespace) carrying one of the tags."""
+        raise NotImplementedError
+
+    def clear(self, namespace: str):
+        raise NotImplementedError
+
+    def clear_all(self):
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        raise NotImplementedError
+
+    async def astats(self) -> dict:
+        """``stats`` for async callers."""
+        return self.stats()
+
+
+class _ObservedTTLCache(TTLCache):
+    """LRU TTLCache reporting size evictions and expirations to its backend."""
+
+    def __init__(self, backend: CacheBackend, namespace: str, maxsize: int, ttl: int, getsizeof=None):
+        super().__init__(maxsize=maxsize, ttl=ttl, getsizeof=getsizeof)
+        self._backend = backend
+        self._namespace = namespace
+
+    def popitem(self):
+        item = super().popitem()
+        self._backend._evicted(self._namespace, "size", 1)
+        return item
+
+    def expire(self, time=None):
+        expired = super().expire(time)
+        if expired:
+            self._backend._evicted(self._namespace, "expired", len(expired))
+        return expired
+
+
+class _ObservedLFUCache(LFUCache):
+    """
+    LFUCache with a per-entry TTL. Expired entries are dropped lazily when
+    read, or evicted first-come by the LFU policy when space is needed.
+    """
+
+    def __init__(self, backend: CacheBackend, namespace: str, maxsize: int, ttl: int, getsizeof=None):
+        super().__init__(maxsize=maxsize, getsizeof=getsizeof)
+        self.ttl = ttl
+        self._backend = backend
+        self._namespace = namespace
+        self._expires: dict[str, float] = {}
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self._expires[key] = time.monotonic() + self.ttl
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._expires.pop(key, None)
+
+    def get(self, key, default=None):
+        expires = self._expires.get(key)
+        if expires is not None and expires <= time.monotonic():
+            del self[key]
+            self._backend._evicted(self._namespace, "expired", 1)
+            return default
+        return super().get(key, default)
+
+    def popitem(self):
+        item = super().popitem()
+        self._backend._evicted(self._namespace, "size", 1)
+        return item
+
+    def clear(self):
+        super().clear()
+        self._expires.clear()
+
+
+class MemoryBackend(CacheBackend):
+    """Thread-safe per-process backend built on cachetools (LRU+TTL or LFU+TTL)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._caches: dict[str, Cache] = {}
+        self._configs: dict[str, CacheNamespaceConfig] = {}
+        # Tag index: tag -> {(namespace, key)} and the reverse mapping
+        self._tag_index: dict[str, set[tuple[str, str]]] = {}
+        self._key_tags: dict[tuple[str, str], tuple[str, ...]] = {}
+
+    def configure(self, namespace: str, config: CacheNamespaceConfig,
+                  getsizeof: Callable[[object], int] | None = None):
+        cache_class = _ObservedLFUCache if config.policy == "lfu" else _ObservedTTLCache
+        with self._lock:
+            self._caches[namespace] = cache_class(self, namespace, config.maxsize, config.ttl, getsizeof)
+            self._configs[namespace] = config
+            for entry in [entry for entry in self._key_tags if entry[0] == namespace]:
+                self._untag(entry)
+
+    def get(self, namespace: str, key: str):
+        cache = self._caches.get(namespace)
+        if cache is None:
+            return None
+        with self._lock:
+            return cache.get(key)
+
+    def get_many(self, namespace: str, keys: Iterable[str]) -> dict[str, object]:
+        cache = self._caches.get(namespace)
+        if cache is None:
+            return {}
+        values = {}
+        # One lock acquisition for the whole batch
+        with self._lock:
+            for key in keys:
+                value = cache.get(key)
+                if value is not None:
+                    values[key] = value
+        return values
+
+    def set(self, namespace: str, key: str, value, tags: Iterable[str] = ()):
+        cache = self._caches.get(namespace)
+        if cache is None:
+            return
+        with self._lock:
+            try:
+                cache[key] = value
+            except ValueError:
+                # Larger than the whole namespace budget: not cacheable
+                logger.debug(f"CACHE SKIP (too large): {namespace}:{key}")
+                return
+            self._untag((namespace, key))
+            tags = tuple(tags)
+            if tags:
+                self._key_tags[(namespace, key)] = tags
+                for tag in tags:
+                    self._tag_index.setdefault(tag, set()).add((namespace, key))
+                self._prune_tags()
+
+    def delete(self, namespace: str, key: str):
+        cache = self._caches.get(namespace)
+        if cache is None:
+            return
+        with self._lock:
+            cache.pop(key, None)
+            self._untag((namespace, key))
+
+    def invalidate_tags(self, tags: Iterable[str]):
+        with self._lock:
+            for tag in tags:
+                for namespace, key in self._tag_index.pop(tag, ()):
+                    cache = self._caches.get(namespace)
+                    if cache is not None:
+                        cache.pop(key, None)
+                    self._untag((namespace, key))
+
+    def clear(self, namespace: str):
+        cache = self._caches.get(namespace)
+        if cache is None:
+            return
+        with self._lock:
+            cache.clear()
+            for entry in [entry for entry in self._key_tags if entry[0] == namespace]:
+                self._untag(entry)
+
+    def clear_all(self):
+        with self._lock:
+            for cache in self._caches.values():
+                cache.clear()
+            self._tag_index.clear()
+            self._key_tags.clear()
+
+    def _untag(self, entry: tuple[str, str]):
+        """Drop an entry from the tag index. Caller holds the lock."""
+        for tag in self._key_tags.pop(entry, ()):
+            entries = self._tag_index.get(tag)
+            if entries is not None:
+                entries.discard(entry)
+                if not entries:
+                    del self._tag_index[tag]
+
+    def _prune_tags(self):
+        """
+        Forget tags of entries the caches expired or evicted on their own.
+        Runs only once the index outgrows the caches, so it is amortized O(1).
+        Caller holds the lock.
+        """
+        live_entries = sum(len(cache) for cache in self._caches.values())
+        if len(self._key_tags) <= 2 * live_entries + 256:
+            return
+        for entry in list(self._key_tags):
+            namespace, key = entry
+            if key not in self._caches[namespace]:
+                self._untag(entry)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                name: {
+                    "size": len(cache),
+                    "currsize": cache.currsize,
+                    "maxsize": cache.maxsize,
+                    "ttl": self._configs[name].ttl,
+                    "weigher": self._configs[name].weigher,
+                    "policy": self._configs[name].policy,
+                }
+                for name, cache in self._caches.items()
+            }
+
+
+class SQLiteBackend(CacheBackend):
+    """
+    Shared backend storing pickled values in a SQLite file.
+
+    Every uvicorn worker on the host opens the same file, so a value cached
+    (or invalidated) by one worker is seen by all of them. WAL mode keeps
+    readers from blocking the single writer. Use ``":memory:"`` as the path
+    for a private, throwaway stand-in (e.g. in tests).
+
+    All SQLite calls run, in order, on one dedicated thread: writes are queued
+    without waiting, ``aget`` / ``aget_many`` await their result off the event
+    loop, and the synchronous reads block until theirs is done. A read thereby
+    always sees this process's earlier writes; ``wait_for_writes`` blocks until
+    the queued writes are applied.
+
+    Byte-weighed namespaces are bounded by the pickled payload size; the total
+    weight per namespace is kept in ``cache_usage`` by triggers. Eviction only
+    runs once a namespace is over budget and then trims it to ``EVICT_TO`` of
+    the budget, dropping the entries closest to expiry; expired entries are
+    purged every ``PURGE_EVERY`` writes. The ``policy`` setting only applies to
+    the in-memory backend.
+    """
+
+    SCHEMA_VERSION = 3
+    # Expired rows are purged every this many writes to a namespace (and whenever it is over budget)
+    PURGE_EVERY = 100
+    # Eviction trims to this fraction of the budget so the next few writes don't evict again
+    EVICT_TO = 0.9
+
+    def __init__(self, path: str):
+        self.path = path
+        self.shared = path != ":memory:"
+        self._configs: dict[str, CacheNamespaceConfig] = {}
+        self._weighed: set[str] = set()
+        self._writes: dict[str, int] = {}
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cache-sqlite")
+        self._conn = sqlite3.connect(path, timeout=5.0, check_same_thread=False, isolation_level=None)
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] != self.SCHEMA_VERSION:
+            # Cached data is disposable: rebuild rather than migrate
+            self._conn.executescript(
+                """
+                DROP TABLE IF EXISTS cache_entries;
+                DROP TABLE IF EXISTS cache_tags;
+                DROP TABLE IF EXISTS cache_events;
+                DROP TABLE IF EXISTS cache_usage;
+                """
+            )
+            self._conn.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS cache_entries (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value BLOB NOT NULL,
+                weight INTEGER NOT NULL,
+                expires_at REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            );
+            CREATE INDEX IF NOT EXISTS ix_cache_entries_expiry ON cache_entries (namespace, expires_at);
+            CREATE TABLE IF NOT EXISTS cache_tags (
+                tag TEXT NOT NULL,
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS ix_cache_tags_tag ON cache_tags (tag);
+            CREATE INDEX IF NOT EXISTS ix_cache_tags_entry ON cache_tags (namespace, key);
+            CREATE TRIGGER IF NOT EXISTS tr_cache_entries_untag AFTER DELETE ON cache_entries
+            BEGIN
+                DELETE FROM cache_tags WHERE namespace = old.namespace AND key = old.key;
+            END;
+            CREATE TABLE IF NOT EXISTS cache_usage (
+                namespace TEXT PRIMARY KEY,
+                weight INTEGER NOT NULL
+            );
+            CREATE TRIGGER IF NOT EXISTS tr_cache_usage_insert AFTER INSERT ON cache_entries
+            BEGIN
+                INSERT OR IGNORE INTO cache_usage (namespace, weight) VALUES (new.namespace, 0);
+                UPDATE cache_usage SET weight = weight + new.weight WHERE namespace = new.namespace;
+            END;
+            CREATE TRIGGER IF NOT EXISTS tr_cache_usage_update AFTER UPDATE OF weight ON cache_entries
+            BEGIN
+                UPDATE cache_usage SET weight = weight + new.weight - old.weight WHERE namespace = new.namespace;
+            END;
+            CREATE TRIGGER IF NOT EXISTS tr_cache_usage_delete AFTER DELETE ON cache_entries
+            BEGIN
+                UPDATE cache_usage SET weight = weight - old.weight WHERE namespace = old.namespace;
+            END;
+            CREATE TABLE IF NOT EXISTS cache_events (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                origin TEXT NOT NULL,
+                namespace TEXT NOT NULL,
+                key TEXT,
+                created_at REAL NOT NULL
+            );
+            """
+        )
+
+    # --- Running SQLite calls on the backend thread ---
+
+    def _query(self, fn: Callable, *args):
+        """Run ``fn`` on the backend thread and wait for its result."""
+        return self._executor.submit(fn, *args).result()
+
+    async def _aquery(self, fn: Callable, *args):
+        """Run ``fn`` on the backend thread without blocking the event loop."""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    def _submit(self, fn: Callable, *args):
+        """Queue a write on the backend thread; failures are logged, not raised."""
+        self._executor.submit(self._write, fn, args)
+
+    @staticmethod
+    def _write(fn: Callable, args: tuple):
+        try:
+            fn(*args)
+        except Exception as e:
+            logger.warning(f"Cache write failed: {e}")
+
+    def _execute(self, sql: str, parameters: Iterable = ()):
+        self._conn.execute(sql, tuple(parameters))
+
+    def wait_for_writes(self):
+        """Block until every write queued so far has been applied."""
+        self._query(lambda: None)
+
+    def configure(self, namespace: str, config: CacheNamespaceConfig,
+                  getsizeof: Callable[[object], int] | None = None):
+        self._configs[namespace] = config
+        if getsizeof is None:
+            self._weighed.discard(namespace)
+        else:
+            self._weighed.add(namespace)
+
+    def get(self, namespace: str, key: str):
+        entry = self.get_with_tags(namespace, key)
+        return None if entry is None else entry[0]
+
+    async def aget(self, namespace: str, key: str):
+        entry = await self.aget_with_tags(namespace, key)
+        return None if entry is None else entry[0]
+
+    def get_with_tags(self, namespace: str, key: str) -> tuple[object, list[str]] | None:
+        """Return (value, tags) for a live entry, or None on miss."""
+        if namespace not in self._configs:
+            return None
+        return self._query(self._get_with_tags, namespace, key)
+
+    async def aget_with_tags(self, namespace: str, key: str) -> tuple[object, list[str]] | None:
+        if namespace not in self._configs:
+            return None
+        return await self._aquery(self._get_with_tags, namespace, key)
+
+    def _get_with_tags(self, namespace: str, key: str) -> tuple[object, list[str]] | None:
+        row = self._conn.execute(
+            """
+            SELECT value, (SELECT group_concat(tag, char(31)) FROM cache_tags t
+                           WHERE t.namespace = e.namespace AND t.key = e.key)
+            FROM cache_entries e WHERE namespace = ? AND key = ? AND expires_at > ?
+            """,
+            (namespace, key, time.time()),
+        ).fetchone()
+        if row is None:
+            return None
+        return pickle.loads(row[0]), row[1].split("\x1f") if row[1] else []
+
+    # Bound parameters per lookup (SQLite's default limit is 999 on older builds)
+    MAX_BATCH_KEYS = 500
+
+    def get_many(self, namespace: str, keys: Iterable[str]) -> dict[str, object]:
+        return {key: value for key, (value, _) in self.get_many_with_tags(namespace, keys).items()}
+
+    async def aget_many(self, namespace: str, keys: Iterable[str]) -> dict[str, object]:
+        return {key: value for key, (value, _) in (await self.aget_many_with_tags(namespace, keys)).items()}
+
+    def get_many_with_tags(self, namespace: str, keys: Iterable[str]) -> dict[str, tuple[object, list[str]]]:
+        """Return {key: (value, tags)} for the live entries among ``keys``, one query per 500 keys."""
+        if namespace not in self._configs:
+            return {}
+        return self._query(self._get_many_with_tags, namespace, list(dict.fromkeys(keys)))
+
+    async def aget_many_with_tags(self, namespace: str,
+                                  keys: Iterable[str]) -> dict[str, tuple[object, list[str]]]:
+        if namespace not in self._configs:
+            return {}
+        return await self._aquery(self._get_many_with_tags, namespace, list(dict.fromkeys(keys)))
+
+    def _get_many_with_tags(self, namespace: str, keys: list[str]) -> dict[str, tuple[object, list[str]]]:
+        rows = []
+        for start in range(0, len(keys), self.MAX_BATCH_KEYS):
+            chunk = keys[start:start + self.MAX_BATCH_KEYS]
+            rows += self._conn.execute(
+                f"""
+                SELECT key, value, (SELECT group_concat(tag, char(31)) FROM cache_tags t
+                                    WHERE t.namespace = e.namespace AND t.key = e.key)
+                FROM cache_entries e
+                WHERE namespace = ? AND key IN ({",".join("?" * len(chunk))}) AND expires_at > ?
+                """,
+                (namespace, *chunk, time.time()),
+            ).fetchall()
+        return {key: (pickle.loads(value), tags.split("\x1f") if tags else []) for key, value, tags in rows}
+
+    def set(self, namespace: str, key: str, value, tags: Iterable[str] = ()):
+        config = self._configs.get(namespace)
+        if config is None:
+            return
+        payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        weight = len(payload) if namespace in self._weighed else 1
+        if weight > config.maxsize:
+            logger.debug(f"CACHE SKIP (too large): {namespace}:{key}")
+            return
+        self._submit(self._set, namespace, key, payload, weight, tuple(set(tags)), config)
+
+    def _set(self, namespace: str, key: str, payload: bytes, weight: int, tags: tuple[str, ...],
+             config: CacheNamespaceConfig):
+        now = time.time()
+        self._conn.execute(
+            "INSERT INTO cache_entries (namespace, key, value, weight, expires_at) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (namespace, key) DO UPDATE SET "
+            "value = excluded.value, weight = excluded.weight, expires_at = excluded.expires_at",
+            (namespace, key, payload, weight, now + config.ttl),
+        )
+        # An update keeps the row, so the delete trigger does not reset its tags
+        self._conn.execute("DELETE FROM cache_tags WHERE namespace = ? AND key = ?", (namespace, key))
+        self._conn.executemany(
+            "INSERT INTO cache_tags (tag, namespace, key) VALUES (?, ?, ?)",
+            [(tag, namespace, key) for tag in tags],
+        )
+        self._writes[namespace] = writes = self._writes.get(namespace, 0) + 1
+        over_budget = self._usage(namespace) > config.maxsize
+        expired = evicted = 0
+        if over_budget or writes % self.PURGE_EVERY == 0:
+            expired = self._conn.execute(
+                "DELETE FROM cache_entries WHERE namespace = ? AND expires_at <= ?", (namespace, now)
+            ).rowcount
+        if over_budget and self._usage(namespace) > config.maxsize:
+            # Drop the soonest-to-expire rows once the running weight (newest first) exceeds the target
+            evicted = self._conn.execute(
+                """
+                DELETE FROM cache_entries WHERE namespace = ? AND key IN (
+                    SELECT key FROM (
+                        SELECT key, SUM(weight) OVER (ORDER BY expires_at DESC, key) AS running
+                        FROM cache_entries WHERE namespace = ?
+                    ) WHERE running > ?
+                )
+                """,
+                (namespace, namespace, int(config.maxsize * self.EVICT_TO)),
+            ).rowcount
+        self._evicted(namespace, "expired", expired)
+        self._evicted(namespace, "size", evicted)
+
+    def _usage(self, namespace: str) -> int:
+        row = self._conn.execute("SELECT weight FROM cache_usage WHERE namespace = ?", (namespace,)).fetchone()
+        return row[0] if row else 0
+
+    def delete(self, namespace: str, key: str):
+        self._submit(self._execute, "DELETE FROM cache_entries WHERE namespace = ? AND key = ?", (namespace, key))
+
+    def invalidate_tags(self, tags: Iterable[str]):
+        tags = list(set(tags))
+        if not tags:
+            return
+        placeholders = ", ".join("?" * len(tags))
+        self._submit(
+            self._execute,
+            f"""
+            DELETE FROM cache_entries WHERE (namespace, key) IN (
+                SELECT namespace, key FROM cache_tags WHERE tag IN ({placeholders})
+            )
+            """,
+            tags,
+        )
+
+    def clear(self, namespace: str):
+        self._submit(self._execute, "DELETE FROM cache_entries WHERE namespace = ?", (namespace,))
+
+    def clear_all(self):
+        self._submit(self._execute, "DELETE FROM cache_entries")
+
+    def stats(self) -> dict:
+        return self._stats(self._query(self._live_usage))
+
+    async def astats(self) -> dict:
+        return self._stats(await self._aquery(self._live_usage))
+
+    def _live_usage(self) -> list[tuple[str, int, int]]:
+        return self._conn.execute(
+            "SELECT namespace, COUNT(*), SUM(weight) FROM cache_entries WHERE expires_at > ? GROUP BY namespace",
+            (time.time(),),
+        ).fetchall()
+
+    def _stats(self, rows: list[tuple[str, int, int]]) -> dict:
+        usage = {namespace: (count, weight) for namespace, count, weight in rows}
+        return {
+            name: {
+                "size": usage.get(name, (0, 0))[0],
+                "currsize": usage.get(name, (0, 0))[1],
+                "maxsize": config.maxsize,
+                "ttl": config.ttl,
+                "weigher": config.weigher,
+                "policy": config.policy,
+            }
+            for name, config in self._configs.items()
+        }
+
+    # --- Invalidation events (used by TieredBackend) ---
+
+    def publish(self, origin: str, namespace: str, key: str | None):
+        """
+        Record an invalidation for other workers. key=None means the whole
+        namespace; namespace TAG_EVENT means key is an invalidated tag.
+        """
+        self._submit(
+            self._execute,
+            "INSERT INTO cache_events (origin, namespace, key, created_at) VALUES (?, ?, ?, ?)",
+            (origin, namespace, key, time.time()),
+        )
+
+    def events_since(self, seq: int) -> list[tuple[int, str, str, str | None]]:
+        return self._query(self._events_since, seq)
+
+    async def aevents_since(self, seq: int) -> list[tuple[int, str, str, str | None]]:
+        return await self._aquery(self._events_since, seq)
+
+    def _events_since(self, seq: int) -> list[tuple[int, str, str, str | None]]:
+        return self._conn.execute(
+            "SELECT seq, origin, namespace, key FROM cache_events WHERE seq > ? ORDER BY seq", (seq,)
+        ).fetchall()
+
+    def last_event_seq(self) -> int:
+        row = self._query(lambda: self._conn.execute("SELECT COALESCE(MAX(seq), 0) FROM cache_events").fetchone())
+        return row[0]
+
+    def prune_events(self, older_than: float):
+        self._submit(self._execute, "DELETE FROM cache_events WHERE created_at < ?", (older_than,))
+
+
+class TieredBackend(CacheBackend):
+    """
+    Two-tier cache: a per-process MemoryBackend (L1) in front of a shared
+    SQLiteBackend (L2).
+
+    Reads hit L1 first and fall back to L2, promoting the value. Writes go to
+    both tiers. Invalidations are applied locally and published as events;
+    every worker replays new events into its own L1 at most once per
+    ``sync_interval`` seconds, which bounds cross-worker staleness.
+    """
+
+    # Events are only needed until every worker has replayed them
+    EVENT_RETENTION = 600
+    # Pseudo-namespace used to publish tag invalidations
+    TAG_EVENT = "#tag"
+
+    def __init__(self, l1: MemoryBackend, l2: SQLiteBackend, sync_interval: float = 1.0):
+        self.l1 = l1
+        self.l2 = l2
+        self.shared = l2.shared
+        self.sync_interval = sync_interval
+        # L1 evictions are local churn; report the shared tier's
+        self.l2.on_evict = lambda *args: self._evicted(*args)
+        self._origin = f"{os.getpid()}-{id(self)}"
+        self._last_seq = l2.last_event_seq()
+        self._next_sync = time.monotonic() + sync_interval
+
+    def configure(self, namespace: str, config: CacheNamespaceConfig,
+                  getsizeof: Callable[[object], int] | None = None):
+        self.l1.configure(namespace, config, getsizeof)
+        self.l2.configure(namespace, config, getsizeof)
+
+    def _sync_due(self) -> bool:
+        now = time.monotonic()
+        if now < self._next_sync:
+            return False
+        self._next_sync = now + self.sync_interval
+        return True
+
+    def _sync(self):
+        if self._sync_due():
+            self._replay(self.l2.events_since(self._last_seq))
+
+    async def _async_sync(self):
+        if self._sync_due():
+            self._replay(await self.l2.aevents_since(self._last_seq))
+
+    def _replay(self, events: list[tuple[int, str, str, str | None]]):
+        for seq, origin, namespace, key in events:
+            self._last_seq = seq
+            if origin == self._origin:
+                continue
+            if namespace == "*":
+                self.l1.clear_all()
+            elif namespace == self.TAG_EVENT:
+                self.l1.invalidate_tags([key])
+            elif key is None:
+                self.l1.clear(namespace)
+            else:
+                self.l1.delete(namespace, key)
+        self.l2.prune_events(time.time() - self.EVENT_RETENTION)
+
+    def get(self, namespace: str, key: str):
+        self._sync()
+        value = self.l1.get(namespace, key)
+        if value is not None:
+            return value
+        entry = self.l2.get_with_tags(namespace, key)
+        if entry is None:
+            return None
+        # Promote with its tags so replayed tag invalidations still reach it
+        value, tags = entry
+        self.l1.set(namespace, key, value, tags)
+        return value
+
+    def get_many(self, namespace: str, keys: Iterable[str]) -> dict[str, object]:
+        self._sync()
+        keys = list(keys)
+        values = self.l1.get_many(namespace, keys)
+        missing = [key for key in keys if key not in values]
+        if missing:
+            for key, (value, tags) in self.l2.get_many_with_tags(namespace, missing).items():
+                self.l1.set(namespace, key, value, tags)
+                values[key] = value
+        return values
+
+    async def aget(self, namespace: str, key: str):
+        await self._async_sync()
+        value = self.l1.get(namespace, key)
+        if value is not None:
+            return value
+        entry = await self.l2.aget_with_tags(namespace, key)
+        if entry is None:
+            return None
+        value, tags = entry
+        self.l1.set(namespace, key, value, tags)
+        return value
+
+    async def aget_many(self, namespace: str, keys: Iterable[str]) -> dict[str, object]:
+        await self._async_sync()
+        keys = list(keys)
+        values = self.l1.get_many(namespace, keys)
+        missing = [key for key in keys if key not in values]
+        if missing:
+            for key, (value, tags) in (await self.l2.aget_many_with_tags(namespace, missing)).items():
+                self.l1.set(namespace, key, value, tags)
+                values[key] = value
+        return values
+
+    def set(self, namespace: str, key: str, value, tags: Iterable[str] = ()):
+        tags = tuple(tags)
+        self.l1.set(namespace, key, value, tags)
+        self.l2.set(namespace, key, value, tags)
+
+    def delete(self, namespace: str, key: str):
+        self.l1.delete(namespace, key)
+        self.l2.delete(namespace, key)
+        self.l2.publish(self._origin, namespace, key)
+
+    def invalidate_tags(self, tags: Iterable[str]):
+        tags = set(tags)
+        self.l1.invalidate_tags(tags)
+        self.l2.invalidate_tags(tags)
+        for tag in tags:
+            self.l2.publish(self._origin, self.TAG_EVENT, tag)
+
+    def clear(self, namespace: str):
+        self.l1.clear(namespace)
+        self.l2.clear(namespace)
+        self.l2.publish(self._origin, namespace, None)
+
+    def clear_all(self):
+        self.l1.clear_all()
+        self.l2.clear_all()
+        self.l2.publish(self._origin, "*", None)
+
+    def stats(self) -> dict:
+        return self._stats(self.l2.stats())
+
+    async def astats(self) -> dict:
+        return self._stats(await self.l2.astats())
+
+    def _stats(self, l2_stats: dict) -> dict:
+        l1_stats = self.l1.stats()
+        return {
+            name: {**stats, "l1_size": l1_stats.get(name, {}).get("size", 0)}
+            for name, stats in l2_stats.items()
+        }
+
+
+def create_backend(kind: str, sqlite_path: str, sync_interval: float) -> CacheBackend:
+    """Build the backend named by ``settings.CACHE_BACKEND``."""
+    if kind == "memory":
+        return MemoryBackend()
+    if kind == "sqlite":
+        return SQLiteBackend(sqlite_path)
+    if kind == "tiered":
+        return TieredBackend(MemoryBackend(), SQLiteBackend(sqlite_path), sync_interval)
+    raise ValueError(f"Unknown CACHE_BACKEND: {kind!r}")
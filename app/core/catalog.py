@@ -0,0 +1,221 @@
+"""
+Columnar in-memory snapshot of the catalog for filtered browsing and facets.
+
+Holds one NumPy array per filterable attribute (price, category, stock,
+active flag, creation time), aligned by product id. Filtering, sorting,
+keyset paging and facet counts are vectorized passes over these arrays, so
+filtered listings only hit the database for the primary-key lookup of the
+page they show, and facet counts need no GROUP BY at all.
+
+Each worker keeps its own snapshot: built at startup, updated in place on
+product writes and checkouts in that worker, and rebuilt periodically
+(``SEARCH_INDEX_REFRESH_INTERVAL``) to pick up other workers' writes.
+
+Usage:
+    from app.core.catalog import catalog, CatalogFilter
+
+    filters = CatalogFilter(category_id=2, min_price=100, in_stock=True)
+    catalog.query(filters, sort="price_asc", limit=20)   # [(price, id), ...]
+    catalog.facets(filters)                             # Counts per category / price bucket
+"""
+
+from typing import Iterable, NamedTuple, Optional
+from datetime import datetime
+import numpy as np
+
+# Lower edges of the price facet buckets; the last bucket is open-ended
+PRICE_BUCKET_EDGES = (0, 500, 1000, 2000, 5000, 10000)
+
+SORT_ORDERS = ("price_asc", "price_desc", "newest")
+
+NO_CATEGORY = -1
+
+
+class CatalogFilter(NamedTuple):
+    """Listing filters. The price range is min inclusive, max exclusive, like the facet buckets."""
+    category_id: Optional[int] = None
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+    in_stock: bool = False
+    is_active: Optional[bool] = None
+
+
+class CatalogRow(NamedTuple):
+    id: int
+    price: float
+    category_id: Optional[int]
+    stock_quantity: Optional[int]
+    is_active: Optional[bool]
+    created_at: Optional[datetime]
+
+
+def _timestamp(value: Optional[datetime]) -> float:
+    return value.timestamp() if value else 0.0
+
+
+class CatalogSnapshot:
+    """Parallel arrays sorted by product id."""
+
+    def __init__(self):
+        self._set_columns([])
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _set_columns(self, rows: list[CatalogRow]):
+        rows = sorted(rows, key=lambda row: row.id)
+        count = len(rows)
+        self.ids = np.fromiter((row.id for row in rows), np.int64, count)
+        self.prices = np.fromiter((row.price for row in rows), np.float64, count)
+        self.category_ids = np.fromiter(
+            (NO_CATEGORY if row.category_id is None else row.category_id for row in rows), np.int64, count
+        )
+        self.stock = np.fromiter((row.stock_quantity or 0 for row in rows), np.int64, count)
+        self.active = np.fromiter((row.is_active is not False for row in rows), np.bool_, count)
+        self.created = np.fromiter((_timestamp(row.created_at) for row in rows), np.float64, count)
+
+    def replace(self, rows: Iterable[CatalogRow]):
+        self._set_columns(list(rows))
+
+    def _position(self, product_id: int) -> tuple[int, bool]:
+        position = int(np.searchsorted(self.ids, product_id))
+        return position, position < len(self.ids) and self.ids[position] == product_id
+
+    def upsert(self, row: CatalogRow):
+        """Add or update one product in place (an insert copies the arrays: fine for single writes)."""
+        position, exists = self._position(row.id)
+        values = (
+            row.id, row.price, NO_CATEGORY if row.category_id is None else row.category_id,
+            row.stock_quantity or 0, row.is_active is not False, _timestamp(row.created_at),
+        )
+        columns = ("ids", "prices", "category_ids", "stock", "active", "created")
+        if exists:
+            for name, value in zip(columns, values):
+                getattr(self, name)[position] = value
+        else:
+            for name, value in zip(columns, values):
+                setattr(self, name, np.insert(getattr(self, name), position, value))
+
+    def stock_of(self, product_id: int) -> Optional[int]:
+        """Stock of a product as of the snapshot; None when it is not in the snapshot."""
+        position, exists = self._position(product_id)
+        return int(self.stock[position]) if exists else None
+
+    def price_of(self, product_id: int) -> Optional[float]:
+        """Price of a product as of the snapshot; None when it is not in the snapshot."""
+        position, exists = self._position(product_id)
+        return float(self.prices[position]) if exists else None
+
+    def set_stock(self, stock: dict[int, int]):
+        for product_id, quantity in stock.items():
+            position, exists = self._position(product_id)
+            if exists:
+                self.stock[position] = quantity
+
+    def _mask(self, filters: CatalogFilter, skip_category: bool = False, skip_price: bool = False) -> np.ndarray:
+        mask = np.ones(len(self.ids), dtype=np.bool_)
+        if filters.category_id is not None and not skip_category:
+            mask &= self.category_ids == filters.category_id
+        if not skip_price:
+            if filters.min_price is not None:
+                mask &= self.prices >= filters.min_price
+            if filters.max_price is not None:
+                mask &= self.prices < filters.max_price
+        if filters.in_stock:
+            mask &= self.stock > 0
+        if filters.is_active is not None:
+            mask &= self.active == filters.is_active
+        return mask
+
+    def _candidates(self, product_ids: Iterable[int]) -> tuple[np.ndarray, np.ndarray]:
+        """Positions of the given ids that are in the snapshot, and their index in ``product_ids``."""
+        wanted = np.fromiter(product_ids, np.int64)
+        positions = np.searchsorted(self.ids, wanted)
+        found = positions < len(self.ids)
+        found[found] = self.ids[positions[found]] == wanted[found]
+        return positions[found], np.flatnonzero(found)
+
+    def query(self, filters: CatalogFilter, sort: str | None = None, after: tuple | None = None,
+              skip: int = 0, limit: int = 100, ranked: list[tuple[float, int]] | None = None) -> list[tuple]:
+        """
+        A page of matching products as (sort key, id), or (id,) in id order.
+
+        ``sort`` is one of ``SORT_ORDERS``; without it, results follow
+        ``ranked`` (search matches as (score, id), best first) when given,
+        else ascending id. ``after`` is the last tuple of the previous page.
+        """
+        mask = self._mask(filters)
+        if ranked is not None:
+            positions, order = self._candidates(product_id for _, product_id in ranked)
+            keep = mask[positions]
+            positions = positions[keep]
+            scores = np.array([ranked[i][0] for i in order[keep]], dtype=np.float64)
+        else:
+            positions = np.flatnonzero(mask)
+
+        ids = self.ids[positions]
+        if sort == "price_asc":
+            keys = self.prices[positions]
+        elif sort == "price_desc":
+            keys = -self.prices[positions]
+        elif sort == "newest":
+            keys = -self.created[positions]
+        elif ranked is not None:
+            keys = -scores
+        else:
+            keys = None
+
+        if keys is None:
+            if after is not None:
+                ids = ids[ids > after[0]]
+            page = ids[skip:skip + limit]
+            return [(int(product_id),) for product_id in page]
+
+        if after is not None:
+            # Cursors carry the displayed value (price, score, timestamp); keys may be negated
+            after_key = after[0] if sort == "price_asc" else -after[0]
+            keep = (keys > after_key) | ((keys == after_key) & (ids > after[1]))
+            keys, ids = keys[keep], ids[keep]
+        order = np.lexsort((ids, keys))[skip:skip + limit]
+        sign = 1.0 if sort == "price_asc" else -1.0
+        return [(float(sign * keys[i]), int(ids[i])) for i in order]
+
+    def facets(self, filters: CatalogFilter, product_ids: Iterable[int] | None = None) -> dict:
+        """
+        Counts for the current query. Each facet ignores its own filter (the
+        category counts apply every filter but the category, and so on), so
+        they show what picking another value would return.
+        """
+        restrict = np.zeros(len(self.ids), dtype=np.bool_)
+        if product_ids is None:
+            restrict[:] = True
+        else:
+            restrict[self._candidates(product_ids)[0]] = True
+
+        category_ids, category_counts = np.unique(
+            self.category_ids[restrict & self._mask(filters, skip_category=True)], return_counts=True
+        )
+        edges = np.asarray(PRICE_BUCKET_EDGES, dtype=np.float64)
+        prices = self.prices[restrict & self._mask(filters, skip_price=True)]
+        buckets = np.bincount(
+            np.clip(np.searchsorted(edges, prices, side="right") - 1, 0, None), minlength=len(edges)
+        )
+        return {
+            "total": int(np.count_nonzero(restrict & self._mask(filters))),
+            "categories": [
+                {"category_id": None if category_id == NO_CATEGORY else int(category_id), "count": int(count)}
+                for category_id, count in zip(category_ids, category_counts)
+            ],
+            "price_buckets": [
+                {
+                    "min_price": float(edges[i]),
+                    "max_price": float(edges[i + 1]) if i + 1 < len(edges) else None,
+                    "count": int(buckets[i]),
+                }
+                for i in range(len(edges))
+            ],
+        }
+
+
+# Singleton instance (filled on startup)
+catalog = CatalogSnapshot()
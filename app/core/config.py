@@ -1,5 +1,13 @@
+from pydantic import BaseModel
 from pydantic_settings import BaseSettings
-from typing import List, Union, Optional
+from typing import Dict, List, Literal, Union, Optional
+
+class CacheNamespaceConfig(BaseModel):
+    """Sizing and eviction policy of one cache namespace."""
+    ttl: int = 300                              # Seconds
+    maxsize: int = 16 * 1024 * 1024             # Budget, in the weigher's unit
+    weigher: Literal["bytes", "count"] = "bytes"  # Serialized size of each entry, or 1 per entry
+    policy: Literal["lru", "lfu"] = "lru"
 
 class Settings(BaseSettings):
     PROJECT_NAME: str
@@ -7,14 +15,76 @@ class Settings(BaseSettings):
     BACKEND_CORS_ORIGINS: List[str] = []
     
     DATABASE_URL: str
+
+    # Connection pool (per worker process)
+    DB_ECHO: bool = False               # Log every SQL statement (debugging only: synchronous on the hot path)
+    DB_POOL_SIZE: int = 10              # Connections kept open
+    DB_MAX_OVERFLOW: int = 20           # Extra connections opened under burst load
+    DB_POOL_TIMEOUT: float = 10.0       # Seconds to wait for a free connection before failing
+    DB_POOL_RECYCLE: int = 1800         # Replace connections older than this (seconds; -1 = never)
+    DB_POOL_PRE_PING: bool = False      # Ping on every checkout (costs a round trip; enable behind flaky proxies)
+    DB_STATEMENT_CACHE_SIZE: int = 500  # asyncpg prepared statements cached per connection (0 disables, e.g. for pgbouncer)
+    # Read-only routes (get_read_db): "autocommit" skips BEGIN/COMMIT entirely, "read_only" runs
+    # BEGIN READ ONLY transactions (consistent snapshot; PostgreSQL), "transaction" is a plain transaction
+    DB_READ_ISOLATION: Literal["autocommit", "read_only", "transaction"] = "autocommit"
+    DB_STATS_HEADER: bool = False       # Add X-DB-Stats (statements, flushes, round trips) to responses (profiling only)
+
+    # Read replicas for get_read_db (empty = all reads go to the primary)
+    DATABASE_REPLICA_URLS: List[str] = []
+    DB_REPLICA_SELECTION: Literal["round_robin", "least_connections"] = "round_robin"
+    READ_YOUR_WRITES_SECONDS: int = 5   # A client that just wrote reads from the primary this long
     
     SECRET_KEY: str
     ALGORITHM: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int
+    # Password hashing (pbkdf2_sha256). Hashes with fewer rounds are upgraded on the user's next login.
+    PASSWORD_HASH_ROUNDS: int = 29000
+    PASSWORD_HASH_WORKERS: int = 2      # Threads hashing / verifying passwords, off the event loop
+    PASSWORD_HASH_MAX_PENDING: int = 64 # Hash jobs running or queued before logins get a 503
+    # Verified-token LRU: repeat requests with the same bearer token skip signature verification
+    TOKEN_CACHE_MAX_BYTES: int = 1024 * 1024   # Hard cap on the cache's estimated size (0 disables)
+    PRINCIPAL_CACHE_TTL: int = 60       # Seconds a user's auth principal is served from cache
+    # Honour logout and deactivation before tokens expire (one cache lookup per authenticated
+    # request). While on, requests resolve the user from token claims without a query. Revocations
+    # live in the cache: with the per-worker memory backend they only apply in the worker that
+    # handled them, so run several workers with a shared CACHE_BACKEND (sqlite or tiered). Off,
+    # the user row is read on every request instead.
+    TOKEN_REVOCATION: bool = True
+
+    # Product search: "postgres" (tsvector + pg_trgm indexes), "memory" (per-worker inverted
+    # index) or "auto" (postgres on PostgreSQL)
+    SEARCH_BACKEND: Literal["auto", "postgres", "memory"] = "auto"
+    # Seconds between rebuilds of the per-worker in-memory indexes (catalog snapshot, autocomplete,
+    # memory search), which pick up product writes made by other workers
+    SEARCH_INDEX_REFRESH_INTERVAL: float = 300.0
+
+    # Cart storage: "database" (every mutation reads and writes carts / cart_items) or "memory"
+    # (active carts held in this worker, written back in batches every CART_FLUSH_INTERVAL seconds
+    # and before checkout). "memory" needs a single worker or per-user sticky routing: carts are
+    # not shared between workers.
+    CART_ENGINE: Literal["database", "memory"] = "database"
+    CART_FLUSH_INTERVAL: float = 1.0    # Longest delay before a cart change reaches the database
+    CART_MAX_ACTIVE: int = 100_000      # Carts kept in memory; the least recently used clean ones are dropped
+
+    IDEMPOTENCY_KEY_TTL_HOURS: int = 24  # Checkout Idempotency-Key responses are replayable this long
 
     RAZORPAY_KEY_ID: str = ""
     RAZORPAY_KEY_SECRET: str = ""
 
+    # Cache backend: "memory" (per worker), "sqlite" (shared file) or "tiered" (memory L1 + sqlite L2)
+    CACHE_BACKEND: str = "memory"
+    CACHE_SQLITE_PATH: str = "cache.sqlite3"
+    CACHE_SYNC_INTERVAL: float = 1.0  # Seconds between L1 invalidation syncs in tiered mode
+    CACHE_EARLY_REFRESH_BETA: float = 1.0  # XFetch eagerness for refreshing hot keys early; 0 disables
+    # Per-namespace overrides/additions, merged field by field over the defaults in app/core/cache.py
+    # (and over namespaces registered elsewhere, e.g. read_your_writes): unset fields keep their default, e.g.
+    # CACHE_NAMESPACES='{"products_list": {"maxsize": 67108864, "policy": "lfu"}}'
+    CACHE_NAMESPACES: Dict[str, CacheNamespaceConfig] = {}
+
+    # Metrics: shared directory for per-worker snapshots (empty = single process)
+    METRICS_MULTIPROC_DIR: str = ""
+    METRICS_FLUSH_INTERVAL: float = 5.0
+
     class Config:
         case_sensitive = True
         env_file = ".env"
@@ -1,16 +1,109 @@
+from typing import AsyncIterator, Callable
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from fastapi import Request
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from sqlalchemy.orm import sessionmaker, declarative_base
-from app.core.config import settings
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool
+from app.core.cache import cache_manager
+from app.core.config import CacheNamespaceConfig, settings
+from app.core.metrics import metrics
+import hashlib
+import itertools
+import time
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Pool metrics (exported on /metrics)
+pool_checkout_wait_seconds = metrics.histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a pooled connection (includes opening overflow connections)",
+    ["pool"],
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+pool_checkout_timeouts = metrics.counter(
+    "db_pool_checkout_timeouts_total", "Checkouts that gave up after DB_POOL_TIMEOUT", ["pool"]
+)
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """
+    AsyncAdaptedQueuePool that records how long each checkout waited.
+    The pool is labelled by its ``logging_name`` (``pool_logging_name``).
+    """
+
+    def _do_get(self):
+        label = self.logging_name or "primary"
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            pool_checkout_timeouts.inc(label)
+            raise
+        finally:
+            pool_checkout_wait_seconds.observe(label, value=time.perf_counter() - start)
+
+
+def create_engine_for(url: str, pool_label: str = "primary"):
+    """Async engine with the pool tuned from settings."""
+    connect_args = {}
+    if make_url(url).get_driver_name() == "asyncpg":
+        connect_args["prepared_statement_cache_size"] = settings.DB_STATEMENT_CACHE_SIZE
+    return create_async_engine(
+        url,
+        echo=settings.DB_ECHO,
+        poolclass=InstrumentedQueuePool,
+        pool_logging_name=pool_label,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        connect_args=connect_args,
+    )
+
+
 # Create Async Engine for PostgreSQL
-engine = create_async_engine(
-    settings.DATABASE_URL, 
-    echo=True, 
-    pool_pre_ping=True
+engine = create_engine_for(settings.DATABASE_URL)
+
+# Read replicas (see get_read_db)
+replica_engines = [
+    create_engine_for(url, f"replica{i}") for i, url in enumerate(settings.DATABASE_REPLICA_URLS)
+]
+
+# Engines whose pool state is exported: pool label -> engine
+pooled_engines = {"primary": engine}
+pooled_engines.update((e.pool.logging_name, e) for e in replica_engines)
+
+
+def _pool_state(read) -> dict[tuple, float]:
+    return {(label,): read(e.pool) for label, e in pooled_engines.items()}
+
+
+metrics.gauge(
+    "db_pool_checked_out", "Connections currently checked out of the pool", ["pool"],
+    callback=lambda: _pool_state(lambda pool: pool.checkedout()),
 )
+metrics.gauge(
+    "db_pool_overflow", "Overflow connections currently open beyond DB_POOL_SIZE", ["pool"],
+    callback=lambda: _pool_state(lambda pool: max(pool.overflow(), 0)),
+)
+metrics.gauge(
+    "db_pool_idle", "Idle connections available in the pool", ["pool"],
+    callback=lambda: _pool_state(lambda pool: pool.checkedin()),
+)
+
+def read_only_bind(async_engine):
+    """The engine as used by read-only sessions (see DB_READ_ISOLATION)."""
+    if settings.DB_READ_ISOLATION == "autocommit":
+        return async_engine.execution_options(isolation_level="AUTOCOMMIT")
+    if settings.DB_READ_ISOLATION == "read_only" and async_engine.dialect.name == "postgresql":
+        return async_engine.execution_options(postgresql_readonly=True)
+    return async_engine
+
 
 # Create Async Session Factory
 SessionLocal = sessionmaker(
@@ -21,17 +114,225 @@ SessionLocal = sessionmaker(
     expire_on_commit=False
 )
 
+# Read-only session factories: the primary (for pinned clients / no replicas) and each replica
+ReadSessionLocal = sessionmaker(
+    autocommit=False, autoflush=False, bind=read_only_bind(engine), class_=AsyncSession, expire_on_commit=False
+)
+ReplicaSessionLocals = [
+    sessionmaker(autocommit=False, autoflush=False, bind=read_only_bind(e), class_=AsyncSession, expire_on_commit=False,
+                 info={"replica": True})
+    for e in replica_engines
+]
+
+
+@asynccontextmanager
+async def primary_read_session(session: AsyncSession) -> AsyncIterator[AsyncSession]:
+    """
+    ``session`` itself, or a read-only primary session while ``session``
+    reads from a replica. Shared caches are filled through it: a replica
+    still behind a commit would put the rows that commit just invalidated
+    back in the cache, for every client and the whole TTL.
+    """
+    if not session.info.get("replica"):
+        yield session
+        return
+    async with ReadSessionLocal() as primary:
+        yield primary
+
+
 # Base class for models
 Base = declarative_base()
 
-# Dependency for FastAPI routes
-async def get_db():
+
+class ReplicaRouter:
+    """Picks the replica session factory for each read-only request."""
+
+    def __init__(self, engines: list, session_factories: list, selection: str = "round_robin"):
+        self.engines = engines
+        self.session_factories = session_factories
+        self.selection = selection
+        self._counter = itertools.count()
+
+    def pick(self):
+        if self.selection == "least_connections":
+            index = min(range(len(self.engines)), key=lambda i: self.engines[i].pool.checkedout())
+        else:
+            index = next(self._counter) % len(self.engines)
+        return self.session_factories[index]
+
+
+replica_router = ReplicaRouter(replica_engines, ReplicaSessionLocals, settings.DB_REPLICA_SELECTION)
+
+
+class ReadYourWritesGuard:
+    """
+    Pins a client to the primary for ``READ_YOUR_WRITES_SECONDS`` after it
+    writes, so it never reads its own change back from a lagging replica.
+
+    Clients are identified by a hash of their Authorization header. Pins
+    live in a cache namespace, so they are seen by every worker when the
+    cache backend is shared (sqlite/tiered).
+    """
+
+    NAMESPACE = "read_your_writes"
+
+    def __init__(self, seconds: int):
+        self.cache = cache_manager
+        self.enabled = seconds > 0
+        if self.enabled:
+            self.cache.register_namespace(
+                self.NAMESPACE, CacheNamespaceConfig(ttl=seconds, maxsize=100_000, weigher="count")
+            )
+
+    @staticmethod
+    def client_key(request: Request) -> str | None:
+        authorization = request.headers.get("authorization")
+        if not authorization:
+            return None
+        return hashlib.blake2b(authorization.encode(), digest_size=16).hexdigest()
+
+    def pin(self, request: Request):
+        key = self.client_key(request)
+        if self.enabled and key is not None:
+            self.cache.set(self.NAMESPACE, key, True)
+
+    async def is_pinned(self, request: Request) -> bool:
+        key = self.client_key(request)
+        return self.enabled and key is not None and await self.cache.aget(self.NAMESPACE, key) is not None
+
+
+read_your_writes = ReadYourWritesGuard(settings.READ_YOUR_WRITES_SECONDS if replica_engines else 0)
+
+
+
+class DBStats:
+    """
+    Database work done while serving one request. Depending on the FastAPI
+    version, the final COMMIT of get_db may run after the response (and this
+    header) has been sent, in which case it is not included.
+    """
+
+    __slots__ = ("statements", "flushes", "round_trips")
+
+    def __init__(self):
+        self.statements = 0
+        self.flushes = 0
+        self.round_trips = 0   # Statements plus physical BEGIN / COMMIT / ROLLBACK (approximate)
+
+    def header_value(self) -> str:
+        return f"statements={self.statements}; flushes={self.flushes}; round_trips={self.round_trips}"
+
+
+request_db_stats: ContextVar[DBStats | None] = ContextVar("request_db_stats", default=None)
+
+
+def _in_transaction_mode(conn) -> bool:
+    return conn.get_execution_options().get("isolation_level") != "AUTOCOMMIT"
+
+
+def _count_round_trip():
+    stats = request_db_stats.get()
+    if stats is not None:
+        stats.round_trips += 1
+
+
+# Statement counters fire on every query: only hooked up when the header is on (profiling)
+if settings.DB_STATS_HEADER:
+    @event.listens_for(Engine, "before_cursor_execute")
+    def _count_statement(conn, cursor, statement, parameters, context, executemany):
+        stats = request_db_stats.get()
+        if stats is not None:
+            stats.statements += 1
+            stats.round_trips += 1
+
+    @event.listens_for(Engine, "begin")
+    def _count_begin(conn):
+        if _in_transaction_mode(conn):
+            conn.info["transaction_open"] = True
+            _count_round_trip()
+
+    @event.listens_for(Engine, "commit")
+    @event.listens_for(Engine, "rollback")
+    def _count_end(conn):
+        if conn.info.pop("transaction_open", False):
+            _count_round_trip()
+
+    @event.listens_for(Pool, "reset")
+    def _count_reset(dbapi_connection, connection_record, reset_state):
+        # A transaction still open when the connection is released is rolled back by the pool
+        if connection_record.info.pop("transaction_open", False):
+            _count_round_trip()
+
+
+@event.listens_for(Session, "after_flush")
+def _track_flush(session, flush_context):
+    session.info["has_writes"] = True
+    stats = request_db_stats.get()
+    if stats is not None:
+        stats.flushes += 1
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_execute(orm_execute_state):
+    # Bulk UPDATE/DELETE/INSERT and raw SQL bypass the flush
+    if not orm_execute_state.is_select:
+        orm_execute_state.session.info["has_writes"] = True
+
+
+def after_commit(session: AsyncSession, callback: Callable[[], None]):
+    """
+    Run ``callback`` once the session's transaction commits; dropped if it
+    rolls back. For side effects other requests must not see before the data
+    is durable (cache invalidation, in-memory index updates, revocations):
+    done inside the transaction, a concurrent read could re-cache the old
+    rows before the commit.
+    """
+    session.info.setdefault("after_commit", []).append(callback)
+
+
+@event.listens_for(Session, "after_commit")
+def _run_after_commit(session):
+    for callback in session.info.pop("after_commit", []):
+        try:
+            callback()
+        except Exception as e:
+            logger.warning(f"Post-commit callback failed: {e}")
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_after_commit(session):
+    session.info.pop("after_commit", None)
+
+
+def has_writes(session: AsyncSession) -> bool:
+    """Whether the session wrote anything (or has unflushed changes) since it began."""
+    return bool(session.info.get("has_writes") or session.new or session.dirty or session.deleted)
+
+
+# Dependency for FastAPI routes. Commits only when the request wrote
+# something: a read-only request just releases its connection.
+async def get_db(request: Request):
     session = SessionLocal()
     try:
         yield session
-        await session.commit()
+        if has_writes(session):
+            await session.commit()
+            read_your_writes.pin(request)
     except Exception:
         await session.rollback()
         raise
     finally:
         await session.close()
+
+# Dependency for read-only routes: a replica session when replicas are
+# configured and the client has not written recently, else the primary.
+# Sessions run per DB_READ_ISOLATION and are never committed.
+async def get_read_db(request: Request):
+    if replica_engines and not await read_your_writes.is_pinned(request):
+        session = replica_router.pick()()
+    else:
+        session = ReadSessionLocal()
+    try:
+        yield session
+    finally:
+        await session.close()
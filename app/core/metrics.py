@@ -0,0 +1,341 @@
+"""
+Minimal Prometheus-style metrics registry.
+
+Counters, gauges and histograms are plain dicts keyed by label values.
+They take no lock, so they are only updated and read on the event loop
+thread: scrapes go through ``arender``, which copies this worker's samples
+on the loop before any file I/O moves to a thread.
+
+Usage:
+    from app.core.metrics import metrics
+
+    hits = metrics.counter("cache_hits_total", "Cache hits", ["namespace"])
+    hits.inc("products_list")
+
+    await metrics.arender()   # Prometheus text exposition format
+
+With several uvicorn workers, set ``METRICS_MULTIPROC_DIR``: each worker
+periodically writes a snapshot file there, and ``render()`` merges the
+snapshots of every worker so a scrape of any worker sees the whole server.
+Counters and histograms of workers that have exited are folded into one
+aggregate file and their snapshots deleted, so restarts don't pile up files.
+"""
+
+from contextlib import contextmanager
+from typing import Callable, Iterable, Sequence
+from app.core.config import settings
+import asyncio
+import json
+import math
+import os
+import logging
+
+try:
+    import fcntl
+except ImportError:  # Not POSIX: snapshots of exited workers are kept (and merged) as they are
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Latency buckets in seconds (sub-millisecond cache loads up to slow queries)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def _key(self, labelvalues: tuple) -> tuple[str, ...]:
+        if len(labelvalues) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        return tuple(str(value) for value in labelvalues)
+
+    def get(self, *labelvalues) -> float:
+        return self._values.get(self._key(labelvalues), 0.0)
+
+    def samples(self) -> list[tuple[str, tuple[str, ...], float]]:
+        """(sample name, label values, value) triples."""
+        return [(self.name, key, value) for key, value in self._values.items()]
+
+
+class Counter(Metric):
+    type_name = "counter"
+
+    def inc(self, *labelvalues, amount: float = 1.0):
+        key = self._key(labelvalues)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(Metric):
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 callback: Callable[[], dict[tuple, float]] | None = None):
+        super().__init__(name, documentation, labelnames)
+        # Optional callback returning {label values: value}, read at collection time
+        self.callback = callback
+
+    def set(self, *labelvalues, value: float):
+        self._values[self._key(labelvalues)] = value
+
+    def inc(self, *labelvalues, amount: float = 1.0):
+        key = self._key(labelvalues)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, *labelvalues, amount: float = 1.0):
+        self.inc(*labelvalues, amount=-amount)
+
+    def samples(self) -> list[tuple[str, tuple[str, ...], float]]:
+        if self.callback is not None:
+            for labelvalues, value in self.callback().items():
+                self._values[self._key(tuple(labelvalues))] = value
+        return super().samples()
+
+
+class Histogram(Metric):
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # label values -> [count per bucket..., sum]
+        self._series: dict[tuple[str, ...], list[float]] = {}
+
+    def observe(self, *labelvalues, value: float):
+        key = self._key(labelvalues)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = [0.0] * (len(self.buckets) + 1)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[i] += 1
+                break
+        series[-1] += value
+
+    def samples(self) -> list[tuple[str, tuple[str, ...], float]]:
+        samples = []
+        for key, series in self._series.items():
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                le = "+Inf" if bound == math.inf else repr(bound)
+                samples.append((f"{self.name}_bucket", key + (le,), cumulative))
+            samples.append((f"{self.name}_sum", key, series[-1]))
+            samples.append((f"{self.name}_count", key, cumulative))
+        return samples
+
+    def label_names_for(self, sample_name: str) -> tuple[str, ...]:
+        if sample_name.endswith("_bucket"):
+            return self.labelnames + ("le",)
+        return self.labelnames
+
+
+class MetricsRegistry:
+    """Holds every metric of the process and renders / aggregates them."""
+
+    def __init__(self, multiproc_dir: str = ""):
+        self.multiproc_dir = multiproc_dir
+        self._metrics: dict[str, Metric] = {}
+
+    def _register(self, metric: Metric) -> Metric:
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+              callback: Callable[[], dict[tuple, float]] | None = None) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames, callback))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def snapshot(self) -> dict[str, list]:
+        """This process's samples: {metric name: [[sample name, labels, value], ...]}."""
+        return {
+            name: [[sample, list(labels), value] for sample, labels, value in metric.samples()]
+            for name, metric in self._metrics.items()
+        }
+
+    # --- Multiprocess aggregation ---
+
+    # Counters and histograms of exited workers, summed
+    AGGREGATE_FILE = "metrics_exited.json"
+
+    def _snapshot_path(self, pid: int) -> str:
+        return os.path.join(self.multiproc_dir, f"metrics_{pid}.json")
+
+    def flush(self, snapshot: dict[str, list] | None = None):
+        """Write this worker's snapshot (taken now by default) atomically; no-op without a multiprocess dir."""
+        if not self.multiproc_dir:
+            return
+        os.makedirs(self.multiproc_dir, exist_ok=True)
+        _write_json(self._snapshot_path(os.getpid()), snapshot if snapshot is not None else self.snapshot())
+
+    async def run_flusher(self, interval: float):
+        """Background task: keep this worker's snapshot file fresh."""
+        while True:
+            try:
+                self.flush()
+            except OSError as e:
+                logger.warning(f"Metrics flush failed: {e}")
+            await asyncio.sleep(interval)
+
+    def _snapshot_files(self) -> list[tuple[str, bool]]:
+        """(path, worker alive) of every snapshot in the directory, the aggregate counting as exited."""
+        files = []
+        for filename in os.listdir(self.multiproc_dir):
+            if filename == self.AGGREGATE_FILE:
+                files.append((os.path.join(self.multiproc_dir, filename), False))
+            elif filename.startswith("metrics_") and filename.endswith(".json"):
+                pid = int(filename[len("metrics_"):-len(".json")])
+                files.append((os.path.join(self.multiproc_dir, filename), _pid_alive(pid)))
+        return files
+
+    @contextmanager
+    def _directory_lock(self, exclusive: bool):
+        """Readers share the lock; folding takes it exclusively so a merge never counts a worker twice."""
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(self.multiproc_dir, "metrics.lock"), "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _fold_exited_workers(self):
+        """Add exited workers' counters and histograms to the aggregate file and delete their snapshots."""
+        if fcntl is None:
+            return
+        aggregate_path = os.path.join(self.multiproc_dir, self.AGGREGATE_FILE)
+        exited = [path for path, alive in self._snapshot_files() if not alive and path != aggregate_path]
+        if not exited:
+            return
+        with self._directory_lock(exclusive=True):
+            folded = [path for path in exited if os.path.exists(path)]   # Not folded by another worker meanwhile
+            if not folded:
+                return
+            totals = self._merge([aggregate_path, *folded], exited=folded)
+            _write_json(aggregate_path, {
+                name: [[sample, list(labels), value] for (sample, labels), value in series.items()]
+                for name, series in totals.items()
+            })
+            for path in folded:
+                os.remove(path)
+        logger.info(f"Folded metrics of {len(folded)} exited worker(s)")
+
+    def _merge(self, paths: Iterable[str], exited: Iterable[str]) -> dict[str, dict[tuple, float]]:
+        """
+        Sum the samples of the snapshot files. Gauges describe current state,
+        so those of ``exited`` workers are left out.
+        """
+        exited = set(exited)
+        merged: dict[str, dict[tuple, float]] = {}
+        for path in paths:
+            try:
+                with open(path) as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError):
+                continue
+            for name, samples in snapshot.items():
+                metric = self._metrics.get(name)
+                if metric is None or (isinstance(metric, Gauge) and path in exited):
+                    continue
+                series = merged.setdefault(name, {})
+                for sample, labels, value in samples:
+                    key = (sample, tuple(labels))
+                    series[key] = series.get(key, 0.0) + value
+        return merged
+
+    def _collect(self, snapshot: dict[str, list]) -> dict[str, dict[tuple, float]]:
+        """Samples to expose from this worker's ``snapshot``, summed across workers in multiprocess mode."""
+        if not self.multiproc_dir:
+            return {
+                name: {(sample, tuple(labels)): value for sample, labels, value in samples}
+                for name, samples in snapshot.items()
+            }
+
+        self.flush(snapshot)
+        try:
+            self._fold_exited_workers()
+        except OSError as e:
+            logger.warning(f"Folding metrics of exited workers failed: {e}")
+        with self._directory_lock(exclusive=False):
+            files = self._snapshot_files()
+            return self._merge([path for path, _ in files], exited=[path for path, alive in files if not alive])
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4). Call it on the event loop thread."""
+        return self._exposition(self._collect(self.snapshot()))
+
+    async def arender(self) -> str:
+        """
+        ``render`` for the scrape endpoint: this worker's samples are copied
+        on the event loop, where they change; reading and merging the other
+        workers' snapshot files runs on a thread.
+        """
+        snapshot = self.snapshot()
+        if not self.multiproc_dir:
+            return self._exposition(self._collect(snapshot))
+        return await asyncio.to_thread(lambda: self._exposition(self._collect(snapshot)))
+
+    def _exposition(self, collected: dict[str, dict[tuple, float]]) -> str:
+        lines = []
+        for name, series in collected.items():
+            metric = self._metrics[name]
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.type_name}")
+            for (sample, labels), value in series.items():
+                labelnames = (
+                    metric.label_names_for(sample) if isinstance(metric, Histogram) else metric.labelnames
+                )
+                label_str = ",".join(
+                    f'{label}="{_escape(value_)}"' for label, value_ in zip(labelnames, labels)
+                )
+                lines.append(f"{sample}{{{label_str}}} {_format(value)}" if label_str else f"{sample} {_format(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _write_json(path: str, data):
+    """Replace ``path`` atomically (readers never see a partial file)."""
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(int(value)) if float(value).is_integer() else repr(value)
+
+
+# Singleton instance
+metrics = MetricsRegistry(settings.METRICS_MULTIPROC_DIR)
@@ -0,0 +1,43 @@
+"""
+Opaque cursors for keyset pagination.
+
+A cursor encodes the sort key of the last row of a page; the next page is
+``WHERE (sort key) > cursor`` (or ``<`` for descending order), which uses an
+index and costs the same at any depth, unlike ``OFFSET``.
+
+Usage:
+    from app.core.pagination import encode_cursor, decode_cursor
+
+    next_cursor = encode_cursor(last.created_at, last.id)
+    created_at, order_id = decode_cursor(after, datetime, int)
+"""
+
+from datetime import datetime
+from fastapi import HTTPException
+import base64
+import json
+
+# Response header carrying the cursor of the next page (absent on the last page)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(*values) -> str:
+    """Encode a sort key as a URL-safe token."""
+    payload = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str, *types: type) -> tuple:
+    """Decode a token from encode_cursor(), converting each value to ``types``. Invalid tokens are a 400."""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        payload = json.loads(raw)
+        if not isinstance(payload, list) or len(payload) != len(types):
+            raise ValueError("wrong cursor shape")
+        return tuple(
+            datetime.fromisoformat(value) if type_ is datetime else type_(value)
+            for type_, value in zip(types, payload)
+        )
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
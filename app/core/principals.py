@@ -0,0 +1,112 @@
+"""
+Authenticated principals without a per-request user lookup.
+
+Access tokens carry the user id and the fields routes use (``uid``,
+``is_active``, ``is_superuser``, ``full_name``), so ``get_current_user``
+builds the user from the token and a short-TTL ``principals`` cache entry
+keyed by user id, not from the database.
+
+Token claims are fixed until the token expires, so changes to a user are
+made visible explicitly: ``revoke_user_tokens`` rejects every token issued
+so far (the user logs in again and gets current claims) and drops the
+cached principal. ``revoke_token`` rejects a single token (logout). Both
+live in the ``token_revocations`` cache namespace for the lifetime of a
+token; ``settings.TOKEN_REVOCATION`` turns the checks off.
+
+Claims stand in for the user row whenever revocation is on
+(``claims_are_current()``); with it off, ``get_current_user`` reads the user
+row on every request, as before. Revocations are only as shared as
+``CACHE_BACKEND``: with the default per-worker ``memory`` backend, a logout
+or deactivation only applies in the worker that handled it, and other
+workers accept the token until it expires. Run several workers with a
+shared backend (sqlite, tiered).
+
+Usage:
+    from app.core.principals import claims_are_current, principal_claims, get_principal, revoke_user_tokens
+
+    token = create_access_token(user.email, claims=principal_claims(user))
+
+    if claims_are_current():
+        user = await get_principal(payload) # Transient User, or None for tokens without claims
+    revoke_user_tokens(user.id)       # Once a deactivation or privilege change has committed
+"""
+
+from typing import Optional
+from app.core.cache import cache_manager
+from app.core.config import settings
+from app.models.user import User
+import time
+
+PRINCIPALS_NAMESPACE = "principals"
+REVOCATIONS_NAMESPACE = "token_revocations"
+
+# Fields of the cached principal, also carried as token claims (besides "sub", the email)
+PRINCIPAL_FIELDS = ("uid", "full_name", "is_active", "is_superuser")
+
+
+def claims_are_current() -> bool:
+    """Whether token claims stand in for the user row: while revocations are enforced."""
+    return settings.TOKEN_REVOCATION
+
+
+def principal_claims(user: User) -> dict:
+    return {
+        "uid": user.id, "full_name": user.full_name,
+        "is_active": bool(user.is_active), "is_superuser": bool(user.is_superuser),
+    }
+
+
+def cache_principal(user: User):
+    """Cache a user's current principal (e.g. freshly loaded at login)."""
+    cache_manager.set(PRINCIPALS_NAMESPACE, str(user.id), {"email": user.email, **principal_claims(user)})
+
+
+def invalidate_principal(user_id: int):
+    cache_manager.invalidate_key(PRINCIPALS_NAMESPACE, str(user_id))
+
+
+async def get_principal(payload: dict) -> Optional[User]:
+    """
+    The user a decoded token stands for, as a transient ``User`` (never added
+    to a session). None for tokens issued without principal claims.
+    """
+    user_id = payload.get("uid")
+    if user_id is None:
+        return None
+    principal = await cache_manager.aget(PRINCIPALS_NAMESPACE, str(user_id))
+    if principal is None:
+        principal = {"email": payload["sub"], **{field: payload.get(field) for field in PRINCIPAL_FIELDS}}
+        cache_manager.set(PRINCIPALS_NAMESPACE, str(user_id), principal)
+    return User(
+        id=principal["uid"], email=principal["email"], full_name=principal["full_name"],
+        is_active=principal["is_active"], is_superuser=principal["is_superuser"],
+    )
+
+
+def revoke_token(payload: dict):
+    """Reject this token from now on (logout). Tokens without a jti cannot be revoked."""
+    jti = payload.get("jti")
+    if settings.TOKEN_REVOCATION and jti:
+        cache_manager.set(REVOCATIONS_NAMESPACE, f"token:{jti}", True)
+
+
+def revoke_user_tokens(user_id: int):
+    """
+    Reject every token issued to a user until now, and drop the cached
+    principal. Call it after the change it publishes has committed.
+    """
+    if settings.TOKEN_REVOCATION:
+        cache_manager.set(REVOCATIONS_NAMESPACE, f"user:{user_id}", time.time())
+    invalidate_principal(user_id)
+
+
+async def is_revoked(payload: dict) -> bool:
+    if not settings.TOKEN_REVOCATION:
+        return False
+    keys = [f"token:{payload.get('jti')}", f"user:{payload.get('uid')}"]
+    found = await cache_manager.aget_many(REVOCATIONS_NAMESPACE, keys)
+    if keys[0] in found:
+        return True
+    # Issued before the cutoff (both have sub-second resolution)
+    revoked_before = found.get(keys[1])
+    return revoked_before is not None and payload.get("iat", 0) < revoked_before
@@ -0,0 +1,272 @@
+"""
+Product search: tokenization, backend selection and an in-memory index.
+
+Two backends, chosen by ``settings.SEARCH_BACKEND``:
+
+- ``postgres``: full-text search on an expression GIN index over
+  ``to_tsvector(name || description)`` plus a ``pg_trgm`` index on the name
+  for typo tolerance (see ``Product`` and ``ProductRepository.search_products``).
+- ``memory``: ``InMemorySearchIndex``, a per-process inverted index with the
+  same semantics (prefix matching, trigram typo matching, ranked results),
+  for SQLite and tests. Each worker keeps its own copy, updated on product
+  writes in that worker and rebuilt periodically.
+
+``auto`` (the default) picks ``postgres`` on PostgreSQL and ``memory`` otherwise.
+
+Usage:
+    from app.core.search import search_index, suggestion_index
+
+    search_index.add(product.id, product.name, product.description, product.category_id)
+    search_index.search("wirless headph")   # [(score, product_id), ...], best first
+
+    # Autocomplete over product and category names (always in memory, any backend)
+    suggestion_index.add("product", product.id, product.name)
+    suggestion_index.suggest("gal", limit=8)  # [("product", 6, "Galaxy Phone"), ...]
+"""
+
+from typing import Iterable, Optional
+from bisect import bisect_left, insort
+from app.core.config import settings
+from app.core.database import engine
+import math
+import re
+
+# Query and document terms: lowercased runs of letters and digits
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+FIELD_WEIGHTS = {"name": 2.0, "description": 1.0}
+PREFIX_MATCH_WEIGHT = 0.5       # "head" matching "headphones" counts half of an exact match
+TRIGRAM_THRESHOLD = 0.3         # Same default as pg_trgm.similarity_threshold
+MAX_TERM_EXPANSIONS = 64        # Vocabulary terms one short prefix may expand to
+MAX_SEARCH_RESULTS = 1000       # Matches considered when a search is combined with catalog filters
+
+
+def tokenize(text: str | None) -> list[str]:
+    return _TOKEN_RE.findall(text.lower()) if text else []
+
+
+def suggestion_key(text: str) -> str:
+    """Autocomplete key of a name or typed prefix: lowercased, whitespace runs collapsed to one space."""
+    return " ".join(text.lower().split())
+
+
+def prefix_tsquery(search: str) -> str | None:
+    """``to_tsquery`` text matching every search word as a prefix (``wire:* & head:*``); None if no words."""
+    tokens = tokenize(search)
+    return " & ".join(f"{token}:*" for token in tokens) if tokens else None
+
+
+def trigrams(term: str) -> set[str]:
+    """pg_trgm-style trigrams of a word (padded with two spaces in front, one behind)."""
+    padded = f"  {term} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def resolve_backend() -> str:
+    if settings.SEARCH_BACKEND != "auto":
+        return settings.SEARCH_BACKEND
+    return "postgres" if engine.dialect.name == "postgresql" else "memory"
+
+
+class InMemorySearchIndex:
+    """
+    Inverted index over product names and descriptions.
+
+    Every query word must match a document term exactly, as a prefix, or -
+    when the word matches nothing at all - by trigram similarity. A
+    document's score sums, per query word, the best (match weight x field
+    weighted term frequency x idf) of its matching terms.
+    """
+
+    def __init__(self):
+        self._postings: dict[str, dict[int, float]] = {}   # term -> {product id: weighted term frequency}
+        self._documents: dict[int, tuple[Optional[int], frozenset[str]]] = {}  # id -> (category id, terms)
+        self._vocabulary: list[str] = []                    # Sorted terms, for prefix lookups
+        self._trigram_terms: dict[str, set[str]] = {}       # trigram -> terms, for typo lookups
+        self._dirty = False
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def add(self, product_id: int, name: str | None, description: str | None, category_id: int | None = None):
+        """Index a product, replacing its previous version."""
+        self.remove(product_id)
+        frequencies: dict[str, float] = {}
+        for field, text in (("name", name), ("description", description)):
+            for token in tokenize(text):
+                frequencies[token] = frequencies.get(token, 0.0) + FIELD_WEIGHTS[field]
+        for term, frequency in frequencies.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                self._dirty = True
+            postings[product_id] = frequency
+        self._documents[product_id] = (category_id, frozenset(frequencies))
+
+    def remove(self, product_id: int):
+        document = self._documents.pop(product_id, None)
+        if document is None:
+            return
+        for term in document[1]:
+            postings = self._postings[term]
+            del postings[product_id]
+            if not postings:
+                del self._postings[term]
+                self._dirty = True
+
+    def replace(self, documents: Iterable[tuple[int, str | None, str | None, int | None]]):
+        """Rebuild from (id, name, description, category id) rows."""
+        self._postings.clear()
+        self._documents.clear()
+        for product_id, name, description, category_id in documents:
+            self.add(product_id, name, description, category_id)
+        self._dirty = True
+
+    def _refresh_lookups(self):
+        if not self._dirty:
+            return
+        self._vocabulary = sorted(self._postings)
+        self._trigram_terms = {}
+        for term in self._vocabulary:
+            for trigram in trigrams(term):
+                self._trigram_terms.setdefault(trigram, set()).add(term)
+        self._dirty = False
+
+    def _expand(self, token: str) -> dict[str, float]:
+        """Document terms a query word matches, with their match weight."""
+        expansions = {}
+        start = bisect_left(self._vocabulary, token)
+        for term in self._vocabulary[start:start + MAX_TERM_EXPANSIONS]:
+            if not term.startswith(token):
+                break
+            expansions[term] = 1.0 if term == token else PREFIX_MATCH_WEIGHT
+        if expansions:
+            return expansions
+
+        # Typo tolerance: terms sharing enough trigrams with the word
+        token_trigrams = trigrams(token)
+        shared: dict[str, int] = {}
+        for trigram in token_trigrams:
+            for term in self._trigram_terms.get(trigram, ()):
+                shared[term] = shared.get(term, 0) + 1
+        for term, count in shared.items():
+            similarity = count / (len(token_trigrams) + len(trigrams(term)) - count)
+            if similarity >= TRIGRAM_THRESHOLD:
+                expansions[term] = similarity * PREFIX_MATCH_WEIGHT
+        return expansions
+
+    def search(self, query: str, category_id: int | None = None) -> list[tuple[float, int]]:
+        """All matching products as (score, product id), best first (ties by id)."""
+        self._refresh_lookups()
+        tokens = tokenize(query)
+        if not tokens or not self._documents:
+            return []
+
+        total = len(self._documents)
+        scores: dict[int, float] | None = None
+        for token in dict.fromkeys(tokens):
+            token_scores: dict[int, float] = {}
+            for term, weight in self._expand(token).items():
+                postings = self._postings[term]
+                idf = math.log(1 + total / len(postings))
+                for product_id, frequency in postings.items():
+                    score = weight * frequency * idf
+                    if score > token_scores.get(product_id, 0.0):
+                        token_scores[product_id] = score
+            # Every word must match
+            if scores is None:
+                scores = token_scores
+            else:
+                scores = {
+                    product_id: score + token_scores[product_id]
+                    for product_id, score in scores.items() if product_id in token_scores
+                }
+            if not scores:
+                return []
+
+        if category_id is not None:
+            scores = {
+                product_id: score for product_id, score in scores.items()
+                if self._documents[product_id][0] == category_id
+            }
+        return sorted(((score, product_id) for product_id, score in scores.items()), key=lambda r: (-r[0], r[1]))
+
+
+class SuggestionIndex:
+    """
+    Sorted arrays of name keys for prefix lookups by bisect.
+
+    A name is keyed once from its start ("galaxy phone") and once from each
+    later word ("phone"), in two arrays, so typing any word of a name finds
+    it and names that start with the typed text come first. A lookup is a
+    binary search plus a scan of ``limit`` keys per array; no database access.
+    """
+
+    def __init__(self):
+        # [name starts, later word starts]: sorted (key, kind, id)
+        self._keys: tuple[list, list] = ([], [])
+        self._names: dict[tuple[str, int], str] = {}     # (kind, id) -> display name
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    @staticmethod
+    def _word_keys(name: str) -> tuple[str, set[str]]:
+        key = suggestion_key(name)
+        return key, {key[match.start():] for match in _TOKEN_RE.finditer(key) if match.start() > 0}
+
+    def add(self, kind: str, item_id: int, name: str | None):
+        """Index a name, replacing the previous name of the same item."""
+        self.remove(kind, item_id)
+        if not name:
+            return
+        self._names[(kind, item_id)] = name
+        whole, words = self._word_keys(name)
+        insort(self._keys[0], (whole, kind, item_id))
+        for key in words:
+            insort(self._keys[1], (key, kind, item_id))
+
+    def remove(self, kind: str, item_id: int):
+        name = self._names.pop((kind, item_id), None)
+        if name is None:
+            return
+        whole, words = self._word_keys(name)
+        for keys, key in [(self._keys[0], whole)] + [(self._keys[1], key) for key in words]:
+            position = bisect_left(keys, (key, kind, item_id))
+            if position < len(keys) and keys[position] == (key, kind, item_id):
+                del keys[position]
+
+    def replace(self, items: Iterable[tuple[str, int, str | None]]):
+        """Rebuild from (kind, id, name) items."""
+        self._names = {(kind, item_id): name for kind, item_id, name in items if name}
+        name_keys, word_keys = [], []
+        for (kind, item_id), name in self._names.items():
+            whole, words = self._word_keys(name)
+            name_keys.append((whole, kind, item_id))
+            word_keys.extend((key, kind, item_id) for key in words)
+        name_keys.sort()
+        word_keys.sort()
+        self._keys = (name_keys, word_keys)
+
+    def suggest(self, prefix: str, limit: int = 8) -> list[tuple[str, int, str]]:
+        """
+        Up to ``limit`` (kind, id, name) with a word starting with ``prefix``:
+        names starting with it first, each group in alphabetical order.
+        """
+        prefix = suggestion_key(prefix)
+        if not prefix or limit <= 0:
+            return []
+        found: dict[tuple[str, int], None] = {}
+        for keys in self._keys:
+            start = bisect_left(keys, (prefix,))
+            for key, kind, item_id in keys[start:start + limit]:
+                if len(found) == limit or not key.startswith(prefix):
+                    break
+                found[(kind, item_id)] = None
+        return [(kind, item_id, self._names[(kind, item_id)]) for kind, item_id in found]
+
+
+# Backend in use, and the singleton index (filled on startup when that is "memory")
+search_backend = resolve_backend()
+search_index = InMemorySearchIndex()
+suggestion_index = SuggestionIndex()
@@ -1,8 +1,11 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 from app.core.config import settings
-from app.core.database import engine, Base
+from app.core.database import engine, Base, DBStats, request_db_stats
+from app.core.metrics import metrics
+import asyncio
 import os
 
 app = FastAPI(title=settings.PROJECT_NAME)
@@ -15,6 +18,7 @@ if settings.BACKEND_CORS_ORIGINS:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["ETag", "X-Next-Cursor"],
     )
 else:
     # Fallback to allow everything if not configured (dev mode)
@@ -24,10 +28,24 @@ else:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["ETag", "X-Next-Cursor"],
     )
 
+# Per-request database work, reported in the X-DB-Stats response header
+if settings.DB_STATS_HEADER:
+    @app.middleware("http")
+    async def db_stats_header(request: Request, call_next):
+        stats = DBStats()
+        token = request_db_stats.set(stats)
+        try:
+            response = await call_next(request)
+        finally:
+            request_db_stats.reset(token)
+        response.headers["X-DB-Stats"] = stats.header_value()
+        return response
+
 # Import all models so Base.metadata knows about them
-from app.models import user, product, cart, order, address, coupon, shipment, payment
+from app.models import user, product, cart, order, address, coupon, shipment, payment, idempotency
 
 from app.api.v1.endpoints import auth, users, products, cart as cart_router, orders, payments, address as address_router, shipping, offers
 
@@ -52,12 +70,47 @@ async def startup():
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
 
+    # Per-worker metric snapshots for multi-worker aggregation
+    if settings.METRICS_MULTIPROC_DIR:
+        app.state.metrics_flusher = asyncio.create_task(metrics.run_flusher(settings.METRICS_FLUSH_INTERVAL))
+
+    # In-memory catalog snapshot and autocomplete index (and product search index, when
+    # there is no PostgreSQL full-text search)
+    from app.services.product_service import rebuild_catalog_indexes, run_catalog_index_refresher
+    await rebuild_catalog_indexes()
+    app.state.catalog_index_refresher = asyncio.create_task(
+        run_catalog_index_refresher(settings.SEARCH_INDEX_REFRESH_INTERVAL)
+    )
+
+    # Write-behind of the in-memory cart engine
+    if settings.CART_ENGINE == "memory":
+        from app.services.cart_engine import run_cart_flusher
+        app.state.cart_flusher = asyncio.create_task(run_cart_flusher(settings.CART_FLUSH_INTERVAL))
+
+    # Expire checkout Idempotency-Keys
+    from app.services.order_service import run_idempotency_key_purger
+    app.state.idempotency_purger = asyncio.create_task(run_idempotency_key_purger())
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Write back pending in-memory cart changes."""
+    if settings.CART_ENGINE == "memory":
+        from app.services.cart_engine import cart_engine
+        await cart_engine.flush()
+
 @app.get("/")
 def read_root():
     return {"message": "Welcome to E-commerce API - PostgreSQL"}
 
+# Both run on the event loop (async def), the only thread that changes the stats they read
+
 @app.get("/cache/stats")
-def cache_stats():
-    """View cache statistics (sizes, TTLs)."""
+async def cache_stats():
+    """View cache statistics (sizes, TTLs, hit/miss counters)."""
     from app.core.cache import cache_manager
-    return cache_manager.stats()
+    return await cache_manager.astats()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def read_metrics():
+    """Prometheus scrape endpoint (aggregated across workers when METRICS_MULTIPROC_DIR is set)."""
+    return PlainTextResponse(await metrics.arender(), media_type="text/plain; version=0.0.4")
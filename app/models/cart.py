@@ -1,10 +1,12 @@
-from sqlalchemy import Column, Integer, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
 
 class Cart(Base):
     __tablename__ = "carts"
+    # Fetch server-generated columns (created_at, updated_at) via RETURNING instead of a reload
+    __mapper_args__ = {"eager_defaults": True}
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), unique=True, nullable=False)
@@ -16,6 +18,8 @@ class Cart(Base):
 
 class CartItem(Base):
     __tablename__ = "cart_items"
+    # One line per product: the conflict target of the add-to-cart upsert
+    __table_args__ = (Index("ix_cart_items_cart_id_product_id", "cart_id", "product_id", unique=True),)
 
     id = Column(Integer, primary_key=True, index=True)
     cart_id = Column(Integer, ForeignKey("carts.id"), nullable=False)
@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, String, LargeBinary, ForeignKey, DateTime, UniqueConstraint
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+class IdempotencyKey(Base):
+    """A client-supplied Idempotency-Key and the response it produced."""
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (UniqueConstraint("user_id", "key", name="uq_idempotency_keys_user_id_key"),)
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    key = Column(String(255), nullable=False)
+    request_hash = Column(String(64), nullable=False) # Body digest + cart lines digest; a different request is rejected
+    response_body = Column(LargeBinary, nullable=True) # Encoded JSON response, set when the request succeeds
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
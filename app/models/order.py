@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Enum
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Enum, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import enum
@@ -13,6 +13,10 @@ class OrderStatus(str, enum.Enum):
 
 class Order(Base):
     __tablename__ = "orders"
+    # Fetch server-generated columns (created_at, updated_at) via RETURNING instead of a reload
+    __mapper_args__ = {"eager_defaults": True}
+    # Order history: a user's orders newest first, paginated by id
+    __table_args__ = (Index("ix_orders_user_id_id", "user_id", "id"),)
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
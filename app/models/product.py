@@ -1,8 +1,23 @@
-from sqlalchemy import Boolean, Column, Integer, String, Float, ForeignKey, DateTime
+from sqlalchemy import DDL, Boolean, Column, Integer, String, Float, ForeignKey, DateTime, Index, event, literal_column
+from sqlalchemy.dialects.postgresql import REGCONFIG  # Also registers the typed to_tsvector() / to_tsquery()
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
 
+# Text search configuration: no stemming or stop words, so prefixes of product names always match
+# (inlined, not a bind parameter, so the indexed expression is immutable)
+SEARCH_CONFIG = literal_column("'simple'", REGCONFIG)
+
+def search_document(name, description):
+    """
+    Weighted tsvector of a product (name ranks above description). Queries
+    must use this exact expression to be served by ix_products_search.
+    """
+    empty = literal_column("''")
+    return func.setweight(func.to_tsvector(SEARCH_CONFIG, func.coalesce(name, empty)), literal_column("'A'")).op("||")(
+        func.setweight(func.to_tsvector(SEARCH_CONFIG, func.coalesce(description, empty)), literal_column("'B'"))
+    )
+
 class Category(Base):
     __tablename__ = "categories"
 
@@ -14,8 +29,11 @@ class Category(Base):
 
 class Product(Base):
     __tablename__ = "products"
+    # Fetch server-generated columns (created_at, updated_at) via RETURNING instead of a reload
+    __mapper_args__ = {"eager_defaults": True}
 
     id = Column(Integer, primary_key=True, index=True)
+    sku = Column(String(64), unique=True, index=True, nullable=True) # Upsert key for catalog imports
     name = Column(String(255), index=True, nullable=False)
     description = Column(String, nullable=True)
     price = Column(Float, nullable=False)
@@ -28,3 +46,16 @@ class Product(Base):
     
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    # Search indexes (PostgreSQL only; other databases use the in-memory index, see app/core/search.py)
+    __table_args__ = (
+        Index("ix_products_search", search_document(name, description), postgresql_using="gin").ddl_if(dialect="postgresql"),
+        Index("ix_products_name_trgm", name, postgresql_using="gin",
+              postgresql_ops={"name": "gin_trgm_ops"}).ddl_if(dialect="postgresql"),
+    )
+
+event.listen(
+    Base.metadata, "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
+
@@ -1,6 +1,9 @@
-from typing import Optional
+from typing import List, Optional, Tuple
+from sqlalchemy import Integer, delete, func, insert, literal, update
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload, joinedload
+from sqlalchemy.orm.attributes import set_committed_value
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.cart import Cart, CartItem
 from app.models.product import Product, Category
@@ -26,8 +29,17 @@ class CartRepository:
         cart = Cart(user_id=user_id)
         self.session.add(cart)
         await self.session.flush()
-        await self.session.refresh(cart)
-        return await self.get_cart_by_user_id(user_id)
+        # A new cart is empty: mark items loaded instead of re-selecting
+        set_committed_value(cart, "items", [])
+        return cart
+
+    async def get_cart_id(self, user_id: int) -> int:
+        """Id of the user's cart, creating the cart if needed; nothing else loaded."""
+        result = await self.session.execute(select(Cart.id).filter(Cart.user_id == user_id))
+        cart_id = result.scalar()
+        if cart_id is None:
+            cart_id = (await self.create_cart(user_id)).id
+        return cart_id
 
     async def get_cart_item(self, cart_id: int, product_id: int) -> Optional[CartItem]:
         result = await self.session.execute(
@@ -47,6 +59,55 @@ class CartRepository:
         await self.session.flush()
         return item
 
+    async def upsert_item(self, cart_id: int, product_id: int, quantity: int) -> Optional[Tuple[int, int]]:
+        """
+        Add ``quantity`` of a product to a cart line, creating the line if
+        needed, only if the product has stock for the resulting quantity. One
+        statement, so concurrent adds of the same product cannot race:
+
+            INSERT INTO cart_items (cart_id, product_id, quantity)
+            SELECT :cart_id, products.id, :quantity FROM products
+            WHERE products.id = :product_id AND products.stock_quantity >= :quantity
+            ON CONFLICT (cart_id, product_id) DO UPDATE
+            SET quantity = cart_items.quantity + excluded.quantity
+            WHERE (SELECT stock_quantity FROM products WHERE id = :product_id)
+                  >= cart_items.quantity + excluded.quantity
+            RETURNING id, quantity
+
+        Returns (item id, new quantity), or None when the product does not
+        exist or has too little stock (nothing is written).
+        """
+        stock = func.coalesce(Product.stock_quantity, 0)
+        dialect = postgresql if self.session.bind.dialect.name == "postgresql" else sqlite
+        statement = dialect.insert(CartItem).from_select(
+            ["cart_id", "product_id", "quantity"],
+            select(literal(cart_id, Integer), Product.id, literal(quantity, Integer))
+            .where(Product.id == product_id, stock >= quantity),
+        )
+        new_quantity = CartItem.quantity + statement.excluded.quantity
+        statement = statement.on_conflict_do_update(
+            index_elements=[CartItem.cart_id, CartItem.product_id],
+            set_={"quantity": new_quantity},
+            where=select(stock).where(Product.id == product_id).scalar_subquery() >= new_quantity,
+        ).returning(CartItem.id, CartItem.quantity)
+        row = (await self.session.execute(statement)).first()
+        return tuple(row) if row else None
+
+    async def get_cart_totals(self, user_id: int) -> Tuple[int, int, float]:
+        """(lines, total quantity, subtotal) of a user's cart in one aggregate query."""
+        result = await self.session.execute(
+            select(
+                func.count(CartItem.id),
+                func.coalesce(func.sum(CartItem.quantity), 0),
+                func.coalesce(func.sum(CartItem.quantity * Product.price), 0.0),
+            )
+            .join(Cart, Cart.id == CartItem.cart_id)
+            .join(Product, Product.id == CartItem.product_id)
+            .filter(Cart.user_id == user_id)
+        )
+        count, quantity, subtotal = result.one()
+        return count, int(quantity), float(subtotal)
+
     async def update_item_quantity(self, item: CartItem, quantity: int) -> CartItem:
         item.quantity = quantity
         self.session.add(item)
@@ -58,6 +119,34 @@ class CartRepository:
         await self.session.flush()
         
     async def clear_cart(self, cart_id: int):
-        from sqlalchemy import delete
         await self.session.execute(delete(CartItem).where(CartItem.cart_id == cart_id))
         await self.session.flush()
+
+    async def get_cart_lines(self, user_id: int) -> Tuple[int, List[Tuple[int, int, int]]]:
+        """(cart id, [(item id, product id, quantity), ...]) of a user, creating the cart if needed; no products loaded."""
+        result = await self.session.execute(select(Cart.id).filter(Cart.user_id == user_id))
+        cart_id = result.scalar()
+        if cart_id is None:
+            return (await self.create_cart(user_id)).id, []
+        result = await self.session.execute(
+            select(CartItem.id, CartItem.product_id, CartItem.quantity)
+            .filter(CartItem.cart_id == cart_id).order_by(CartItem.id)
+        )
+        return cart_id, [tuple(row) for row in result.all()]
+
+    async def apply_item_changes(self, inserts: List[dict], updates: List[dict], deletes: List[int]) -> List[int]:
+        """
+        Write a batch of cart line changes, one statement per kind: DELETE by
+        ids, an executemany UPDATE by primary key, and a multi-row INSERT.
+        Returns the new item ids in the order of ``inserts``.
+        """
+        if deletes:
+            await self.session.execute(delete(CartItem).where(CartItem.id.in_(deletes)))
+        if updates:
+            await self.session.execute(update(CartItem), updates)
+        if not inserts:
+            return []
+        result = await self.session.execute(
+            insert(CartItem).returning(CartItem.id, sort_by_parameter_order=True), inserts
+        )
+        return list(result.scalars().all())
@@ -0,0 +1,46 @@
+from typing import Optional
+from datetime import datetime
+from sqlalchemy import delete, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.future import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.idempotency import IdempotencyKey
+
+class IdempotencyRepository:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def claim(self, user_id: int, key: str, request_hash: str) -> Optional[int]:
+        """
+        Record the key with INSERT ... ON CONFLICT DO NOTHING RETURNING id.
+        Returns the new row id, or None when the key is already taken.
+
+        The row is part of the request's transaction: a concurrent request
+        with the same key blocks on the unique index until this one commits
+        (then sees the key) or rolls back (then claims it itself).
+        """
+        insert = postgresql.insert if self.session.bind.dialect.name == "postgresql" else sqlite.insert
+        result = await self.session.execute(
+            insert(IdempotencyKey)
+            .values(user_id=user_id, key=key, request_hash=request_hash)
+            .on_conflict_do_nothing(index_elements=["user_id", "key"])
+            .returning(IdempotencyKey.id)
+        )
+        return result.scalar_one_or_none()
+
+    async def get(self, user_id: int, key: str) -> Optional[IdempotencyKey]:
+        result = await self.session.execute(
+            select(IdempotencyKey).filter(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key)
+        )
+        return result.scalars().first()
+
+    async def save_response(self, key_id: int, response_body: bytes):
+        await self.session.execute(
+            update(IdempotencyKey).where(IdempotencyKey.id == key_id).values(response_body=response_body)
+        )
+
+    async def purge_expired(self, created_before: datetime) -> int:
+        result = await self.session.execute(
+            delete(IdempotencyKey).where(IdempotencyKey.created_at < created_before)
+        )
+        return result.rowcount
@@ -1,6 +1,8 @@
 from typing import List, Optional
+from sqlalchemy import func
 from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload, joinedload
+from sqlalchemy.orm.attributes import set_committed_value
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.order import Order, OrderItem
 from app.models.product import Product
@@ -10,23 +12,64 @@ class OrderRepository:
         self.session = session
 
     async def create_order(self, order: Order) -> Order:
+        """
+        Insert the order and its items. INSERT ... RETURNING fills in ids and
+        created_at, and the items go out as one batched INSERT. The caller
+        provides each item's product, so nothing needs reloading.
+        """
         self.session.add(order)
         await self.session.flush()
-        await self.session.refresh(order)
-        return await self.get_order(order.id)
+        # A new order has no shipment yet
+        set_committed_value(order, "shipment", None)
+        return order
 
-    async def get_orders_by_user(self, user_id: int) -> List[Order]:
-        result = await self.session.execute(
+    async def get_orders_by_user(self, user_id: int, limit: int = 20, before_id: int | None = None) -> List[Order]:
+        """Newest first; ``before_id`` is the id of the last order of the previous page."""
+        query = (
             select(Order)
             .options(
                 selectinload(Order.items).selectinload(OrderItem.product).selectinload(Product.category),
                  selectinload(Order.shipment)
             )
             .filter(Order.user_id == user_id)
-            .order_by(Order.created_at.desc())
         )
+        if before_id is not None:
+            query = query.filter(Order.id < before_id)
+        # Ids grow with created_at, and unlike timestamps they are unique
+        query = query.order_by(Order.id.desc()).limit(limit)
+        result = await self.session.execute(query)
         return result.scalars().all()
 
+    async def get_order_summaries_by_user(self, user_id: int, limit: int = 20, before_id: int | None = None) -> list:
+        """
+        Order history rows in one query: order columns plus the item count and
+        the first item's product image as correlated subqueries. No ORM
+        objects, no item or product rows.
+        """
+        item_count = (
+            select(func.count(OrderItem.id))
+            .where(OrderItem.order_id == Order.id)
+            .correlate(Order)
+            .scalar_subquery()
+        )
+        first_image_url = (
+            select(Product.image_url)
+            .join(OrderItem, OrderItem.product_id == Product.id)
+            .where(OrderItem.order_id == Order.id)
+            .order_by(OrderItem.id)
+            .limit(1)
+            .correlate(Order)
+            .scalar_subquery()
+        )
+        query = select(
+            Order.id, Order.status, Order.total_amount, Order.created_at,
+            item_count.label("item_count"), first_image_url.label("first_image_url"),
+        ).filter(Order.user_id == user_id)
+        if before_id is not None:
+            query = query.filter(Order.id < before_id)
+        result = await self.session.execute(query.order_by(Order.id.desc()).limit(limit))
+        return result.all()
+
     async def get_order(self, order_id: int) -> Optional[Order]:
         result = await self.session.execute(
             select(Order)
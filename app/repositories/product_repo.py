@@ -1,26 +1,114 @@
-from typing import List, Optional
+from typing import Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import (
+    Boolean, ColumnClause, Float, Integer, Row, and_, any_, case, cast, column, func, literal, or_, union_all, update,
+    values,
+)
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.models.product import Product, Category
-from app.schemas.product import ProductCreate, CategoryCreate, ProductUpdate
+from app.models.product import Product, Category, SEARCH_CONFIG, search_document
+from app.core.search import prefix_tsquery
+from app.schemas.product import ProductCreate, CategoryCreate, ProductUpdate, ProductBulkUpdateItem
 
 class ProductRepository:
     def __init__(self, session: AsyncSession):
         self.session = session
 
-    async def get_all_products(self, skip: int = 0, limit: int = 100, search: str | None = None, category_id: int | None = None) -> List[Product]:
+    def _inline_rows(self, name: str, columns: Sequence[ColumnClause], rows: Sequence[tuple]):
+        """
+        ``rows`` as a named FROM source for UPDATE ... FROM: a VALUES CTE on
+        PostgreSQL. SQLite has no VALUES column aliases, and pysqlite only
+        opens a transaction before statements starting with INSERT / UPDATE /
+        DELETE (a WITH ... UPDATE would commit on its own, outside the
+        request's transaction), so there it is a UNION ALL subquery.
+        """
+        if self.session.bind.dialect.name == "postgresql":
+            return values(*columns, name=name).data(rows).cte(name)
+        selects = [
+            select(*(literal(value, col.type).label(col.name) for col, value in zip(columns, row))) for row in rows
+        ]
+        return (union_all(*selects) if len(selects) > 1 else selects[0]).subquery(name)
+
+    async def get_all_products(self, skip: int = 0, limit: int = 100, category_id: int | None = None,
+                               after_id: int | None = None) -> List[Product]:
         query = select(Product)
-        if search:
-            query = query.filter(
-                Product.name.ilike(f"%{search}%") | Product.description.ilike(f"%{search}%")
-            )
+        if after_id is not None:
+            # Keyset pagination: seek past the previous page instead of OFFSET
+            query = query.filter(Product.id > after_id)
         if category_id:
             query = query.filter(Product.category_id == category_id)
         query = query.order_by(Product.id).offset(skip).limit(limit)
         result = await self.session.execute(query)
         return result.scalars().all()
 
+    @staticmethod
+    def _search_match(search: str):
+        """(WHERE clause, score) of a search, or None when it has no words."""
+        tsquery = prefix_tsquery(search)
+        if tsquery is None:
+            return None
+        document = search_document(Product.name, Product.description)
+        query_ts = func.to_tsquery(SEARCH_CONFIG, tsquery)
+        condition = or_(document.bool_op("@@")(query_ts), literal(search).bool_op("<%")(Product.name))
+        return condition, func.ts_rank(document, query_ts) + func.word_similarity(search, Product.name)
+
+    async def search_products(self, search: str, skip: int = 0, limit: int = 100, category_id: int | None = None,
+                              after: Tuple[float, int] | None = None) -> List[Tuple[Product, float]]:
+        """
+        Ranked search (PostgreSQL): every word as a prefix against ix_products_search,
+        or the whole term fuzzily against ix_products_name_trgm (typos). Results are
+        (product, score), best first; ``after`` is the (score, id) of the previous page's last row.
+        """
+        match = self._search_match(search)
+        if match is None:
+            return []
+        condition, score = match
+        query = select(Product, score).filter(condition)
+        if category_id:
+            query = query.filter(Product.category_id == category_id)
+        if after is not None:
+            after_score, after_id = after
+            query = query.filter(or_(score < after_score, and_(score == after_score, Product.id > after_id)))
+        query = query.order_by(score.desc(), Product.id).offset(skip).limit(limit)
+        result = await self.session.execute(query)
+        return [(product, rank) for product, rank in result.all()]
+
+    async def search_product_ids(self, search: str, category_id: int | None = None,
+                                 limit: int = 1000) -> List[Tuple[float, int]]:
+        """The best ``limit`` matches of a search as (score, id), for filtering in the catalog snapshot."""
+        match = self._search_match(search)
+        if match is None:
+            return []
+        condition, score = match
+        query = select(score, Product.id).filter(condition)
+        if category_id:
+            query = query.filter(Product.category_id == category_id)
+        result = await self.session.execute(query.order_by(score.desc(), Product.id).limit(limit))
+        return [tuple(row) for row in result.all()]
+
+    async def get_products_by_ids(self, product_ids: Sequence[int]) -> List[Product]:
+        """Products in the order of ``product_ids`` (missing ids are skipped)."""
+        if not product_ids:
+            return []
+        if self.session.bind.dialect.name == "postgresql":
+            # id = ANY($1): one array parameter, so one prepared statement for any number of ids
+            condition = Product.id == any_(literal(list(product_ids), ARRAY(Integer)))
+        else:
+            condition = Product.id.in_(product_ids)
+        result = await self.session.execute(select(Product).filter(condition))
+        by_id = {product.id: product for product in result.scalars().all()}
+        return [by_id[product_id] for product_id in product_ids if product_id in by_id]
+
+    async def get_index_rows(self) -> List[Row]:
+        """Every product's indexed columns, for the in-memory search index and catalog snapshot."""
+        result = await self.session.execute(
+            select(Product.id, Product.name, Product.description, Product.category_id,
+                   Product.price, Product.stock_quantity, Product.is_active, Product.created_at)
+        )
+        return result.all()
+
     async def get_product(self, product_id: int) -> Optional[Product]:
         result = await self.session.execute(
             select(Product).filter(Product.id == product_id)
@@ -29,10 +117,43 @@ class ProductRepository:
 
     async def create_product(self, product_in: ProductCreate) -> Product:
         db_product = Product(**product_in.model_dump())
+        # Category by primary key (usually already in the identity map)
+        db_product.category = await self.session.get(Category, product_in.category_id)
         self.session.add(db_product)
         await self.session.flush()
-        await self.session.refresh(db_product)
-        return await self.get_product(db_product.id)
+        return db_product
+
+    async def get_existing_skus(self, skus: Sequence[str]) -> set[str]:
+        if not skus:
+            return set()
+        result = await self.session.execute(select(Product.sku).filter(Product.sku.in_(skus)))
+        return set(result.scalars().all())
+
+    async def upsert_products(self, rows: List[dict], update_columns: Sequence[str]):
+        """
+        Insert or update many products by SKU in one statement:
+
+            INSERT INTO products (sku, name, ...) VALUES (...), (...), ...
+            ON CONFLICT (sku) DO UPDATE SET name = excluded.name, ...
+
+        New SKUs are inserted with every column of ``rows``; existing ones only
+        get ``update_columns`` (the fields the feed supplied), so a partial row
+        never resets the others to their defaults.
+
+        ``rows`` must not repeat a SKU (PostgreSQL rejects updating a row twice).
+        """
+        if not rows:
+            return
+        dialect = postgresql if self.session.bind.dialect.name == "postgresql" else sqlite
+        statement = dialect.insert(Product).values(rows)
+        statement = statement.on_conflict_do_update(
+            index_elements=[Product.sku],
+            set_={
+                **{name: statement.excluded[name] for name in update_columns if name != "sku"},
+                "updated_at": func.now(),
+            },
+        )
+        await self.session.execute(statement)
 
     async def update_product(self, product_id: int, product_in: ProductUpdate) -> Optional[Product]:
         db_product = await self.get_product(product_id)
@@ -47,6 +168,50 @@ class ProductRepository:
         await self.session.flush()
         return await self.get_product(product_id)
 
+    async def bulk_update_products(self, items: Sequence[ProductBulkUpdateItem]) -> List[Row]:
+        """
+        Apply many price / stock / active changes in one statement:
+
+            WITH changes (id, price, stock_quantity, stock_delta, is_active) AS (VALUES (...), ...)
+            UPDATE products SET
+                price = COALESCE(changes.price, products.price),
+                stock_quantity = <COALESCE(changes.stock_quantity, products.stock_quantity)
+                                  + COALESCE(changes.stock_delta, 0), floored at 0>,
+                is_active = COALESCE(changes.is_active, products.is_active)
+            FROM changes WHERE products.id = changes.id
+            RETURNING products.id, price, stock_quantity, is_active, category_id, created_at
+
+        A NULL change keeps the current value. Relative stock changes are
+        applied to the locked row, so they compose with concurrent checkouts.
+        Ids must be unique; unknown ids are missing from the result.
+        """
+        if not items:
+            return []
+        changes = self._inline_rows(
+            "changes",
+            [column("id", Integer), column("price", Float), column("stock_quantity", Integer),
+             column("stock_delta", Integer), column("is_active", Boolean)],
+            [(item.id, item.price, item.stock_quantity, item.stock_delta, item.is_active) for item in items],
+        )
+        # Typed explicitly: PostgreSQL reads a VALUES column that is NULL in every row as text
+        price, quantity, delta, is_active = (
+            cast(changes.c[name], changes.c[name].type) for name in ("price", "stock_quantity", "stock_delta", "is_active")
+        )
+        stock = func.coalesce(quantity, Product.stock_quantity, 0) + func.coalesce(delta, 0)
+        result = await self.session.execute(
+            update(Product)
+            .where(Product.id == changes.c.id)
+            .values(
+                price=func.coalesce(price, Product.price),
+                stock_quantity=case((stock < 0, 0), else_=stock),
+                is_active=func.coalesce(is_active, Product.is_active),
+            )
+            .returning(Product.id, Product.price, Product.stock_quantity, Product.is_active,
+                       Product.category_id, Product.created_at)
+            .execution_options(synchronize_session=False)
+        )
+        return result.all()
+
     async def create_category(self, category_in: CategoryCreate) -> Category:
         db_category = Category(**category_in.model_dump())
         self.session.add(db_category)
@@ -54,15 +219,41 @@ class ProductRepository:
         await self.session.refresh(db_category)
         return db_category
 
-    async def get_categories(self, skip: int = 0, limit: int = 100) -> List[Category]:
+    async def get_categories(self, skip: int = 0, limit: int | None = 100) -> List[Category]:
         result = await self.session.execute(select(Category).order_by(Category.id).offset(skip).limit(limit))
         return result.scalars().all()
 
-    async def decrease_stock(self, product_id: int, quantity: int):
-        from sqlalchemy import update
-        await self.session.execute(
+    async def get_stock_levels(self, product_ids: Sequence[int]) -> Dict[int, int]:
+        """Current stock_quantity of the products ({product_id: stock}), read from the database."""
+        result = await self.session.execute(
+            select(Product.id, Product.stock_quantity).where(Product.id.in_(product_ids))
+        )
+        return dict(result.all())
+
+    async def decrease_stock_bulk(self, quantities: Dict[int, int]) -> Dict[int, int]:
+        """
+        Deduct stock for many products in one conditional statement:
+
+            WITH lines (product_id, quantity) AS (VALUES (:id, :qty), ...)
+            UPDATE products SET stock_quantity = stock_quantity - lines.quantity
+            FROM lines WHERE products.id = lines.product_id AND products.stock_quantity >= lines.quantity
+            RETURNING products.id, products.stock_quantity
+
+        Rows short on stock are left untouched and missing from the result
+        ({product_id: remaining stock}); the caller decides whether to abort.
+        The guard is evaluated on the locked row, so concurrent checkouts
+        cannot oversell.
+        """
+        if not quantities:
+            return {}
+        lines = self._inline_rows(
+            "lines", [column("product_id", Integer), column("quantity", Integer)], list(quantities.items())
+        )
+        result = await self.session.execute(
             update(Product)
-            .where(Product.id == product_id)
-            .values(stock_quantity=Product.stock_quantity - quantity)
+            .where(Product.id == lines.c.product_id, Product.stock_quantity >= lines.c.quantity)
+            .values(stock_quantity=Product.stock_quantity - lines.c.quantity)
+            .returning(Product.id, Product.stock_quantity)
+            .execution_options(synchronize_session=False)
         )
-        await self.session.flush()
+        return dict(result.all())
@@ -3,7 +3,6 @@ from sqlalchemy.future import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.user import User
 from app.schemas.user import UserCreate
-from app.core.security import get_password_hash
 
 class UserRepository:
     def __init__(self, session: AsyncSession):
@@ -13,10 +12,10 @@ class UserRepository:
         result = await self.session.execute(select(User).filter(User.email == email))
         return result.scalars().first()
 
-    async def create(self, user_in: UserCreate) -> User:
+    async def create(self, user_in: UserCreate, hashed_password: str) -> User:
         db_user = User(
             email=user_in.email,
-            hashed_password=get_password_hash(user_in.password),
+            hashed_password=hashed_password,
             full_name=user_in.full_name,
             is_active=user_in.is_active
         ) 
@@ -28,3 +27,11 @@ class UserRepository:
     async def get(self, user_id: int) -> Optional[User]:
         result = await self.session.execute(select(User).filter(User.id == user_id))
         return result.scalars().first()
+
+    async def set_active(self, user_id: int, is_active: bool) -> Optional[User]:
+        db_user = await self.get(user_id)
+        if not db_user:
+            return None
+        db_user.is_active = is_active
+        await self.session.flush()
+        return db_user
@@ -26,3 +26,17 @@ class Cart(BaseModel):
 
     class Config:
         from_attributes = True
+
+class CartLine(CartItemBase):
+    """A cart line without its product (quantity 0: the line was removed)."""
+    id: int
+
+class CartTotals(BaseModel):
+    item_count: int        # Lines in the cart
+    total_quantity: int    # Sum of quantities (the navbar badge)
+    subtotal: float
+
+class CartDelta(BaseModel):
+    """Response of a cart mutation with ``view=delta``: the changed line and the new totals."""
+    item: CartLine
+    totals: CartTotals
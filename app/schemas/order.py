@@ -23,6 +23,16 @@ class OrderBase(BaseModel):
 class OrderCreate(BaseModel):
     pass # Currently no input needed, just triggers checkout from cart
 
+class OrderSummary(OrderBase):
+    """Order history row: no items or shipment (load /orders/{id} for those)."""
+    id: int
+    created_at: datetime
+    item_count: int
+    first_image_url: str | None = None
+
+    class Config:
+        from_attributes = True
+
 class Order(OrderBase):
     id: int
     user_id: int
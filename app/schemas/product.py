@@ -1,5 +1,5 @@
-from typing import List, Optional
-from pydantic import BaseModel
+from typing import List, Literal, Optional
+from pydantic import BaseModel, Field, model_validator
 from datetime import datetime
 
 class CategoryBase(BaseModel):
@@ -16,6 +16,7 @@ class CategoryResponse(CategoryBase):
         from_attributes = True
 
 class ProductBase(BaseModel):
+    sku: Optional[str] = Field(None, max_length=64)
     name: str
     description: Optional[str] = None
     price: float
@@ -28,6 +29,7 @@ class ProductCreate(ProductBase):
     pass
 
 class ProductUpdate(BaseModel):
+    sku: Optional[str] = Field(None, max_length=64)
     name: Optional[str] = None
     description: Optional[str] = None
     price: Optional[float] = None
@@ -44,3 +46,68 @@ class ProductResponse(ProductBase):
 
     class Config:
         from_attributes = True
+
+class ProductBulkUpdateItem(BaseModel):
+    """Changes to one product; omitted fields are left as they are."""
+    id: int
+    price: Optional[float] = Field(None, ge=0)
+    stock_quantity: Optional[int] = Field(None, ge=0)   # New absolute stock
+    stock_delta: Optional[int] = None                   # Or a relative adjustment (floored at 0)
+    is_active: Optional[bool] = None
+
+    @model_validator(mode="after")
+    def check_stock(self):
+        if self.stock_quantity is not None and self.stock_delta is not None:
+            raise ValueError("Give stock_quantity or stock_delta, not both")
+        return self
+
+class ProductInventory(BaseModel):
+    id: int
+    price: float
+    stock_quantity: int
+    is_active: bool
+
+class ProductBulkUpdateResult(BaseModel):
+    updated: List[ProductInventory]
+    not_found: List[int]
+
+class ProductBatchItem(BaseModel):
+    id: int
+    found: bool
+    product: Optional[ProductResponse] = None  # None when not found
+
+class Suggestion(BaseModel):
+    type: Literal["product", "category"]
+    id: int
+    name: str
+
+class CategoryFacet(BaseModel):
+    category_id: Optional[int]
+    count: int
+
+class PriceBucketFacet(BaseModel):
+    min_price: float
+    max_price: Optional[float]  # Exclusive; None for the open-ended top bucket
+    count: int
+
+class ProductFacets(BaseModel):
+    total: int
+    categories: List[CategoryFacet]
+    price_buckets: List[PriceBucketFacet]
+
+class ProductImportRow(ProductCreate):
+    """One row of a catalog import: the SKU is required, as it is the upsert key."""
+    sku: str = Field(..., min_length=1, max_length=64)
+    name: str = Field(..., max_length=255)
+
+class ProductImportError(BaseModel):
+    row: int              # 1-based data row (CSV header excluded)
+    sku: Optional[str] = None
+    error: str
+
+class ProductImportReport(BaseModel):
+    processed: int = 0    # Data rows read
+    created: int = 0      # Products (a SKU repeated within a chunk counts once)
+    updated: int = 0
+    failed: int = 0
+    errors: List[ProductImportError] = []   # The first MAX_REPORTED_ERRORS only
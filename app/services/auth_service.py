@@ -1,8 +1,11 @@
 from datetime import timedelta
 from typing import Optional 
 from fastapi import HTTPException, status
-from app.core.security import verify_password, create_access_token
+from app.core.security import PasswordHasherBusy, create_access_token, password_hasher
 from app.core.config import settings
+from app.core.database import after_commit
+from app.core.principals import cache_principal, principal_claims, revoke_token, revoke_user_tokens
+from app.models.user import User
 from app.repositories.user_repo import UserRepository
 from app.schemas.user import UserCreate, UserLogin, Token
 
@@ -17,24 +20,58 @@ class AuthService:
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Email already registered",
             )
-        new_user = await self.user_repo.create(user_in)
+        new_user = await self.user_repo.create(user_in, await self._hash(password_hasher.hash(user_in.password)))
         # Auto login after register
         access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
         access_token = create_access_token(
-            subject=new_user.email, expires_delta=access_token_expires
+            subject=new_user.email, expires_delta=access_token_expires, claims=principal_claims(new_user)
         )
         return Token(access_token=access_token, token_type="bearer")
 
+    @staticmethod
+    async def _hash(job):
+        """Await a password_hasher job, answering 503 when the hashing pool is saturated."""
+        try:
+            return await job
+        except PasswordHasherBusy:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many sign-ins in progress, please retry",
+                headers={"Retry-After": "1"},
+            )
+
+    @staticmethod
+    def logout(token_payload: dict):
+        revoke_token(token_payload)
+
     async def authenticate_user(self, user_in: UserLogin) -> Token:
         user = await self.user_repo.get_by_email(user_in.email)
-        if not user or not verify_password(user_in.password, user.hashed_password):
+        valid, new_hash = False, None
+        if user:
+            valid, new_hash = await self._hash(password_hasher.verify_and_update(user_in.password, user.hashed_password))
+        if not valid:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Incorrect email or password",
                 headers={"WWW-Authenticate": "Bearer"},
             )
+        if new_hash:
+            # Stored hash predates the current cost parameters: upgrade it now that we have the password
+            user.hashed_password = new_hash
         access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
         access_token = create_access_token(
-            subject=user.email, expires_delta=access_token_expires
+            subject=user.email, expires_delta=access_token_expires, claims=principal_claims(user)
         )
+        cache_principal(user)
         return Token(access_token=access_token, token_type="bearer")
+
+    async def set_user_active(self, user_id: int, is_active: bool) -> Optional[User]:
+        """
+        Activate or deactivate a user. Tokens issued so far carry the old
+        flag, so once the change commits they are revoked along with the
+        cached principal.
+        """
+        user = await self.user_repo.set_active(user_id, is_active)
+        if user:
+            after_commit(self.user_repo.session, lambda: revoke_user_tokens(user_id))
+        return user
@@ -0,0 +1,297 @@
+"""
+In-memory cart engine with write-behind persistence (``CART_ENGINE=memory``).
+
+Active carts are held in this worker as ``CartState`` (product id ->
+quantity, plus the ``cart_items`` row id once one exists), loaded from the
+database on first use. Cart mutations change only that state; the rows are
+brought up to date in batches by ``run_cart_flusher`` every
+``CART_FLUSH_INTERVAL`` seconds, and synchronously with ``flush`` before
+checkout. A crash loses at most the last interval of cart changes.
+
+Lines not yet written have no row id; they are addressed as the negated
+product id (``-42``), which keeps working after the row is written.
+
+Carts are not shared between workers: run a single worker, or route each
+user to the same one.
+
+Usage:
+    from app.services.cart_engine import cart_engine
+
+    async with cart_engine.use(user_id) as state:   # Not evicted until the block exits
+        stock = await ...
+        state.set_quantity(product_id, 3)
+        cart_engine.mark_dirty(user_id)
+
+    await cart_engine.flush([user_id])   # Before reading the cart from the database
+"""
+
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Tuple
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.metrics import metrics
+from app.repositories.cart_repo import CartRepository
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+cart_flushes = metrics.counter("cart_flushes_total", "Cart write-behind batches written", ["result"])
+cart_flushed_lines = metrics.counter("cart_flushed_lines_total", "Cart line changes written", ["change"])
+
+
+class CartLine:
+    __slots__ = ("item_id", "quantity", "persisted")
+
+    def __init__(self, item_id: Optional[int], quantity: int, persisted: int):
+        self.item_id = item_id        # cart_items.id, None until inserted
+        self.quantity = quantity      # Current quantity (0 = removed, row deleted on the next flush)
+        self.persisted = persisted    # Quantity in the database
+
+
+class CartState:
+    __slots__ = ("cart_id", "user_id", "lines", "stale_item_ids")
+
+    def __init__(self, cart_id: int, user_id: int, rows: Iterable[Tuple[int, int, int]] = ()):
+        self.cart_id = cart_id
+        self.user_id = user_id
+        self.lines: Dict[int, CartLine] = {}     # product id -> line, in insertion order
+        self.stale_item_ids: List[int] = []      # Duplicate rows of a product, merged and to be deleted
+        for item_id, product_id, quantity in rows:
+            line = self.lines.get(product_id)
+            if line is None:
+                self.lines[product_id] = CartLine(item_id, quantity, quantity)
+            else:
+                line.quantity += quantity
+                self.stale_item_ids.append(item_id)
+
+    def items(self) -> List[Tuple[int, int, int]]:
+        """(item id, product id, quantity) of the lines in the cart."""
+        return [
+            (line.item_id if line.item_id is not None else -product_id, product_id, line.quantity)
+            for product_id, line in self.lines.items() if line.quantity > 0
+        ]
+
+    def item(self, product_id: int) -> Tuple[int, int, int]:
+        """(item id, product id, quantity) of one line; quantity 0 when not in the cart."""
+        line = self.lines.get(product_id)
+        if line is None:
+            return -product_id, product_id, 0
+        return (line.item_id if line.item_id is not None else -product_id), product_id, max(line.quantity, 0)
+
+    def quantity(self, product_id: int) -> int:
+        line = self.lines.get(product_id)
+        return line.quantity if line else 0
+
+    def find_item(self, item_id: int) -> Optional[int]:
+        """Product id of the line with this item id (a row id, or a negated product id)."""
+        for product_id, line in self.lines.items():
+            if line.quantity > 0 and (item_id == line.item_id or item_id == -product_id):
+                return product_id
+        return None
+
+    def set_quantity(self, product_id: int, quantity: int):
+        line = self.lines.get(product_id)
+        if line is None:
+            if quantity > 0:
+                self.lines[product_id] = CartLine(None, quantity, 0)
+        else:
+            line.quantity = max(quantity, 0)
+
+    def clear(self):
+        for line in self.lines.values():
+            line.quantity = 0
+
+    def is_dirty(self) -> bool:
+        return bool(self.stale_item_ids) or any(
+            line.quantity != line.persisted or (line.item_id is None and line.quantity > 0)
+            for line in self.lines.values()
+        )
+
+
+class CartEngine:
+    """Active carts of this worker, by user id, with write-behind to carts / cart_items."""
+
+    def __init__(self, max_carts: int):
+        self.max_carts = max_carts
+        self._carts: "OrderedDict[int, CartState]" = OrderedDict()   # LRU order
+        self._dirty: set[int] = set()
+        self._loading: Dict[int, asyncio.Future] = {}
+        self._reload: set[int] = set()       # Loading users forgotten meanwhile: their rows may be stale
+        self._in_use: Dict[int, int] = {}    # User id -> requests changing the cart (never evicted)
+        self._flush_lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return len(self._carts)
+
+    @property
+    def dirty_count(self) -> int:
+        return len(self._dirty)
+
+    async def get(self, user_id: int) -> CartState:
+        """The user's cart, loaded from the database (and created there) on first use."""
+        state = self._carts.get(user_id)
+        if state is not None:
+            self._carts.move_to_end(user_id)
+            return state
+        # Concurrent first requests of a user share one load
+        loading = self._loading.get(user_id)
+        if loading is not None:
+            return await asyncio.shield(loading)
+        future = asyncio.get_running_loop().create_future()
+        self._loading[user_id] = future
+        try:
+            while True:
+                self._reload.discard(user_id)
+                async with SessionLocal() as session:
+                    cart_id, rows = await CartRepository(session).get_cart_lines(user_id)
+                    await session.commit()
+                if user_id not in self._reload:
+                    break
+            state = CartState(cart_id, user_id, rows)
+            self._carts[user_id] = state
+            if state.stale_item_ids:
+                self._dirty.add(user_id)
+            self._evict(keep=user_id)
+            future.set_result(state)
+            return state
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as exc:
+            future.set_exception(exc)
+            future.exception()  # Mark retrieved: there may be no waiters
+            raise
+        finally:
+            del self._loading[user_id]
+            self._reload.discard(user_id)
+
+    @asynccontextmanager
+    async def use(self, user_id: int) -> AsyncIterator[CartState]:
+        """
+        The user's cart, kept in memory until the block exits. Changes made
+        after an await must go through it: a cart evicted in the meantime
+        would take them with it, as ``flush`` only writes carts in memory.
+        """
+        self._in_use[user_id] = self._in_use.get(user_id, 0) + 1
+        try:
+            yield await self.get(user_id)
+        finally:
+            self._in_use[user_id] -= 1
+            if not self._in_use[user_id]:
+                del self._in_use[user_id]
+
+    def mark_dirty(self, user_id: int):
+        self._dirty.add(user_id)
+
+    def forget(self, user_id: int):
+        """
+        Drop a cart from memory (it is reloaded from the database on next use).
+        Call it once the change to the user's rows has committed; a load already
+        in flight reads them again.
+        """
+        self._carts.pop(user_id, None)
+        self._dirty.discard(user_id)
+        if user_id in self._loading:
+            self._reload.add(user_id)
+
+    def _evict(self, keep: int | None = None):
+        """
+        Drop the least recently used clean carts beyond ``max_carts`` (dirty
+        ones wait for their flush, carts in ``use`` for its end). ``keep`` is
+        a cart just handed out, about to be changed.
+        """
+        excess = len(self._carts) - self.max_carts
+        if excess <= 0:
+            return
+        for user_id in list(self._carts):
+            if excess <= 0:
+                break
+            if user_id not in self._dirty and user_id not in self._in_use and user_id != keep:
+                del self._carts[user_id]
+                excess -= 1
+
+    async def flush(self, user_ids: Iterable[int] | None = None):
+        """
+        Write pending changes of the given users' carts (all dirty carts by
+        default) in one transaction. Mutations made while it runs stay pending.
+        """
+        async with self._flush_lock:
+            users = list(self._dirty) if user_ids is None else [u for u in user_ids if u in self._dirty]
+            if not users:
+                return
+            inserts, updates, deletes = [], [], []
+            written: List[Tuple[CartState, int, CartLine, int]] = []   # (cart, product id, line, quantity written)
+            stale: Dict[int, List[int]] = {}
+            for user_id in users:
+                self._dirty.discard(user_id)
+                state = self._carts.get(user_id)
+                if state is None:
+                    continue
+                if state.stale_item_ids:
+                    stale[user_id], state.stale_item_ids = state.stale_item_ids, []
+                    deletes.extend(stale[user_id])
+                for product_id, line in state.lines.items():
+                    if line.item_id is None:
+                        if line.quantity <= 0:
+                            continue
+                        inserts.append({"cart_id": state.cart_id, "product_id": product_id, "quantity": line.quantity})
+                    elif line.quantity <= 0:
+                        deletes.append(line.item_id)
+                    elif line.quantity != line.persisted:
+                        updates.append({"id": line.item_id, "quantity": line.quantity})
+                    else:
+                        continue
+                    written.append((state, product_id, line, line.quantity))
+
+            try:
+                async with SessionLocal() as session:
+                    new_ids = iter(await CartRepository(session).apply_item_changes(inserts, updates, deletes))
+                    await session.commit()
+            except BaseException:
+                cart_flushes.inc("error")
+                for user_id, item_ids in stale.items():
+                    if user_id in self._carts:
+                        self._carts[user_id].stale_item_ids.extend(item_ids)
+                self._dirty.update(users)
+                raise
+            cart_flushes.inc("ok")
+            cart_flushed_lines.inc("insert", amount=len(inserts))
+            cart_flushed_lines.inc("update", amount=len(updates))
+            cart_flushed_lines.inc("delete", amount=len(deletes))
+
+            for state, product_id, line, quantity in written:
+                if line.item_id is None:
+                    line.item_id = next(new_ids)
+                    line.persisted = quantity
+                elif quantity <= 0:
+                    line.item_id, line.persisted = None, 0
+                else:
+                    line.persisted = quantity
+            for user_id in users:
+                state = self._carts.get(user_id)
+                if state is None:
+                    continue
+                # Removed lines whose rows are gone
+                for product_id in [p for p, line in state.lines.items() if line.item_id is None and line.quantity <= 0]:
+                    del state.lines[product_id]
+                if state.is_dirty():
+                    self._dirty.add(user_id)
+            self._evict()
+
+
+# Singleton instance (used when CART_ENGINE is "memory")
+cart_engine = CartEngine(settings.CART_MAX_ACTIVE)
+metrics.gauge("carts_in_memory", "Carts held by the in-memory cart engine", callback=lambda: {(): len(cart_engine)})
+metrics.gauge("carts_dirty", "In-memory carts with changes not yet written", callback=lambda: {(): cart_engine.dirty_count})
+
+
+async def run_cart_flusher(interval: float):
+    """Background task: write cart changes back every ``interval`` seconds."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await cart_engine.flush()
+        except Exception as e:
+            logger.warning(f"Cart flush failed (retried next round): {e}")
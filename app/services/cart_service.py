@@ -1,8 +1,11 @@
-from fastapi import HTTPException, status
+from fastapi import HTTPException, Response, status
+from app.core.catalog import catalog
 from app.repositories.cart_repo import CartRepository
 from app.repositories.product_repo import ProductRepository
-from app.models.cart import Cart, CartItem
-from app.schemas.cart import CartItemCreate
+from app.models.cart import Cart
+from app.schemas.cart import CartItemCreate, CartLine, CartTotals
+from app.services.cart_engine import CartState, cart_engine
+from app.services.product_service import ProductService
 
 class CartService:
     def __init__(self, cart_repo: CartRepository, product_repo: ProductRepository):
@@ -15,29 +18,16 @@ class CartService:
             cart = await self.cart_repo.create_cart(user_id)
         return cart
 
-    async def add_item(self, user_id: int, item_in: CartItemCreate) -> CartItem:
-        cart = await self.get_my_cart(user_id)
-        
-        # 1. Start Validation: Product exists?
-        product = await self.product_repo.get_product(item_in.product_id)
-        if not product:
-            raise HTTPException(status_code=404, detail="Product not found")
-
-        # 2. Check if item already in cart
-        existing_item = await self.cart_repo.get_cart_item(cart.id, item_in.product_id)
-        new_quantity = item_in.quantity
-        if existing_item:
-            new_quantity += existing_item.quantity
-        
-        # 3. Check Stock
-        if product.stock_quantity < new_quantity:
+    async def add_item(self, user_id: int, item_in: CartItemCreate) -> CartLine:
+        cart_id = await self.cart_repo.get_cart_id(user_id)
+        # Insert or increment the line, with the stock check, in one statement
+        row = await self.cart_repo.upsert_item(cart_id, item_in.product_id, item_in.quantity)
+        if row is None:
+            if not await self.product_repo.get_product(item_in.product_id):
+                raise HTTPException(status_code=404, detail="Product not found")
             raise HTTPException(status_code=400, detail="Not enough stock available")
-
-        # 4. Upsert
-        if existing_item:
-            return await self.cart_repo.update_item_quantity(existing_item, new_quantity)
-        else:
-            return await self.cart_repo.add_item(cart.id, item_in.product_id, item_in.quantity)
+        item_id, quantity = row
+        return CartLine(id=item_id, product_id=item_in.product_id, quantity=quantity)
 
     async def remove_item(self, user_id: int, item_id: int):
         cart = await self.get_my_cart(user_id)
@@ -48,11 +38,11 @@ class CartService:
         
         await self.cart_repo.remove_item(item)
 
-    async def update_item_quantity(self, user_id: int, item_id: int, quantity: int) -> Cart:
-        cart = await self.get_my_cart(user_id)
+    async def update_item_quantity(self, user_id: int, item_id: int, quantity: int) -> CartLine:
+        cart_id = await self.cart_repo.get_cart_id(user_id)
         item = await self.cart_repo.get_cart_item_by_id(item_id)
         
-        if not item or item.cart_id != cart.id:
+        if not item or item.cart_id != cart_id:
             raise HTTPException(status_code=404, detail="Item not found")
 
         if quantity <= 0:
@@ -65,8 +55,102 @@ class CartService:
             
             await self.cart_repo.update_item_quantity(item, quantity)
         
-        return await self.get_my_cart(user_id)
+        return CartLine(id=item_id, product_id=item.product_id, quantity=max(quantity, 0))
+
+    async def get_totals(self, user_id: int) -> CartTotals:
+        item_count, total_quantity, subtotal = await self.cart_repo.get_cart_totals(user_id)
+        return CartTotals(item_count=item_count, total_quantity=total_quantity, subtotal=subtotal)
 
     async def clear_cart(self, user_id: int):
         cart = await self.get_my_cart(user_id)
         await self.cart_repo.clear_cart(cart.id)
+
+
+class MemoryCartService:
+    """
+    CartService over the in-memory cart engine (``CART_ENGINE=memory``): same
+    operations and error responses, no queries on the hot path. Stock checks
+    use the catalog snapshot (checkout re-checks stock in the database), and
+    the cart JSON is spliced from the cached product bodies.
+    """
+
+    def __init__(self, product_repo: ProductRepository):
+        self.product_repo = product_repo
+
+    async def _stock_of(self, product_id: int) -> int:
+        stock = catalog.stock_of(product_id)
+        if stock is None:
+            # Not in this worker's snapshot yet (e.g. created by another worker)
+            product = await self.product_repo.get_product(product_id)
+            if not product:
+                raise HTTPException(status_code=404, detail="Product not found")
+            stock = product.stock_quantity or 0
+        return stock
+
+    async def _render(self, state: CartState) -> Response:
+        items = state.items()
+        bodies = await ProductService(self.product_repo).get_product_bodies([product_id for _, product_id, _ in items])
+        encoded = [
+            b'{"product_id":%d,"quantity":%d,"id":%d,"product":%s}' % (product_id, quantity, item_id, bodies[product_id])
+            for item_id, product_id, quantity in items if product_id in bodies
+        ]
+        body = b'{"id":%d,"user_id":%d,"items":[%s]}' % (state.cart_id, state.user_id, b",".join(encoded))
+        return Response(content=body, media_type="application/json")
+
+    @staticmethod
+    def _line(state: CartState, product_id: int) -> CartLine:
+        item_id, product_id, quantity = state.item(product_id)
+        return CartLine(id=item_id, product_id=product_id, quantity=quantity)
+
+    async def get_my_cart(self, user_id: int) -> Response:
+        return await self._render(await cart_engine.get(user_id))
+
+    async def add_item(self, user_id: int, item_in: CartItemCreate) -> CartLine:
+        async with cart_engine.use(user_id) as state:
+            stock = await self._stock_of(item_in.product_id)
+            # Read the quantity after the last await: no other add can slip in between
+            new_quantity = state.quantity(item_in.product_id) + item_in.quantity
+            if stock < new_quantity:
+                raise HTTPException(status_code=400, detail="Not enough stock available")
+            state.set_quantity(item_in.product_id, new_quantity)
+            cart_engine.mark_dirty(user_id)
+            return self._line(state, item_in.product_id)
+
+    async def remove_item(self, user_id: int, item_id: int):
+        async with cart_engine.use(user_id) as state:
+            product_id = state.find_item(item_id)
+            if product_id is None:
+                raise HTTPException(status_code=404, detail="Item not found in your cart")
+            state.set_quantity(product_id, 0)
+            cart_engine.mark_dirty(user_id)
+
+    async def update_item_quantity(self, user_id: int, item_id: int, quantity: int) -> CartLine:
+        async with cart_engine.use(user_id) as state:
+            product_id = state.find_item(item_id)
+            if product_id is None:
+                raise HTTPException(status_code=404, detail="Item not found")
+            if quantity > 0:
+                stock = await self._stock_of(product_id)
+                if stock < quantity:
+                    raise HTTPException(status_code=400, detail=f"Not enough stock. Only {stock} available.")
+            state.set_quantity(product_id, quantity)
+            cart_engine.mark_dirty(user_id)
+            return self._line(state, product_id)
+
+    async def get_totals(self, user_id: int) -> CartTotals:
+        items = (await cart_engine.get(user_id)).items()
+        prices = {product_id: catalog.price_of(product_id) for _, product_id, _ in items}
+        missing = [product_id for product_id, price in prices.items() if price is None]
+        if missing:
+            prices.update((product.id, product.price) for product in await self.product_repo.get_products_by_ids(missing))
+        lines = [(quantity, prices[product_id]) for _, product_id, quantity in items if prices[product_id] is not None]
+        return CartTotals(
+            item_count=len(lines),
+            total_quantity=sum(quantity for quantity, _ in lines),
+            subtotal=sum(quantity * price for quantity, price in lines),
+        )
+
+    async def clear_cart(self, user_id: int):
+        async with cart_engine.use(user_id) as state:
+            state.clear()
+            cart_engine.mark_dirty(user_id)
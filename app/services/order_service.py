@@ -1,27 +1,94 @@
-from typing import List
+from typing import List, Optional, Tuple
 from fastapi import HTTPException, status
+from pydantic import TypeAdapter
+from app.core.config import settings
+from app.core.database import SessionLocal, after_commit
+from app.core.pagination import decode_cursor, encode_cursor
+from app.repositories.idempotency_repo import IdempotencyRepository
 from app.repositories.order_repo import OrderRepository
 from app.repositories.cart_repo import CartRepository
 from app.repositories.product_repo import ProductRepository
+from app.services.product_service import ProductService
+from app.services.cart_engine import cart_engine
 from app.models.order import Order, OrderItem, OrderStatus
 from app.models.coupon import Coupon
 from app.models.address import Address
+from app.schemas.order import Order as OrderSchema
 from sqlalchemy.future import select
-from datetime import datetime
+from sqlalchemy.orm.attributes import set_committed_value
+from datetime import datetime, timedelta, timezone
+import asyncio
+import hashlib
+import json
 import logging
 
 logger = logging.getLogger(__name__)
 
+order_adapter = TypeAdapter(OrderSchema)
+
 class OrderService:
-    def __init__(self, order_repo: OrderRepository, cart_repo: CartRepository, product_repo: ProductRepository):
+    def __init__(self, order_repo: OrderRepository, cart_repo: CartRepository, product_repo: ProductRepository,
+                 idempotency_repo: Optional[IdempotencyRepository] = None):
         self.order_repo = order_repo
         self.cart_repo = cart_repo
         self.product_repo = product_repo
         self.session = order_repo.session 
+        self.idempotency_repo = idempotency_repo or IdempotencyRepository(self.session)
+
+    async def checkout_idempotent(self, user_id: int, idempotency_key: str, shipping_address_id: int | None = None,
+                                  coupon_code: str | None = None) -> Tuple[bytes, bool]:
+        """
+        Checkout at most once per Idempotency-Key. Returns the encoded Order
+        JSON and whether it is a replay of an earlier response.
+
+        The key is bound to the request and to the cart lines it checks out:
+        a retry replays the order while the cart still holds those lines, or
+        is empty because that checkout consumed them. Reusing the key for a
+        cart changed since is rejected like a different request body.
+        """
+        if not idempotency_key or len(idempotency_key) > 255:
+            raise HTTPException(status_code=400, detail="Idempotency-Key must be 1-255 characters")
+        if settings.CART_ENGINE == "memory":
+            await cart_engine.flush([user_id])
+        _, lines = await self.cart_repo.get_cart_lines(user_id)
+        request_hash = self._request_hash(shipping_address_id, coupon_code, lines)
+
+        # 1. Claim the key (waits while a duplicate is still in flight)
+        key_id = await self.idempotency_repo.claim(user_id, idempotency_key, request_hash)
+        if key_id is None:
+            existing = await self.idempotency_repo.get(user_id, idempotency_key)
+            if existing is None or existing.response_body is None:
+                raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is in progress")
+            same_request = existing.request_hash[:32] == request_hash[:32]
+            same_cart = not lines or existing.request_hash[32:] == request_hash[32:]
+            if not (same_request and same_cart):
+                raise HTTPException(status_code=422, detail="Idempotency-Key was used with a different request")
+            logger.info(f"CHECKOUT: Replaying Idempotency-Key for user_id={user_id}")
+            return existing.response_body, True
+
+        # 2. First attempt: checkout and store the response in the same transaction
+        order = await self.checkout(user_id, shipping_address_id, coupon_code)
+        body = order_adapter.dump_json(order_adapter.validate_python(order, from_attributes=True))
+        await self.idempotency_repo.save_response(key_id, body)
+        return body, False
+
+    @staticmethod
+    def _request_hash(shipping_address_id: int | None, coupon_code: str | None,
+                      lines: List[Tuple[int, int, int]]) -> str:
+        """Digest of the request body followed by a digest of the cart's (product id, quantity) lines (32 hex each)."""
+        cart = sorted((product_id, quantity) for _, product_id, quantity in lines)
+        return (
+            hashlib.sha256(json.dumps([shipping_address_id, coupon_code]).encode()).hexdigest()[:32]
+            + hashlib.sha256(json.dumps(cart).encode()).hexdigest()[:32]
+        )
 
     async def checkout(self, user_id: int, shipping_address_id: int | None = None, coupon_code: str | None = None) -> Order:
         # All operations happen in a single transaction managed by get_db()
-        # 1. Get Cart
+        # 1. Get Cart (an in-memory cart is written back first, and dropped once the order commits:
+        # dropped earlier, a cart request in between would reload the lines this checkout deletes)
+        if settings.CART_ENGINE == "memory":
+            await cart_engine.flush([user_id])
+            after_commit(self.session, lambda: cart_engine.forget(user_id))
         cart = await self.cart_repo.get_cart_by_user_id(user_id)
         if not cart or not cart.items:
             raise HTTPException(status_code=400, detail="Cart is empty")
@@ -30,28 +97,38 @@ class OrderService:
         total_amount = 0.0
         order_items = []
 
-        # 3. Process Items
+        # 3. Process Items (a product may appear on several cart lines)
+        requested = {}
         for cart_item in cart.items:
             product = cart_item.product
-            
-            if product.stock_quantity < cart_item.quantity:
-                raise HTTPException(
-                    status_code=400, 
-                    detail=f"Product {product.name} is out of stock (Requested: {cart_item.quantity}, Available: {product.stock_quantity})"
-                )
+            requested[product.id] = requested.get(product.id, 0) + cart_item.quantity
 
             item_total = product.price * cart_item.quantity
             total_amount += item_total
             
             order_item = OrderItem(
                 product_id=product.id,
+                product=product,
                 quantity=cart_item.quantity,
                 price_at_purchase=product.price
             )
             order_items.append(order_item)
 
-            # Deduct Stock (flush only, commit handled by get_db)
-            await self.product_repo.decrease_stock(product.id, cart_item.quantity)
+        # Deduct all stock in one guarded UPDATE; any short line aborts the checkout
+        # (the HTTPException makes get_db roll the whole transaction back)
+        remaining = await self.product_repo.decrease_stock_bulk(requested)
+        products = {cart_item.product.id: cart_item.product for cart_item in cart.items}
+        short = [products[product_id] for product_id in requested if product_id not in remaining]
+        if short:
+            product = short[0]
+            # The loaded stock_quantity predates the guarded UPDATE (e.g. a concurrent checkout took it)
+            available = (await self.product_repo.get_stock_levels([product.id])).get(product.id, 0)
+            raise HTTPException(
+                status_code=400, 
+                detail=f"Product {product.name} is out of stock (Requested: {requested[product.id]}, Available: {available})"
+            )
+        for product_id, stock_quantity in remaining.items():
+            set_committed_value(products[product_id], "stock_quantity", stock_quantity)
 
         # 4. Calculate Adjustments
         subtotal = total_amount
@@ -105,8 +182,41 @@ class OrderService:
         # 6. Clear Cart (flush only)
         await self.cart_repo.clear_cart(cart.id)
 
+        # 7. Stock changed: once committed, evict exactly the cached entries showing these products
+        after_commit(self.session, lambda: ProductService.invalidate_stock(remaining))
+
         # get_db() will commit everything at end of request
         return saved_order
 
-    async def get_my_orders(self, user_id: int) -> List[Order]:
-        return await self.order_repo.get_orders_by_user(user_id)
+    async def get_my_order_summaries(self, user_id: int, limit: int = 20, after: str | None = None) -> Tuple[list, Optional[str]]:
+        """Like get_my_orders, but compact rows for the history list (see OrderSummary)."""
+        before_id = decode_cursor(after, int)[0] if after else None
+        rows = await self.order_repo.get_order_summaries_by_user(user_id, limit + 1, before_id)
+        if len(rows) <= limit:
+            return rows, None
+        rows = rows[:limit]
+        return rows, encode_cursor(rows[-1].id)
+
+    async def get_my_orders(self, user_id: int, limit: int = 20, after: str | None = None) -> Tuple[List[Order], Optional[str]]:
+        """A page of the user's orders (newest first) and the cursor of the next page, if any."""
+        before_id = decode_cursor(after, int)[0] if after else None
+        orders = await self.order_repo.get_orders_by_user(user_id, limit + 1, before_id)
+        if len(orders) <= limit:
+            return orders, None
+        orders = orders[:limit]
+        return orders, encode_cursor(orders[-1].id)
+
+
+async def run_idempotency_key_purger(interval: float = 3600):
+    """Background task: delete Idempotency-Keys older than IDEMPOTENCY_KEY_TTL_HOURS."""
+    while True:
+        try:
+            async with SessionLocal() as session:
+                cutoff = datetime.now(timezone.utc) - timedelta(hours=settings.IDEMPOTENCY_KEY_TTL_HOURS)
+                purged = await IdempotencyRepository(session).purge_expired(cutoff)
+                await session.commit()
+            if purged:
+                logger.info(f"Purged {purged} expired idempotency keys")
+        except Exception as e:
+            logger.warning(f"Idempotency key purge failed: {e}")
+        await asyncio.sleep(interval)
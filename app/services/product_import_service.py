@@ -0,0 +1,192 @@
+"""
+Bulk catalog import: stream NDJSON or CSV rows, validate them in chunks and
+upsert them by SKU.
+
+Each chunk of ``IMPORT_CHUNK_SIZE`` valid rows is one multi-row
+``INSERT ... ON CONFLICT (sku) DO UPDATE`` per set of supplied columns, in
+its own transaction, so a large file never holds one long transaction and a
+bad chunk does not undo the others. Existing products only get the fields a
+row supplies (an empty CSV cell or a missing JSON key leaves the stored
+value alone); new ones get the defaults for the rest. Rows failing
+validation are reported and skipped. Caches and the in-memory catalog
+indexes are refreshed once, after the last chunk.
+
+Usage:
+    from app.services.product_import_service import ProductImportService
+
+    report = await ProductImportService().import_stream(chunks, "csv", on_progress=print)
+    report.created, report.updated, report.failed, report.errors
+
+CSV input has a header row with ``ProductImportRow`` field names (unknown
+columns are ignored, empty cells take the default); NDJSON has one JSON
+object per line.
+"""
+
+from typing import AsyncIterable, AsyncIterator, Callable, Dict, FrozenSet, List, Literal, Optional, Tuple
+from pydantic import ValidationError
+from sqlalchemy.exc import SQLAlchemyError
+from app.core.database import SessionLocal
+from app.core.cache import cache_manager
+from app.repositories.product_repo import ProductRepository
+from app.schemas.product import ProductImportError, ProductImportReport, ProductImportRow
+from app.services.product_service import rebuild_catalog_indexes
+import csv
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+ImportFormat = Literal["ndjson", "csv"]
+
+# Bound parameters one statement may use: SQLITE_MAX_VARIABLE_NUMBER on older SQLite builds,
+# the lowest limit of the supported databases (asyncpg allows 32767)
+MAX_BIND_PARAMETERS = 999
+# Rows per upsert statement: every row binds one parameter per import column
+IMPORT_CHUNK_SIZE = MAX_BIND_PARAMETERS // len(ProductImportRow.model_fields)
+MAX_REPORTED_ERRORS = 100    # Row errors listed in the report; the rest are only counted
+
+# Values of the optional import fields when a new product's row leaves them out
+IMPORT_DEFAULTS = {
+    name: field.get_default(call_default_factory=True)
+    for name, field in ProductImportRow.model_fields.items() if not field.is_required()
+}
+
+
+async def _lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[str]:
+    """Decoded lines of a byte stream (without line endings)."""
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line.rstrip(b"\r").decode("utf-8-sig", errors="replace")
+    if buffer.strip():
+        yield buffer.rstrip(b"\r").decode("utf-8-sig", errors="replace")
+
+
+async def _ndjson_records(chunks: AsyncIterable[bytes]) -> AsyncIterator[Tuple[Optional[dict], Optional[str]]]:
+    """(record, None) per non-blank line, or (None, error) when it is not a JSON object."""
+    async for line in _lines(chunks):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield None, f"Invalid JSON: {e}"
+            continue
+        if isinstance(record, dict):
+            yield record, None
+        else:
+            yield None, "Expected a JSON object"
+
+
+async def _csv_records(chunks: AsyncIterable[bytes]) -> AsyncIterator[Tuple[Optional[dict], Optional[str]]]:
+    """(record, None) per data row, keyed by the header row; empty cells are left out."""
+    header = None
+    pending = ""
+    async for line in _lines(chunks):
+        # A quoted cell may span lines: a record is complete once its quotes balance
+        pending = f"{pending}\n{line}" if pending else line
+        if pending.count('"') % 2:
+            continue
+        record, pending = next(csv.reader([pending]), []), ""
+        if not any(cell.strip() for cell in record):
+            continue
+        if header is None:
+            header = [name.strip() for name in record]
+            continue
+        if len(record) > len(header):
+            yield None, f"Expected {len(header)} columns, got {len(record)}"
+            continue
+        yield {name: value for name, value in zip(header, record) if value.strip()}, None
+    if pending:
+        yield None, "Unterminated quoted value"
+
+
+def _describe(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in detail['loc'])}: {detail['msg']}" for detail in error.errors()
+    )
+
+
+class ProductImportService:
+    def __init__(self, chunk_size: int = IMPORT_CHUNK_SIZE):
+        self.chunk_size = chunk_size
+
+    async def import_stream(self, chunks: AsyncIterable[bytes], format: ImportFormat,
+                            on_progress: Callable[[ProductImportReport], None] | None = None) -> ProductImportReport:
+        """Import every row of a byte stream; ``on_progress`` gets the running report after each chunk."""
+        report = ProductImportReport()
+        async with SessionLocal() as session:
+            category_ids = {category.id for category in await ProductRepository(session).get_categories(0, None)}
+
+        records = _csv_records(chunks) if format == "csv" else _ndjson_records(chunks)
+        batch: List[Tuple[int, ProductImportRow]] = []
+        async for record, error in records:
+            report.processed += 1
+            row_number = report.processed
+            if error is None:
+                try:
+                    row = ProductImportRow.model_validate(record)
+                except ValidationError as e:
+                    error = _describe(e)
+                else:
+                    if row.category_id not in category_ids:
+                        error = f"category_id: Unknown category {row.category_id}"
+            if error is not None:
+                sku = record.get("sku") if record else None
+                self._fail(report, row_number, str(sku) if sku is not None else None, error)
+                continue
+
+            batch.append((row_number, row))
+            if len(batch) >= self.chunk_size:
+                await self._upsert_chunk(batch, report)
+                batch = []
+                if on_progress:
+                    on_progress(report)
+        if batch:
+            await self._upsert_chunk(batch, report)
+            if on_progress:
+                on_progress(report)
+
+        if report.created or report.updated:
+            # Once for the whole import, instead of once per row
+            cache_manager.invalidate("products_list")
+            cache_manager.invalidate("product_detail")
+            await rebuild_catalog_indexes()
+        logger.info(
+            f"Product import: {report.processed} rows, {report.created} created, "
+            f"{report.updated} updated, {report.failed} failed"
+        )
+        return report
+
+    async def _upsert_chunk(self, batch: List[Tuple[int, ProductImportRow]], report: ProductImportReport):
+        # A SKU repeated within a chunk is one product: later rows override the fields they supply
+        supplied: Dict[str, dict] = {}
+        for _, row in batch:
+            supplied[row.sku] = {**supplied.get(row.sku, {}), **row.model_dump(exclude_unset=True)}
+        # One statement per set of supplied columns (they decide the DO UPDATE SET list)
+        groups: Dict[FrozenSet[str], List[dict]] = {}
+        for values in supplied.values():
+            groups.setdefault(frozenset(values), []).append({**IMPORT_DEFAULTS, **values})
+        try:
+            async with SessionLocal() as session:
+                repo = ProductRepository(session)
+                existing = await repo.get_existing_skus(list(supplied))
+                for columns, rows in groups.items():
+                    await repo.upsert_products(rows, sorted(columns))
+                await session.commit()
+        except SQLAlchemyError as e:
+            logger.warning(f"Product import chunk at row {batch[0][0]} failed: {e}")
+            for row_number, row in batch:
+                self._fail(report, row_number, row.sku, f"Not saved: {str(getattr(e, 'orig', e)).splitlines()[0]}")
+            return
+        # Counted per product, not per row
+        report.created += len(supplied) - len(existing)
+        report.updated += len(existing)
+
+    @staticmethod
+    def _fail(report: ProductImportReport, row_number: int, sku: str | None, error: str):
+        report.failed += 1
+        if len(report.errors) < MAX_REPORTED_ERRORS:
+            report.errors.append(ProductImportError(row=row_number, sku=sku, error=error))
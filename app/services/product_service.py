@@ -1,60 +1,334 @@
-from typing import List, Optional
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from contextlib import asynccontextmanager
+from pydantic import TypeAdapter
+from app.core.database import SessionLocal, after_commit, primary_read_session
 from app.repositories.product_repo import ProductRepository
-from app.schemas.product import ProductCreate, ProductUpdate, CategoryCreate
+from app.schemas.product import ProductCreate, ProductUpdate, CategoryCreate, ProductResponse, CategoryResponse, ProductBulkUpdateItem
 from app.models.product import Product, Category
-from app.core.cache import cache_manager
+from app.core.cache import cache_manager, CachedResponse
+from app.core.pagination import NEXT_CURSOR_HEADER, decode_cursor, encode_cursor
+from app.core.catalog import CatalogFilter, CatalogRow, catalog
+from app.core.search import MAX_SEARCH_RESULTS, search_backend, search_index, suggestion_index, tokenize
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Serializers for the cached response bodies (validated once, on cache miss)
+product_list_adapter = TypeAdapter(List[ProductResponse])
+product_adapter = TypeAdapter(ProductResponse)
+category_list_adapter = TypeAdapter(List[CategoryResponse])
+
+# Most ids accepted by one batch lookup
+MAX_BATCH_IDS = 100
+# Most products changed by one bulk update (5 parameters each)
+MAX_BULK_UPDATE_ITEMS = 5000
+
+# Cache tags. Every cached entry is tagged with the products it shows, and
+# listings also with what decides their membership, so a write only evicts
+# the entries it can actually change.
+ALL_PRODUCTS_TAG = "products:all"          # Listings not filtered by category
+SEARCH_RESULTS_TAG = "products:search"     # Listings filtered by a search term
+PRICE_FILTER_TAG = "products:by_price"     # Listings filtered or sorted by price
+STOCK_FILTER_TAG = "products:by_stock"     # In-stock-only listings
+ACTIVE_FILTER_TAG = "products:by_active"   # Listings filtered by is_active
+
+def product_tag(product_id: int) -> str:
+    return f"product:{product_id}"
+
+def category_tag(category_id: int) -> str:
+    return f"category:{category_id}"
+
+def index_product(product: Product):
+    """Keep this worker's in-memory catalog, search and suggestion indexes in step with a product write."""
+    catalog.upsert(CatalogRow(
+        product.id, product.price, product.category_id, product.stock_quantity, product.is_active, product.created_at
+    ))
+    suggestion_index.add("product", product.id, product.name)
+    if search_backend == "memory":
+        search_index.add(product.id, product.name, product.description, product.category_id)
 
 class ProductService:
     def __init__(self, product_repo: ProductRepository):
         self.product_repo = product_repo
 
-    async def get_all_products(self, skip: int = 0, limit: int = 100, search: str | None = None, category_id: int | None = None) -> List[Product]:
+    @asynccontextmanager
+    async def _cache_filler(self) -> AsyncIterator["ProductService"]:
+        """
+        This service, or one on the primary while this one reads from a
+        replica: the shared product caches are only filled from the primary.
+        """
+        async with primary_read_session(self.product_repo.session) as session:
+            yield self if session is self.product_repo.session else ProductService(ProductRepository(session))
+
+    async def get_all_products(self, skip: int = 0, limit: int = 100, search: str | None = None, category_id: int | None = None,
+                               after: str | None = None, min_price: float | None = None, max_price: float | None = None,
+                               in_stock: bool = False, is_active: bool | None = None,
+                               sort: str | None = None) -> CachedResponse:
+        if search and not tokenize(search):
+            search = None
+        filters = CatalogFilter(category_id, min_price, max_price, in_stock, is_active)
+        # Anything beyond category and search is answered from the in-memory catalog snapshot
+        filtered = sort is not None or filters != CatalogFilter(category_id)
+        # Ranked and sorted listings page by (score or sort value, id), the others by id
+        after_key = (decode_cursor(after, float, int) if search or sort else decode_cursor(after, int)) if after else None
         # Build cache key from params
-        cache_key = f"skip={skip}&limit={limit}&search={search}&cat={category_id}"
-        cached = cache_manager.get("products_list", cache_key)
-        if cached is not None:
-            return cached
-
-        products = await self.product_repo.get_all_products(skip, limit, search, category_id)
-        cache_manager.set("products_list", cache_key, products)
-        return products
-
-    async def get_product(self, product_id: int) -> Optional[Product]:
-        cache_key = str(product_id)
-        cached = cache_manager.get("product_detail", cache_key)
-        if cached is not None:
-            return cached
-
-        product = await self.product_repo.get_product(product_id)
-        if product:
-            cache_manager.set("product_detail", cache_key, product)
-        return product
+        cache_key = (
+            f"skip={skip}&limit={limit}&search={search}&cat={category_id}&after={after}"
+            f"&price={min_price}-{max_price}&in_stock={in_stock}&active={is_active}&sort={sort}"
+        )
+        tags = {category_tag(category_id) if category_id else ALL_PRODUCTS_TAG}
+        if search:
+            tags.add(SEARCH_RESULTS_TAG)
+        if min_price is not None or max_price is not None or sort in ("price_asc", "price_desc"):
+            tags.add(PRICE_FILTER_TAG)
+        if in_stock:
+            tags.add(STOCK_FILTER_TAG)
+        if is_active is not None:
+            tags.add(ACTIVE_FILTER_TAG)
+
+        async def load() -> CachedResponse:
+            # One extra row tells whether there is a next page
+            async with self._cache_filler() as service:
+                if filtered:
+                    ranked = await service._rank_all(search, category_id) if search else None
+                    keys = catalog.query(filters, sort, after_key, skip, limit + 1, ranked)
+                    products = await service.product_repo.get_products_by_ids([key[-1] for key in keys[:limit]])
+                elif search:
+                    ranked = await service._search(search, skip, limit + 1, category_id, after_key)
+                    keys = [(score, product.id) for product, score in ranked]
+                    products = [product for product, _ in ranked[:limit]]
+                else:
+                    products = await service.product_repo.get_all_products(
+                        skip, limit + 1, category_id, after_key[0] if after_key else None
+                    )
+                    keys = [(product.id,) for product in products]
+                    products = products[:limit]
+                validated = product_list_adapter.validate_python(products, from_attributes=True)
+            headers = None
+            if limit > 0 and len(keys) > limit:
+                headers = {NEXT_CURSOR_HEADER: encode_cursor(*keys[limit - 1])}
+            tags.update(product_tag(p.id) for p in products)
+            return CachedResponse.from_json(product_list_adapter.dump_json(validated), headers)
+
+        # Concurrent misses for the same page share a single query
+        return await cache_manager.get_or_load("products_list", cache_key, load, tags=tags)
+
+    async def get_facets(self, search: str | None = None, min_price: float | None = None, max_price: float | None = None,
+                         in_stock: bool = False, is_active: bool | None = None,
+                         category_id: int | None = None) -> dict:
+        """Product counts per category and price bucket for a listing's filters (catalog snapshot, no GROUP BY)."""
+        filters = CatalogFilter(category_id, min_price, max_price, in_stock, is_active)
+        if search and tokenize(search):
+            ranked = await self._rank_all(search, None)
+            return catalog.facets(filters, [product_id for _, product_id in ranked])
+        return catalog.facets(filters)
+
+    async def _rank_all(self, search: str, category_id: int | None) -> List[Tuple[float, int]]:
+        """Every match of a search (up to MAX_SEARCH_RESULTS) as (score, id), best first."""
+        if search_backend == "postgres":
+            return await self.product_repo.search_product_ids(search, category_id, MAX_SEARCH_RESULTS)
+        return search_index.search(search, category_id)[:MAX_SEARCH_RESULTS]
+
+    async def _search(self, search: str, skip: int, limit: int, category_id: int | None,
+                      after: Tuple[float, int] | None) -> List[Tuple[Product, float]]:
+        """Ranked (product, score) matches from the configured search backend."""
+        if search_backend == "postgres":
+            return await self.product_repo.search_products(search, skip, limit, category_id, after)
+
+        ranked = search_index.search(search, category_id)
+        if after is not None:
+            after_score, after_id = after
+            ranked = [(score, product_id) for score, product_id in ranked
+                      if score < after_score or (score == after_score and product_id > after_id)]
+        page = ranked[skip:skip + limit]
+        products = await self.product_repo.get_products_by_ids([product_id for _, product_id in page])
+        scores = {product_id: score for score, product_id in page}
+        return [(product, scores[product.id]) for product in products]
+
+    @staticmethod
+    def suggest(q: str, limit: int = 8) -> List[dict]:
+        """Autocomplete from the in-memory suggestion index (no database access)."""
+        return [
+            {"type": kind, "id": item_id, "name": name}
+            for kind, item_id, name in suggestion_index.suggest(q, limit)
+        ]
+
+    async def get_product(self, product_id: int) -> Optional[CachedResponse]:
+        async def load() -> Optional[CachedResponse]:
+            async with self._cache_filler() as service:
+                product = await service.product_repo.get_product(product_id)
+                if not product:
+                    return None
+                validated = product_adapter.validate_python(product, from_attributes=True)
+            return CachedResponse.from_json(product_adapter.dump_json(validated))
+
+        return await cache_manager.get_or_load(
+            "product_detail", str(product_id), load, tags={product_tag(product_id)}
+        )
+
+    async def get_products_batch(self, product_ids: List[int]) -> CachedResponse:
+        """
+        Several products in request order, as [{"id", "found", "product"}, ...].
+        The body is spliced from the cached JSON without re-serializing it.
+        """
+        bodies = await self.get_product_bodies(product_ids)
+        items = [
+            b'{"id":%d,"found":true,"product":%s}' % (product_id, bodies[product_id]) if product_id in bodies
+            else b'{"id":%d,"found":false,"product":null}' % product_id
+            for product_id in product_ids
+        ]
+        return CachedResponse.from_json(b"[" + b",".join(items) + b"]")
+
+    async def get_product_bodies(self, product_ids: List[int]) -> Dict[int, bytes]:
+        """
+        Encoded ProductResponse JSON of several products ({id: body}, unknown
+        ids left out). Hits come from product_detail in one backend pass, all
+        misses from one query (then cached like get_product).
+        """
+        keys = list(dict.fromkeys(str(product_id) for product_id in product_ids))
+        found = await cache_manager.aget_many("product_detail", keys)
+        bodies = {int(key): cached.body for key, cached in found.items()}
+        missing = [int(key) for key in keys if int(key) not in bodies]
+        if not missing:
+            return bodies
+        async with self._cache_filler() as service:
+            for product in await service.product_repo.get_products_by_ids(missing):
+                validated = product_adapter.validate_python(product, from_attributes=True)
+                cached = CachedResponse.from_json(product_adapter.dump_json(validated))
+                cache_manager.set("product_detail", str(product.id), cached, tags={product_tag(product.id)})
+                bodies[product.id] = cached.body
+        return bodies
 
     async def create_product(self, product_in: ProductCreate) -> Product:
         product = await self.product_repo.create_product(product_in)
-        # Invalidate list cache since a new product was added
-        cache_manager.invalidate("products_list")
+
+        def publish():
+            index_product(product)
+            # Only listings the new product can appear in (its category, unfiltered, searches)
+            cache_manager.invalidate_tags(
+                category_tag(product.category_id), ALL_PRODUCTS_TAG, SEARCH_RESULTS_TAG
+            )
+
+        after_commit(self.product_repo.session, publish)
         return product
 
     async def update_product(self, product_id: int, product_in: ProductUpdate) -> Optional[Product]:
+        changes = product_in.model_dump(exclude_unset=True)
+        tags = [product_tag(product_id)]
+        if "category_id" in changes:
+            # Moving category changes membership of both the old and new category listings
+            current = await self.product_repo.get_product(product_id)
+            if current:
+                tags.append(category_tag(current.category_id))
+            tags.append(category_tag(changes["category_id"]))
+        if "name" in changes or "description" in changes:
+            tags.append(SEARCH_RESULTS_TAG)
+        if "price" in changes:
+            tags.append(PRICE_FILTER_TAG)
+        if "stock_quantity" in changes:
+            tags.append(STOCK_FILTER_TAG)
+        if "is_active" in changes:
+            tags.append(ACTIVE_FILTER_TAG)
+
         product = await self.product_repo.update_product(product_id, product_in)
         if product:
-            # Invalidate both the specific product and list caches
-            cache_manager.invalidate_key("product_detail", str(product_id))
-            cache_manager.invalidate("products_list")
+            def publish():
+                index_product(product)
+                cache_manager.invalidate_tags(*tags)
+
+            after_commit(self.product_repo.session, publish)
         return product
 
+    async def bulk_update(self, items: List[ProductBulkUpdateItem]) -> dict:
+        """
+        Apply price / stock / active changes to many products in one statement,
+        then (once committed) evict their cached entries with a single tag
+        invalidation.
+        """
+        rows = await self.product_repo.bulk_update_products(items)
+
+        tags = {product_tag(row.id) for row in rows}
+        if rows:
+            if any(item.price is not None for item in items):
+                tags.add(PRICE_FILTER_TAG)
+            if any(item.stock_quantity is not None or item.stock_delta for item in items):
+                tags.add(STOCK_FILTER_TAG)
+            if any(item.is_active is not None for item in items):
+                tags.add(ACTIVE_FILTER_TAG)
+
+        def publish():
+            for row in rows:
+                catalog.upsert(CatalogRow(row.id, row.price, row.category_id, row.stock_quantity, row.is_active, row.created_at))
+            cache_manager.invalidate_tags(*tags)
+
+        after_commit(self.product_repo.session, publish)
+
+        updated = {row.id for row in rows}
+        return {
+            "updated": [
+                {"id": row.id, "price": row.price, "stock_quantity": row.stock_quantity, "is_active": row.is_active}
+                for row in rows
+            ],
+            "not_found": [item.id for item in items if item.id not in updated],
+        }
+
+    @staticmethod
+    def invalidate_stock(stock: Dict[int, int]):
+        """
+        Record new stock levels ({product id: quantity}) in the catalog snapshot and
+        evict cached entries showing these products, or filtered on stock. Call it
+        after the stock change commits (see ``after_commit``).
+        """
+        catalog.set_stock(stock)
+        cache_manager.invalidate_tags(STOCK_FILTER_TAG, *(product_tag(product_id) for product_id in stock))
+
     async def create_category(self, category_in: CategoryCreate) -> Category:
         category = await self.product_repo.create_category(category_in)
-        cache_manager.invalidate("categories")
+
+        def publish():
+            suggestion_index.add("category", category.id, category.name)
+            cache_manager.invalidate("categories")
+
+        after_commit(self.product_repo.session, publish)
         return category
 
-    async def get_categories(self, skip: int = 0, limit: int = 100) -> List[Category]:
+    async def get_categories(self, skip: int = 0, limit: int = 100) -> CachedResponse:
         cache_key = f"skip={skip}&limit={limit}"
-        cached = cache_manager.get("categories", cache_key)
-        if cached is not None:
-            return cached
 
-        categories = await self.product_repo.get_categories(skip, limit)
-        cache_manager.set("categories", cache_key, categories)
-        return categories
+        async def load() -> CachedResponse:
+            async with self._cache_filler() as service:
+                categories = await service.product_repo.get_categories(skip, limit)
+                validated = category_list_adapter.validate_python(categories, from_attributes=True)
+            return CachedResponse.from_json(category_list_adapter.dump_json(validated))
+
+        return await cache_manager.get_or_load("categories", cache_key, load)
+
+
+async def rebuild_catalog_indexes():
+    """Load every product (and category name) into this worker's in-memory indexes."""
+    async with SessionLocal() as session:
+        repo = ProductRepository(session)
+        rows = await repo.get_index_rows()
+        categories = await repo.get_categories(0, None)
+    catalog.replace(
+        CatalogRow(row.id, row.price, row.category_id, row.stock_quantity, row.is_active, row.created_at)
+        for row in rows
+    )
+    suggestion_index.replace(
+        [("product", row.id, row.name) for row in rows]
+        + [("category", category.id, category.name) for category in categories]
+    )
+    if search_backend == "memory":
+        search_index.replace((row.id, row.name, row.description, row.category_id) for row in rows)
+    logger.info(f"Catalog indexes rebuilt with {len(rows)} products and {len(categories)} categories")
+
+
+async def run_catalog_index_refresher(interval: float):
+    """Background task: pick up product writes made by other workers."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await rebuild_catalog_indexes()
+        except Exception as e:
+            logger.warning(f"Catalog index rebuild failed: {e}")
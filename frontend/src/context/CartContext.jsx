@@ -39,11 +39,27 @@ export const CartProvider = ({ children }) => {
         }
     };
 
+    // Patch the changed line into the cart from a delta response (the line's product is already loaded)
+    const applyDelta = ({ item }) => {
+        setCart(current => current && {
+            ...current,
+            items: current.items
+                .map(line => line.product.id === item.product_id ? { ...line, id: item.id, quantity: item.quantity } : line)
+                .filter(line => line.quantity > 0),
+        });
+    };
+
     const addToCart = async (productId, quantity = 1) => {
         if (!user) {
             return Promise.reject("User not logged in");
         }
         try {
+            if (cart?.items?.some(line => line.product.id === productId)) {
+                const response = await api.addToCart(productId, quantity, 'delta');
+                applyDelta(response.data);
+                return response.data;
+            }
+            // New line: the full cart brings its product
             const response = await api.addToCart(productId, quantity);
             setCart(response.data);
             return response.data;
@@ -54,8 +70,8 @@ export const CartProvider = ({ children }) => {
 
     const updateQuantity = async (itemId, quantity) => {
         try {
-            const response = await api.updateCartItem(itemId, quantity);
-            setCart(response.data);
+            const response = await api.updateCartItem(itemId, quantity, 'delta');
+            applyDelta(response.data);
         } catch (error) {
             console.error("Failed to update quantity", error);
             throw error;
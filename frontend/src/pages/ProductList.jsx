@@ -1,6 +1,6 @@
 import { useState, useEffect, useRef, useCallback } from 'react';
 import { useQuery } from '@tanstack/react-query';
-import { useSearchParams } from 'react-router-dom';
+import { useNavigate, useSearchParams } from 'react-router-dom';
 import api from '../services/api';
 import ProductCard from '../components/ProductCard';
 
@@ -38,22 +38,29 @@ const categoryColors = [
 
 const ProductList = () => {
     const [searchParams, setSearchParams] = useSearchParams();
+    const navigate = useNavigate();
     const [page, setPage] = useState(0);
     const [allProducts, setAllProducts] = useState([]);
     const [hasMore, setHasMore] = useState(true);
     const observer = useRef();
+    const cursors = useRef([null]); // cursors.current[n] = `after` token of page n (from X-Next-Cursor)
     const categoryScrollRef = useRef();
 
     // Search & Filter State — read from URL params too
     const [searchQuery, setSearchQuery] = useState(searchParams.get('search') || '');
-    const [debouncedSearch, setDebouncedSearch] = useState(searchParams.get('search') || '');
+    const [appliedSearch, setAppliedSearch] = useState(searchParams.get('search') || ''); // Runs the product search
+    const [suggestQuery, setSuggestQuery] = useState('');
+    const [showSuggestions, setShowSuggestions] = useState(false);
     const [selectedCategory, setSelectedCategory] = useState(null);
+    const [priceBucket, setPriceBucket] = useState(null); // { min_price, max_price } from the facets
+    const [inStock, setInStock] = useState(false);
+    const [sort, setSort] = useState('');
 
     const limit = 12;
 
-    // Debounce search (500ms)
+    // Debounce autocomplete (150ms); the full search runs on Enter or when a suggestion is picked
     useEffect(() => {
-        const timer = setTimeout(() => setDebouncedSearch(searchQuery), 500);
+        const timer = setTimeout(() => setSuggestQuery(searchQuery.trim()), 150);
         return () => clearTimeout(timer);
     }, [searchQuery]);
 
@@ -62,7 +69,7 @@ const ProductList = () => {
         const urlSearch = searchParams.get('search');
         if (urlSearch && urlSearch !== searchQuery) {
             setSearchQuery(urlSearch);
-            setDebouncedSearch(urlSearch);
+            setAppliedSearch(urlSearch);
         }
     }, [searchParams]);
 
@@ -71,7 +78,8 @@ const ProductList = () => {
         setAllProducts([]);
         setPage(0);
         setHasMore(true);
-    }, [debouncedSearch, selectedCategory]);
+        cursors.current = [null];
+    }, [appliedSearch, selectedCategory, priceBucket, inStock, sort]);
 
     // Fetch categories
     const { data: categories = [] } = useQuery({
@@ -80,16 +88,46 @@ const ProductList = () => {
         staleTime: 30 * 60 * 1000,
     });
 
+    // Autocomplete (served from the backend's in-memory index, no database query)
+    const { data: suggestions = [] } = useQuery({
+        queryKey: ['suggest', suggestQuery],
+        queryFn: async () => { const res = await api.suggestProducts(suggestQuery); return res.data; },
+        enabled: suggestQuery.length > 0,
+        staleTime: 60 * 1000,
+    });
+
+    // Listing filters shared by the product and facet queries
+    const filterParams = () => {
+        const params = {};
+        if (appliedSearch) params.search = appliedSearch;
+        if (selectedCategory) params.category_id = selectedCategory;
+        if (priceBucket) {
+            params.min_price = priceBucket.min_price;
+            if (priceBucket.max_price !== null) params.max_price = priceBucket.max_price;
+        }
+        if (inStock) params.in_stock = true;
+        return params;
+    };
+
+    // Facet counts (per category / price bucket) for the current filters
+    const { data: facets } = useQuery({
+        queryKey: ['facets', appliedSearch, selectedCategory, priceBucket, inStock],
+        queryFn: async () => { const res = await api.getProductFacets(filterParams()); return res.data; },
+        staleTime: 60 * 1000,
+        placeholderData: (prev) => prev,
+    });
+
     // Fetch products
     const { data: pageData, isFetching } = useQuery({
-        queryKey: ['products', debouncedSearch, selectedCategory, page],
+        queryKey: ['products', appliedSearch, selectedCategory, priceBucket, inStock, sort, page],
         queryFn: async () => {
-            const skip = page * limit;
-            const params = { skip, limit };
-            if (debouncedSearch) params.search = debouncedSearch;
-            if (selectedCategory) params.category_id = selectedCategory;
+            const params = { limit, ...filterParams() };
+            if (cursors.current[page]) params.after = cursors.current[page];
+            if (sort) params.sort = sort;
             const res = await api.getProducts(params);
-            return res.data;
+            const nextCursor = res.headers['x-next-cursor'] || null;
+            cursors.current[page + 1] = nextCursor;
+            return { items: res.data, nextCursor };
         },
         staleTime: 5 * 60 * 1000,
         placeholderData: (prev) => prev,
@@ -98,13 +136,13 @@ const ProductList = () => {
     // Accumulate products
     useEffect(() => {
         if (!pageData) return;
-        if (pageData.length < limit) setHasMore(false);
+        if (!pageData.nextCursor) setHasMore(false);
         if (page === 0) {
-            setAllProducts(pageData);
+            setAllProducts(pageData.items);
         } else {
             setAllProducts(prev => {
                 const ids = new Set(prev.map(p => p.id));
-                return [...prev, ...pageData.filter(p => !ids.has(p.id))];
+                return [...prev, ...pageData.items.filter(p => !ids.has(p.id))];
             });
         }
     }, [pageData, page]);
@@ -123,9 +161,27 @@ const ProductList = () => {
         setSelectedCategory(prev => prev === catId ? null : catId);
     };
 
+    const applySearch = (value) => {
+        setSearchQuery(value);
+        setAppliedSearch(value.trim());
+        setShowSuggestions(false);
+    };
+
+    const handleSuggestionClick = (suggestion) => {
+        if (suggestion.type === 'category') {
+            setSelectedCategory(suggestion.id);
+            applySearch('');
+        } else {
+            navigate(`/products/${suggestion.id}`);
+        }
+    };
+
     const clearFilters = () => {
         setSearchQuery('');
+        setAppliedSearch('');
         setSelectedCategory(null);
+        setPriceBucket(null);
+        setInStock(false);
         setSearchParams({});
     };
 
@@ -133,7 +189,7 @@ const ProductList = () => {
         categoryScrollRef.current?.scrollBy({ left: dir * 200, behavior: 'smooth' });
     };
 
-    const hasActiveFilters = debouncedSearch || selectedCategory;
+    const hasActiveFilters = appliedSearch || selectedCategory || priceBucket || inStock;
     const selectedCatName = categories.find(c => c.id === selectedCategory)?.name;
 
     return (
@@ -209,16 +265,39 @@ const ProductList = () => {
                             type="text"
                             placeholder="Search products..."
                             value={searchQuery}
-                            onChange={e => setSearchQuery(e.target.value)}
+                            onChange={e => { setSearchQuery(e.target.value); setShowSuggestions(true); }}
+                            onKeyDown={e => {
+                                if (e.key === 'Enter') applySearch(searchQuery);
+                                if (e.key === 'Escape') setShowSuggestions(false);
+                            }}
+                            onBlur={() => setShowSuggestions(false)}
                             className="w-full pl-12 pr-10 py-3 bg-white border border-gray-200 rounded-xl text-sm focus:ring-2 focus:ring-indigo-200 focus:border-indigo-400 outline-none shadow-sm"
                         />
                         {searchQuery && (
-                            <button onClick={() => setSearchQuery('')} className="absolute inset-y-0 right-0 pr-4 flex items-center text-gray-400 hover:text-gray-600">
+                            <button onClick={() => applySearch('')} className="absolute inset-y-0 right-0 pr-4 flex items-center text-gray-400 hover:text-gray-600">
                                 <svg className="w-4 h-4" fill="none" viewBox="0 0 24 24" stroke="currentColor" strokeWidth={2}>
                                     <path strokeLinecap="round" strokeLinejoin="round" d="M6 18L18 6M6 6l12 12" />
                                 </svg>
                             </button>
                         )}
+                        {/* Autocomplete — onMouseDown so the pick lands before the input's blur closes the list */}
+                        {showSuggestions && suggestQuery && suggestions.length > 0 && (
+                            <ul className="absolute z-20 mt-1 w-full bg-white border border-gray-200 rounded-xl shadow-lg overflow-hidden">
+                                {suggestions.map(suggestion => (
+                                    <li key={`${suggestion.type}-${suggestion.id}`}>
+                                        <button
+                                            onMouseDown={e => { e.preventDefault(); handleSuggestionClick(suggestion); }}
+                                            className="w-full flex items-center justify-between px-4 py-2.5 text-sm text-left text-gray-700 hover:bg-indigo-50"
+                                        >
+                                            <span className="truncate">{suggestion.name}</span>
+                                            {suggestion.type === 'category' && (
+                                                <span className="ml-2 text-xs text-indigo-500 font-medium">Category</span>
+                                            )}
+                                        </button>
+                                    </li>
+                                ))}
+                            </ul>
+                        )}
                     </div>
                 </div>
 
@@ -235,9 +314,9 @@ const ProductList = () => {
                                         ({allProducts.length} product{allProducts.length !== 1 ? 's' : ''})
                                     </span>
                                 )}
-                                {debouncedSearch && (
+                                {appliedSearch && (
                                     <span className="text-sm bg-indigo-50 text-indigo-600 px-3 py-1 rounded-full font-medium">
-                                        "{debouncedSearch}"
+                                        "{appliedSearch}"
                                     </span>
                                 )}
                             </div>
@@ -255,6 +334,42 @@ const ProductList = () => {
                     )}
                 </div>
 
+                {/* Filters: price buckets with counts, stock, sort */}
+                <div className="flex flex-wrap items-center gap-2 mb-5">
+                    {facets?.price_buckets
+                        .filter(bucket => bucket.count > 0 || priceBucket?.min_price === bucket.min_price)
+                        .map(bucket => {
+                            const selected = priceBucket?.min_price === bucket.min_price;
+                            return (
+                                <button
+                                    key={bucket.min_price}
+                                    onClick={() => setPriceBucket(selected ? null : { min_price: bucket.min_price, max_price: bucket.max_price })}
+                                    className={`px-3 py-1.5 rounded-full text-xs font-medium border transition-colors ${selected
+                                        ? 'bg-indigo-600 border-indigo-600 text-white'
+                                        : 'bg-white border-gray-200 text-gray-600 hover:border-indigo-300'
+                                        }`}
+                                >
+                                    {bucket.max_price !== null ? `₹${bucket.min_price}–₹${bucket.max_price}` : `₹${bucket.min_price}+`}
+                                    <span className={selected ? 'text-indigo-200' : 'text-gray-400'}> ({bucket.count})</span>
+                                </button>
+                            );
+                        })}
+                    <label className="flex items-center gap-1.5 text-xs text-gray-600 ml-1 cursor-pointer">
+                        <input type="checkbox" checked={inStock} onChange={e => setInStock(e.target.checked)} className="rounded text-indigo-600" />
+                        In stock only
+                    </label>
+                    <select
+                        value={sort}
+                        onChange={e => setSort(e.target.value)}
+                        className="ml-auto text-xs bg-white border border-gray-200 rounded-lg px-3 py-1.5 text-gray-600 focus:ring-2 focus:ring-indigo-200 outline-none"
+                    >
+                        <option value="">{appliedSearch ? 'Relevance' : 'Featured'}</option>
+                        <option value="price_asc">Price: Low to High</option>
+                        <option value="price_desc">Price: High to Low</option>
+                        <option value="newest">Newest First</option>
+                    </select>
+                </div>
+
                 {/* Product Grid */}
                 <div className={`grid grid-cols-2 sm:grid-cols-3 lg:grid-cols-4 xl:grid-cols-5 gap-4 transition-opacity duration-200 ${isFetching && allProducts.length > 0 ? 'opacity-60' : 'opacity-100'}`}>
                     {allProducts.map((product, index) => {
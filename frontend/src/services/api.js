@@ -36,19 +36,24 @@ api.interceptors.response.use(
 export const apiMethods = {
     // Products
     getProducts: (params) => api.get('/products/', { params }),
+    suggestProducts: (q) => api.get('/products/suggest', { params: { q } }),
+    getProductFacets: (params) => api.get('/products/facets', { params }),
     getProduct: (id) => api.get(`/products/${id}`),
+    getProductsBatch: (ids) => api.get('/products/', { params: { ids: ids.join(',') } }),
     getCategories: () => api.get('/products/categories'),
 
     // Cart
     getCart: () => api.get('/cart/'),
-    addToCart: (product_id, quantity) => api.post('/cart/items', { product_id, quantity }),
-    updateCartItem: (item_id, quantity) => api.put(`/cart/items/${item_id}?quantity=${quantity}`),
+    // view 'delta': the response is only { item, totals } instead of the whole cart
+    addToCart: (product_id, quantity, view = 'cart') => api.post('/cart/items', { product_id, quantity }, { params: { view } }),
+    updateCartItem: (item_id, quantity, view = 'cart') => api.put(`/cart/items/${item_id}`, null, { params: { quantity, view } }),
     removeFromCart: (item_id) => api.delete(`/cart/items/${item_id}`),
     clearCart: () => api.delete('/cart/'),
 
     // Orders
     createOrder: (data = {}) => api.post('/orders/checkout', data),
-    getOrders: () => api.get('/orders/'),
+    getOrders: (params) => api.get('/orders/', { params }),
+    getOrderSummaries: (params) => api.get('/orders/summary', { params }),
     getOrder: (id) => api.get(`/orders/${id}`),
 
     // Payments
@@ -0,0 +1,88 @@
+"""
+Event-loop lag under a login storm: password verification inline on the
+event loop (how login used to work) vs. on the bounded hashing pool.
+
+A probe task sleeps PROBE_INTERVAL in a loop and records how late it wakes
+up, which is the delay any other request on the worker would see (product
+browsing, cart calls) while the logins are being verified.
+
+    python -m scripts.bench_password_hashing
+    python -m scripts.bench_password_hashing --logins 200 --concurrency 50
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from app.core.security import PasswordHasher, PasswordHasherBusy, get_password_hash, verify_password
+from app.core.config import settings
+
+PROBE_INTERVAL = 0.005
+
+
+async def probe(lags: list, stop: asyncio.Event):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(PROBE_INTERVAL)
+        lags.append(time.perf_counter() - start - PROBE_INTERVAL)
+
+
+async def storm(verify, logins: int, concurrency: int) -> dict:
+    lags: list[float] = []
+    stop = asyncio.Event()
+    probe_task = asyncio.create_task(probe(lags, stop))
+    await asyncio.sleep(PROBE_INTERVAL * 2)
+    semaphore = asyncio.Semaphore(concurrency)
+    rejected = 0
+
+    async def login():
+        nonlocal rejected
+        async with semaphore:
+            try:
+                await verify()
+            except PasswordHasherBusy:
+                rejected += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await probe_task
+
+    lags.sort()
+    return {
+        "logins/s": logins / elapsed,
+        "rejected": rejected,
+        "probe wakeups": len(lags),   # Few wakeups: the loop was blocked most of the time
+        "lag p50 ms": statistics.median(lags) * 1000,
+        "lag p99 ms": lags[int(len(lags) * 0.99) - 1] * 1000,
+        "lag max ms": lags[-1] * 1000,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Event-loop lag during concurrent password verification")
+    parser.add_argument("--logins", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=20, help="Logins in flight at once")
+    args = parser.parse_args()
+
+    hashed = get_password_hash("correct horse battery staple")
+    hasher = PasswordHasher(settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_MAX_PENDING)
+
+    async def inline():
+        verify_password("correct horse battery staple", hashed)
+
+    async def pooled():
+        await hasher.verify_and_update("correct horse battery staple", hashed)
+
+    print(f"{args.logins} logins, {args.concurrency} concurrent, {settings.PASSWORD_HASH_ROUNDS} rounds, "
+          f"{settings.PASSWORD_HASH_WORKERS} hash workers")
+    for name, verify in (("inline (before)", inline), ("hash pool (after)", pooled)):
+        result = await storm(verify, args.logins, args.concurrency)
+        print(f"{name:>18}: " + ", ".join(f"{key} {value:.1f}" if isinstance(value, float) else f"{key} {value}"
+                                          for key, value in result.items()))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,61 @@
+"""
+Import products from an NDJSON or CSV file (e.g. the nightly ERP export),
+upserting by SKU. Run from the project root with the app's environment:
+
+    python -m scripts.import_products catalog.ndjson
+    python -m scripts.import_products catalog.csv
+    erp-export | python -m scripts.import_products - --format csv
+
+Progress goes to stderr, the final report (JSON) to stdout. Exits with
+status 1 when any row failed.
+
+Running API workers keep their own in-memory indexes (and caches, with the
+memory cache backend): they pick the import up on their next catalog index
+refresh (SEARCH_INDEX_REFRESH_INTERVAL) and cache expiry. Use
+POST /api/v1/products/import to make changes visible at once.
+"""
+
+from typing import AsyncIterator
+import argparse
+import asyncio
+import sys
+
+from app.core.database import engine
+from app.services.product_import_service import ProductImportService
+
+READ_SIZE = 64 * 1024
+
+
+async def read_chunks(path: str) -> AsyncIterator[bytes]:
+    stream = sys.stdin.buffer if path == "-" else open(path, "rb")
+    try:
+        while chunk := await asyncio.to_thread(stream.read, READ_SIZE):
+            yield chunk
+    finally:
+        if stream is not sys.stdin.buffer:
+            stream.close()
+
+
+def print_progress(report):
+    print(f"{report.processed} rows read: {report.created} created, {report.updated} updated, "
+          f"{report.failed} failed", file=sys.stderr)
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description="Bulk import products by SKU")
+    parser.add_argument("path", help="NDJSON or CSV file, or - for stdin")
+    parser.add_argument("--format", choices=["ndjson", "csv"],
+                        help="Input format (default: from the file extension, else ndjson)")
+    args = parser.parse_args()
+    format = args.format or ("csv" if args.path.lower().endswith(".csv") else "ndjson")
+
+    try:
+        report = await ProductImportService().import_stream(read_chunks(args.path), format, on_progress=print_progress)
+    finally:
+        await engine.dispose()
+    print(report.model_dump_json(indent=2))
+    return 1 if report.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
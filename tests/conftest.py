@@ -0,0 +1,121 @@
+"""
+Shared fixtures. The suite runs against a throwaway SQLite database (set
+before the app is imported, since settings are read at import time), so it
+needs no PostgreSQL:
+
+    pip install -r requirements-dev.txt
+    python -m pytest -q
+"""
+
+import os
+import tempfile
+
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{tempfile.mkdtemp()}/test.db"
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+
+from fastapi.testclient import TestClient
+from app.main import app
+from app.core.cache import CacheManager, cache_manager
+from app.core.cache_backends import MemoryBackend
+from app.core.config import CacheNamespaceConfig
+from app.core.database import Base, SessionLocal, engine
+from app.core.security import get_password_hash
+from app.models.product import Category, Product
+from app.models.user import User
+from app.services.product_service import rebuild_catalog_indexes
+import asyncio
+import pytest
+
+ADMIN_EMAIL = "admin@example.com"
+PASSWORD = "secret-password"
+NAMESPACE = "test"   # Cache namespace of make_manager
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+async def reset_database():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    # Pooled connections belong to this test's event loop
+    await engine.dispose()
+
+
+async def seed_catalog() -> dict:
+    """Two categories, five books (stock 10) and a phone (stock 3), plus an admin user."""
+    async with SessionLocal() as session:
+        books = Category(name="Books", slug="books")
+        phones = Category(name="Phones", slug="phones")
+        session.add_all([books, phones])
+        await session.flush()
+        products = [
+            Product(name=f"Book {i}", description="a nice book", price=100 + i * 50,
+                    stock_quantity=10, category_id=books.id)
+            for i in range(5)
+        ]
+        products.append(Product(name="Galaxy Phone", description="android", price=900,
+                                stock_quantity=3, category_id=phones.id))
+        session.add_all(products)
+        session.add(User(email=ADMIN_EMAIL, hashed_password=get_password_hash(PASSWORD),
+                         is_superuser=True, full_name="Admin"))
+        await session.commit()
+        return {product.name: product.id for product in products}
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache_manager.invalidate_all()
+    yield
+    cache_manager.invalidate_all()
+
+
+@pytest.fixture
+async def session(anyio_backend):
+    """A session on a fresh, seeded database."""
+    await reset_database()
+    await seed_catalog()
+    async with SessionLocal() as session:
+        yield session
+    await engine.dispose()
+
+
+@pytest.fixture
+def client():
+    """A TestClient (app started) on a fresh, seeded database; ``client.products`` maps names to ids."""
+    asyncio.run(reset_database())
+    with TestClient(app) as client:
+        client.products = client.portal.call(seed_catalog)
+        # Startup indexed the catalog before it was seeded
+        client.portal.call(rebuild_catalog_indexes)
+        yield client
+        client.portal.call(engine.dispose)
+
+
+def login(client: TestClient, email: str = ADMIN_EMAIL, password: str = PASSWORD) -> dict:
+    """Authorization header of a fresh token."""
+    response = client.post("/api/v1/auth/login", data={"username": email, "password": password})
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def add_to_cart(client, headers: dict, product_id: int, quantity: int):
+    """Add a line to the cart of the user ``headers`` authenticate."""
+    response = client.post("/api/v1/cart/items", json={"product_id": product_id, "quantity": quantity}, headers=headers)
+    assert response.status_code == 200, response.text
+
+
+def stock_of(client, product_id: int) -> int:
+    """Current stock_quantity of a product, as the API reports it."""
+    return client.get(f"/api/v1/products/{product_id}").json()["stock_quantity"]
+
+
+def make_manager(backend=None, early_refresh_beta: float = 0.0, **config) -> CacheManager:
+    """A CacheManager of its own with the NAMESPACE namespace (count-weighed, 60 s TTL unless overridden)."""
+    manager = CacheManager(backend=backend or MemoryBackend(), early_refresh_beta=early_refresh_beta)
+    manager.register_namespace(NAMESPACE, CacheNamespaceConfig(**{"ttl": 60, "weigher": "count", **config}))
+    return manager
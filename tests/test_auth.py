@@ -0,0 +1,86 @@
+"""Token revocation: logout, deactivation, the issued-at cutoff and when claims are trusted."""
+
+from sqlalchemy import event
+from app.core.config import settings
+from app.core.database import engine
+from app.core.principals import claims_are_current, is_revoked, revoke_token, revoke_user_tokens
+from tests.conftest import login
+import time
+import pytest
+
+USER_EMAIL = "user@example.com"
+
+
+def register(client) -> tuple[int, dict]:
+    response = client.post(
+        "/api/v1/auth/register", json={"email": USER_EMAIL, "password": "user-password", "full_name": "User"}
+    )
+    assert response.status_code == 200, response.text
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    return client.get("/api/v1/users/me", headers=headers).json()["id"], headers
+
+
+def test_logout_revokes_only_that_token(client):
+    first, second = login(client), login(client)
+    assert client.post("/api/v1/auth/logout", headers=first).status_code == 204
+    assert client.get("/api/v1/users/me", headers=first).status_code == 401
+    assert client.get("/api/v1/users/me", headers=second).status_code == 200
+
+
+def test_deactivation_revokes_earlier_tokens(client):
+    admin = login(client)
+    user_id, user = register(client)
+    assert client.post(f"/api/v1/users/{user_id}/deactivate", headers=admin).status_code == 200
+    assert client.get("/api/v1/users/me", headers=user).status_code == 401
+
+    assert client.post(f"/api/v1/users/{user_id}/activate", headers=admin).status_code == 200
+    # A token issued after the revocation, even within the same second, is accepted
+    fresh = login(client, USER_EMAIL, "user-password")
+    assert client.get("/api/v1/users/me", headers=fresh).status_code == 200
+    assert client.get("/api/v1/users/me", headers=user).status_code == 401
+
+
+def test_claims_skip_the_user_query(client):
+    headers = login(client)
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", record)
+    try:
+        assert client.get("/api/v1/users/me", headers=headers).status_code == 200
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", record)
+    assert not [statement for statement in statements if "FROM users" in statement]
+
+
+@pytest.mark.anyio
+async def test_revocation_cutoff_uses_issued_at():
+    revoke_user_tokens(7)
+    cutoff = time.time()
+    assert await is_revoked({"uid": 7, "jti": "a", "iat": cutoff - 1})
+    assert not await is_revoked({"uid": 7, "jti": "b", "iat": cutoff + 0.001})
+    assert not await is_revoked({"uid": 8, "jti": "c", "iat": cutoff - 1})
+
+
+@pytest.mark.anyio
+async def test_revoked_jti():
+    payload = {"uid": 7, "jti": "token-1", "iat": time.time()}
+    revoke_token(payload)
+    assert await is_revoked(payload)
+    assert not await is_revoked({**payload, "jti": "token-2"})
+
+
+@pytest.mark.anyio
+async def test_revocation_can_be_switched_off(monkeypatch):
+    payload = {"uid": 7, "jti": "token-1", "iat": time.time()}
+    revoke_token(payload)
+    monkeypatch.setattr(settings, "TOKEN_REVOCATION", False)
+    assert not await is_revoked(payload)
+
+
+def test_claims_are_trusted_while_revocation_is_on(monkeypatch):
+    assert claims_are_current()
+    monkeypatch.setattr(settings, "TOKEN_REVOCATION", False)
+    assert not claims_are_current()
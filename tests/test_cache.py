@@ -0,0 +1,100 @@
+"""CacheManager single-flight loads and XFetch early refresh."""
+
+from app.core.cache import CacheEntry
+from tests.conftest import NAMESPACE, make_manager
+import asyncio
+import time
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+class CountingLoader:
+    """Loader returning ``value`` after ``delay`` seconds, counting its calls."""
+
+    def __init__(self, value="loaded", delay: float = 0.05):
+        self.value = value
+        self.delay = delay
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return self.value
+
+
+# --- Single-flight ---
+
+async def test_concurrent_misses_share_one_load():
+    manager = make_manager()
+    loader = CountingLoader()
+    results = await asyncio.gather(*(manager.get_or_load(NAMESPACE, "k", loader) for _ in range(20)))
+    assert results == ["loaded"] * 20
+    assert loader.calls == 1
+    # Now cached: no further load
+    assert await manager.get_or_load(NAMESPACE, "k", loader) == "loaded"
+    assert loader.calls == 1
+
+
+async def test_waiters_survive_a_cancelled_leader():
+    manager = make_manager()
+    loader = CountingLoader(delay=0.1)
+    leader = asyncio.create_task(manager.get_or_load(NAMESPACE, "k", loader))
+    await asyncio.sleep(0.01)
+    waiters = [asyncio.create_task(manager.get_or_load(NAMESPACE, "k", loader)) for _ in range(3)]
+    await asyncio.sleep(0.01)
+    leader.cancel()
+    assert await asyncio.gather(*waiters) == ["loaded"] * 3
+    assert leader.cancelled()
+    # One waiter took over the load
+    assert loader.calls == 2
+
+
+async def test_failed_load_reaches_waiters_and_is_not_cached():
+    manager = make_manager()
+
+    async def failing():
+        await asyncio.sleep(0.02)
+        raise RuntimeError("database down")
+
+    results = await asyncio.gather(
+        *(manager.get_or_load(NAMESPACE, "k", failing) for _ in range(3)), return_exceptions=True
+    )
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert await manager.get_or_load(NAMESPACE, "k", CountingLoader()) == "loaded"
+
+
+async def test_none_is_not_cached():
+    manager = make_manager()
+    loader = CountingLoader(value=None, delay=0)
+    assert await manager.get_or_load(NAMESPACE, "k", loader) is None
+    assert await manager.get_or_load(NAMESPACE, "k", loader) is None
+    assert loader.calls == 2
+
+
+# --- XFetch ---
+
+def test_early_refresh_probability_grows_near_expiry(monkeypatch):
+    manager = make_manager(early_refresh_beta=1.0)
+    # -log(1 - 0.9) ~ 2.3: the jitter is 2.3 x the load time
+    monkeypatch.setattr("app.core.cache.random.random", lambda: 0.9)
+    now = time.time()
+    assert manager._should_refresh_early(CacheEntry("v", expires_at=now + 1.0, delta=1.0))
+    assert not manager._should_refresh_early(CacheEntry("v", expires_at=now + 60.0, delta=1.0))
+    # Instant loads and beta 0 never refresh early
+    assert not manager._should_refresh_early(CacheEntry("v", expires_at=now + 0.1, delta=0.0))
+    manager.early_refresh_beta = 0
+    assert not manager._should_refresh_early(CacheEntry("v", expires_at=now + 1.0, delta=1.0))
+
+
+async def test_early_refresh_serves_current_value_while_one_request_reloads(monkeypatch):
+    manager = make_manager(early_refresh_beta=1.0, ttl=5)
+    # Jitter of ~6.9 s against 5 s left: due for an early refresh
+    monkeypatch.setattr("app.core.cache.random.random", lambda: 0.999)
+    manager.set(NAMESPACE, "k", "old", delta=1.0)
+    loader = CountingLoader(value="new", delay=0.05)
+    results = await asyncio.gather(*(manager.get_or_load(NAMESPACE, "k", loader) for _ in range(5)))
+    # The winner returns the fresh value, everyone else the cached one, and only one load ran
+    assert sorted(results) == ["new"] + ["old"] * 4
+    assert loader.calls == 1
+    assert manager.get(NAMESPACE, "k") == "new"
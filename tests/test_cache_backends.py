@@ -0,0 +1,28 @@
+"""Shared SQLite and tiered cache backends."""
+
+from app.core.cache_backends import MemoryBackend, SQLiteBackend, TieredBackend
+from tests.conftest import NAMESPACE, make_manager
+import pytest
+
+
+@pytest.mark.anyio
+async def test_tiered_replays_invalidations_from_another_worker():
+    shared = SQLiteBackend(":memory:")
+    worker_a = make_manager(TieredBackend(MemoryBackend(), shared, sync_interval=0))
+    worker_b = make_manager(TieredBackend(MemoryBackend(), shared, sync_interval=0))
+    worker_a.set(NAMESPACE, "k", "v", tags={"product:1"})
+    assert await worker_b.aget(NAMESPACE, "k") == "v"   # Promoted into b's L1
+    worker_a.invalidate_tags("product:1")
+    assert await worker_b.aget(NAMESPACE, "k") is None
+
+
+def test_sqlite_backend_stays_within_budget():
+    backend = SQLiteBackend(":memory:")
+    manager = make_manager(backend, maxsize=100)
+    for i in range(250):
+        manager.set(NAMESPACE, str(i), i)
+    backend.wait_for_writes()
+    stats = backend.stats()[NAMESPACE]
+    assert stats["size"] <= 100
+    # The latest writes survive eviction
+    assert manager.get(NAMESPACE, "249") == 249
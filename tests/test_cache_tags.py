@@ -0,0 +1,79 @@
+"""Tag invalidation on every cache backend, and through the product API."""
+
+from app.core.cache_backends import MemoryBackend, SQLiteBackend, TieredBackend
+from app.core.config import CacheNamespaceConfig
+from tests.conftest import NAMESPACE, login, make_manager
+import pytest
+
+
+def make_backend(kind: str):
+    if kind == "memory":
+        return MemoryBackend()
+    if kind == "sqlite":
+        return SQLiteBackend(":memory:")
+    return TieredBackend(MemoryBackend(), SQLiteBackend(":memory:"), sync_interval=0)
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("kind", ["memory", "sqlite", "tiered"])
+async def test_invalidate_tags_removes_only_tagged_entries(kind):
+    backend = make_backend(kind)
+    manager = make_manager(backend)
+    manager.register_namespace("other", CacheNamespaceConfig(ttl=60, weigher="count"))
+    manager.set(NAMESPACE, "detail:1", "p1", tags={"product:1"})
+    manager.set(NAMESPACE, "list:books", "books", tags={"category:1", "product:1", "product:2"})
+    manager.set(NAMESPACE, "list:phones", "phones", tags={"category:2", "product:6"})
+    manager.set("other", "detail:1", "p1", tags={"product:1"})
+
+    manager.invalidate_tags("product:1")
+
+    assert await manager.aget(NAMESPACE, "detail:1") is None
+    assert await manager.aget(NAMESPACE, "list:books") is None
+    assert await manager.aget("other", "detail:1") is None
+    assert await manager.aget(NAMESPACE, "list:phones") == "phones"
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("kind", ["memory", "sqlite", "tiered"])
+async def test_rewriting_an_entry_replaces_its_tags(kind):
+    manager = make_manager(make_backend(kind))
+    manager.set(NAMESPACE, "k", "v1", tags={"a"})
+    manager.set(NAMESPACE, "k", "v2", tags={"b"})
+    manager.invalidate_tags("a")
+    assert await manager.aget(NAMESPACE, "k") == "v2"
+    manager.invalidate_tags("b")
+    assert await manager.aget(NAMESPACE, "k") is None
+
+
+@pytest.mark.anyio
+async def test_loader_may_add_tags():
+    manager = make_manager()
+    tags = set()
+
+    async def load():
+        tags.add("product:1")
+        return "page"
+
+    await manager.get_or_load(NAMESPACE, "k", load, tags=tags)
+    manager.invalidate_tags("product:1")
+    assert manager.get(NAMESPACE, "k") is None
+
+
+def test_update_invalidates_only_the_affected_entries(client):
+    headers = login(client)
+    phone, book = client.products["Galaxy Phone"], client.products["Book 0"]
+    books_category = client.get(f"/api/v1/products/{book}").json()["category_id"]
+    books_page = client.get("/api/v1/products/", params={"category_id": books_category})
+    assert client.get(f"/api/v1/products/{phone}").json()["price"] == 900
+
+    response = client.put(f"/api/v1/products/{phone}", json={"price": 999}, headers=headers)
+    assert response.status_code == 200
+
+    assert client.get(f"/api/v1/products/{phone}").json()["price"] == 999
+    assert 999 in [product["price"] for product in client.get("/api/v1/products/").json()]
+    # The books listing never showed the phone: still served from cache (same ETag, 304)
+    cached = client.get(
+        "/api/v1/products/", params={"category_id": books_category},
+        headers={"If-None-Match": books_page.headers["etag"]},
+    )
+    assert cached.status_code == 304
@@ -0,0 +1,163 @@
+"""In-memory cart engine: write-behind flushes, failure handling and eviction."""
+
+from sqlalchemy import select
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.cart import Cart, CartItem
+from app.models.product import Product
+from app.repositories.cart_repo import CartRepository
+from app.services.cart_engine import CartEngine, cart_engine
+from tests.conftest import login
+import pytest
+
+USER_ID = 1   # The seeded admin
+
+
+async def stored_lines(user_id: int = USER_ID) -> dict[int, int]:
+    """{product id: quantity} of the user's cart rows in the database."""
+    async with SessionLocal() as session:
+        result = await session.execute(
+            select(CartItem.product_id, CartItem.quantity).join(Cart).where(Cart.user_id == user_id)
+        )
+        return dict(result.all())
+
+
+async def product_ids(session) -> list[int]:
+    return list((await session.execute(select(Product.id).order_by(Product.id))).scalars())
+
+
+@pytest.mark.anyio
+async def test_changes_reach_the_database_only_on_flush(session):
+    first, second = (await product_ids(session))[:2]
+    engine = CartEngine(max_carts=10)
+    state = await engine.get(USER_ID)
+    state.set_quantity(first, 2)
+    engine.mark_dirty(USER_ID)
+    assert await stored_lines() == {}
+
+    await engine.flush()
+    assert await stored_lines() == {first: 2}
+    assert engine.dirty_count == 0
+
+    # Update, insert and removal in the next batch
+    state.set_quantity(first, 5)
+    state.set_quantity(second, 1)
+    engine.mark_dirty(USER_ID)
+    await engine.flush()
+    assert await stored_lines() == {first: 5, second: 1}
+
+    state.set_quantity(first, 0)
+    engine.mark_dirty(USER_ID)
+    await engine.flush()
+    assert await stored_lines() == {second: 1}
+    assert state.items() == [(state.item(second)[0], second, 1)]
+
+
+@pytest.mark.anyio
+async def test_flush_only_writes_the_given_users(session):
+    first = (await product_ids(session))[0]
+    engine = CartEngine(max_carts=10)
+    for user_id in (USER_ID, 2):
+        (await engine.get(user_id)).set_quantity(first, user_id)
+        engine.mark_dirty(user_id)
+
+    await engine.flush([USER_ID])
+
+    assert await stored_lines(USER_ID) == {first: 1}
+    assert await stored_lines(2) == {}
+    assert engine.dirty_count == 1
+
+
+@pytest.mark.anyio
+async def test_failed_flush_keeps_changes_pending(session, monkeypatch):
+    first = (await product_ids(session))[0]
+    engine = CartEngine(max_carts=10)
+    (await engine.get(USER_ID)).set_quantity(first, 3)
+    engine.mark_dirty(USER_ID)
+
+    async def unavailable(*args, **kwargs):
+        raise ConnectionError("database unavailable")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(CartRepository, "apply_item_changes", unavailable)
+        with pytest.raises(ConnectionError):
+            await engine.flush()
+    assert engine.dirty_count == 1
+
+    await engine.flush()
+    assert await stored_lines() == {first: 3}
+    assert engine.dirty_count == 0
+
+
+@pytest.mark.anyio
+async def test_loaded_cart_reflects_stored_rows(session):
+    first, second = (await product_ids(session))[:2]
+    engine = CartEngine(max_carts=10)
+    cart_id = await CartRepository(session).get_cart_id(USER_ID)
+    await CartRepository(session).add_item(cart_id, first, 4)
+    await session.commit()
+
+    state = await engine.get(USER_ID)
+    assert state.quantity(first) == 4
+
+    # Rows changed elsewhere are picked up once the cart is forgotten
+    await CartRepository(session).add_item(cart_id, second, 1)
+    await session.commit()
+    engine.forget(USER_ID)
+    assert (await engine.get(USER_ID)).quantity(second) == 1
+
+
+@pytest.mark.anyio
+async def test_eviction_waits_for_dirty_carts(session):
+    first = (await product_ids(session))[0]
+    engine = CartEngine(max_carts=1)
+    for user_id in (USER_ID, 2):
+        (await engine.get(user_id)).set_quantity(first, 1)
+        engine.mark_dirty(user_id)
+    # Over the limit, but neither cart has been written yet
+    assert len(engine) == 2
+
+    await engine.flush()
+    assert len(engine) == 1
+    assert await stored_lines(USER_ID) == {first: 1}
+    assert await stored_lines(2) == {first: 1}
+
+
+@pytest.mark.anyio
+async def test_cart_in_use_survives_other_loads(session):
+    first = (await product_ids(session))[0]
+    engine = CartEngine(max_carts=1)
+    async with engine.use(USER_ID) as state:
+        # Another user's cart is loaded while this request awaits (e.g. a stock lookup)
+        await engine.get(2)
+        state.set_quantity(first, 2)
+        engine.mark_dirty(USER_ID)
+
+    await engine.flush()
+    assert await stored_lines() == {first: 2}
+    assert engine._in_use == {}
+
+
+@pytest.fixture
+def memory_carts(monkeypatch):
+    monkeypatch.setattr(settings, "CART_ENGINE", "memory")
+    for user_id in list(cart_engine._carts):
+        cart_engine.forget(user_id)
+    yield cart_engine
+    for user_id in list(cart_engine._carts):
+        cart_engine.forget(user_id)
+
+
+def test_checkout_writes_pending_lines_and_starts_an_empty_cart(client, memory_carts):
+    headers = login(client)
+    book = client.products["Book 0"]
+    response = client.post("/api/v1/cart/items", json={"product_id": book, "quantity": 2}, headers=headers)
+    assert response.status_code == 200
+    assert memory_carts.dirty_count == 1
+
+    order = client.post("/api/v1/orders/checkout", json={}, headers=headers)
+
+    assert order.status_code == 200, order.text
+    assert [(item["product_id"], item["quantity"]) for item in order.json()["items"]] == [(book, 2)]
+    assert client.get("/api/v1/cart/", headers=headers).json()["items"] == []
+    assert client.portal.call(stored_lines) == {}
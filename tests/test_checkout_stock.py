@@ -0,0 +1,76 @@
+"""Checkout stock: one guarded bulk UPDATE, all lines or none."""
+
+from sqlalchemy import select, update
+from app.core.database import SessionLocal
+from app.models.product import Product
+from app.repositories.product_repo import ProductRepository
+from tests.conftest import add_to_cart, login, stock_of
+import pytest
+
+
+def test_checkout_deducts_stock(client):
+    headers = login(client)
+    book = client.products["Book 0"]
+    add_to_cart(client, headers, book, 4)
+    assert client.post("/api/v1/orders/checkout", json={}, headers=headers).status_code == 200
+    assert stock_of(client, book) == 6
+    assert client.get("/api/v1/cart/", headers=headers).json()["items"] == []
+
+
+def test_short_line_aborts_the_whole_checkout(client):
+    headers = login(client)
+    book, phone = client.products["Book 0"], client.products["Galaxy Phone"]
+    add_to_cart(client, headers, book, 2)
+    add_to_cart(client, headers, phone, 3)
+    # Stock drops below the cart's quantity after it was added
+    assert client.put(f"/api/v1/products/{phone}", json={"stock_quantity": 1}, headers=headers).status_code == 200
+
+    response = client.post("/api/v1/orders/checkout", json={}, headers=headers)
+
+    assert response.status_code == 400
+    assert "out of stock" in response.json()["detail"]
+    # Nothing was deducted, not even for the line that had enough
+    assert stock_of(client, book) == 10
+    assert stock_of(client, phone) == 1
+    assert len(client.get("/api/v1/cart/", headers=headers).json()["items"]) == 2
+
+
+def test_out_of_stock_message_shows_the_current_stock(client, monkeypatch):
+    headers = login(client)
+    phone = client.products["Galaxy Phone"]
+    add_to_cart(client, headers, phone, 3)
+    decrease_stock_bulk = ProductRepository.decrease_stock_bulk
+
+    async def after_a_concurrent_checkout(self, quantities):
+        # Another checkout takes two phones after this one loaded the cart (stock 3)
+        async with SessionLocal() as session:
+            await session.execute(update(Product).where(Product.id == phone).values(stock_quantity=1))
+            await session.commit()
+        return await decrease_stock_bulk(self, quantities)
+
+    monkeypatch.setattr(ProductRepository, "decrease_stock_bulk", after_a_concurrent_checkout)
+    response = client.post("/api/v1/orders/checkout", json={}, headers=headers)
+
+    assert response.status_code == 400
+    assert "Requested: 3, Available: 1" in response.json()["detail"]
+
+
+@pytest.mark.anyio
+async def test_guarded_stock_update_skips_short_rows(session):
+    ids = dict((await session.execute(select(Product.name, Product.id))).all())
+    book, phone = ids["Book 0"], ids["Galaxy Phone"]
+
+    remaining = await ProductRepository(session).decrease_stock_bulk({book: 4, phone: 5})
+
+    # The book had enough (10), the phone did not (3) and is left untouched
+    assert remaining == {book: 6}
+    rows = dict((await session.execute(select(Product.id, Product.stock_quantity))).all())
+    assert rows[book] == 6
+    assert rows[phone] == 3
+
+
+@pytest.mark.anyio
+async def test_guarded_stock_update_allows_exact_stock(session):
+    phone = (await session.execute(select(Product.id).where(Product.name == "Galaxy Phone"))).scalar_one()
+    assert await ProductRepository(session).decrease_stock_bulk({phone: 3}) == {phone: 0}
+    assert await ProductRepository(session).decrease_stock_bulk({phone: 1}) == {}
@@ -0,0 +1,68 @@
+"""Checkout Idempotency-Key: claim, replay and rejection of reused keys."""
+
+from app.repositories.idempotency_repo import IdempotencyRepository
+from tests.conftest import add_to_cart, login, stock_of
+import pytest
+
+
+def checkout(client, headers: dict, key: str | None = None, **body):
+    return client.post(
+        "/api/v1/orders/checkout", json=body, headers={**headers, **({"Idempotency-Key": key} if key else {})}
+    )
+
+
+def test_retry_with_the_same_key_replays_the_order(client):
+    headers = login(client)
+    book = client.products["Book 0"]
+    add_to_cart(client, headers, book, 2)
+
+    first = checkout(client, headers, key="order-1")
+    retry = checkout(client, headers, key="order-1")
+
+    assert first.status_code == retry.status_code == 200
+    assert "Idempotent-Replayed" not in first.headers
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert retry.content == first.content
+    # Stock was deducted once
+    assert stock_of(client, book) == 8
+    assert len(client.get("/api/v1/orders/", headers=headers).json()) == 1
+
+
+def test_key_reused_with_a_different_body_is_rejected(client):
+    headers = login(client)
+    add_to_cart(client, headers, client.products["Book 0"], 1)
+    assert checkout(client, headers, key="order-1").status_code == 200
+    assert checkout(client, headers, key="order-1", coupon_code="SAVE10").status_code == 422
+
+
+def test_key_reused_for_a_changed_cart_is_rejected(client):
+    headers = login(client)
+    add_to_cart(client, headers, client.products["Book 0"], 1)
+    assert checkout(client, headers, key="order-1").status_code == 200
+    add_to_cart(client, headers, client.products["Book 1"], 1)
+
+    assert checkout(client, headers, key="order-1").status_code == 422
+    assert checkout(client, headers, key="order-2").status_code == 200
+
+
+def test_failed_checkout_releases_the_key(client):
+    headers = login(client)
+    assert checkout(client, headers, key="order-1").status_code == 400   # Empty cart
+    add_to_cart(client, headers, client.products["Book 0"], 1)
+    response = checkout(client, headers, key="order-1")
+    assert response.status_code == 200
+    assert "Idempotent-Replayed" not in response.headers
+
+
+@pytest.mark.anyio
+async def test_claim_is_granted_once(session):
+    repo = IdempotencyRepository(session)
+    key_id = await repo.claim(1, "order-1", "a" * 64)
+    assert key_id is not None
+    assert await repo.claim(1, "order-1", "a" * 64) is None
+    # Keys are per user
+    assert await repo.claim(2, "order-1", "a" * 64) is not None
+
+    await repo.save_response(key_id, b'{"id": 1}')
+    stored = await repo.get(1, "order-1")
+    assert stored.response_body == b'{"id": 1}'
@@ -0,0 +1,41 @@
+"""Metrics registry, /metrics and /cache/stats."""
+
+from app.core.cache_backends import SQLiteBackend
+from app.core.metrics import MetricsRegistry
+from tests.conftest import NAMESPACE, make_manager
+import json
+import os
+import pytest
+
+
+def test_scrape_endpoints(client):
+    client.get(f"/api/v1/products/{client.products['Book 0']}")
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert 'cache_misses_total{namespace="product_detail"}' in response.text
+    assert client.get("/cache/stats").json()["product_detail"]["misses"] >= 1
+
+
+@pytest.mark.anyio
+async def test_multiprocess_render_sums_live_workers(tmp_path):
+    registry = MetricsRegistry(str(tmp_path))
+    requests = registry.counter("requests_total", "Requests", ["route"])
+    requests.inc("/", amount=2)
+    # Another live worker's snapshot (the parent process stands in for it)
+    with open(tmp_path / f"metrics_{os.getppid()}.json", "w") as f:
+        json.dump({"requests_total": [["requests_total", ["/"], 3]]}, f)
+
+    text = await registry.arender()
+
+    assert 'requests_total{route="/"} 5' in text
+    assert text == registry.render()
+
+
+@pytest.mark.anyio
+async def test_sqlite_stats_off_the_event_loop():
+    backend = SQLiteBackend(":memory:")
+    manager = make_manager(backend)
+    manager.set(NAMESPACE, "k", "v")
+    backend.wait_for_writes()
+    assert (await manager.astats())[NAMESPACE]["size"] == 1
+    assert manager.stats()[NAMESPACE]["size"] == 1
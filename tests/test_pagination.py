@@ -0,0 +1,79 @@
+"""Keyset cursors for product listings and order history."""
+
+from fastapi import HTTPException
+from app.core.pagination import NEXT_CURSOR_HEADER, decode_cursor, encode_cursor
+from datetime import datetime
+from tests.conftest import add_to_cart, login
+import pytest
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2024, 5, 1, 12, 30)
+    assert decode_cursor(encode_cursor(created_at, 42), datetime, int) == (created_at, 42)
+    assert decode_cursor(encode_cursor(19.5, 7), float, int) == (19.5, 7)
+
+
+@pytest.mark.parametrize("token", ["not-a-cursor", encode_cursor(1, 2)])
+def test_invalid_cursor_is_rejected(token):
+    with pytest.raises(HTTPException) as excinfo:
+        decode_cursor(token, int)
+    assert excinfo.value.status_code == 400
+
+
+def walk(client, **params) -> list[int]:
+    """Ids of every page of a listing, following X-Next-Cursor."""
+    ids, after = [], None
+    while True:
+        response = client.get("/api/v1/products/", params={**params, **({"after": after} if after else {})})
+        assert response.status_code == 200, response.text
+        ids += [product["id"] for product in response.json()]
+        after = response.headers.get(NEXT_CURSOR_HEADER)
+        if after is None:
+            return ids
+
+
+def test_keyset_pages_cover_the_listing_once(client):
+    assert walk(client, limit=2) == sorted(client.products.values())
+
+
+def test_keyset_pages_follow_the_sort(client):
+    prices = {product["id"]: product["price"] for product in client.get("/api/v1/products/").json()}
+    ids = walk(client, limit=2, sort="price_desc")
+    assert sorted(ids) == sorted(prices)
+    assert [prices[product_id] for product_id in ids] == sorted(prices.values(), reverse=True)
+
+
+def test_keyset_pages_of_a_search(client):
+    ids = walk(client, limit=2, search="book")
+    books = [product_id for name, product_id in client.products.items() if name.startswith("Book")]
+    assert sorted(ids) == sorted(books)
+    assert len(ids) == len(set(ids))
+
+
+def test_last_page_has_no_cursor(client):
+    response = client.get("/api/v1/products/", params={"limit": 100})
+    assert NEXT_CURSOR_HEADER not in response.headers
+
+
+def test_bad_cursor_is_a_400(client):
+    assert client.get("/api/v1/products/", params={"after": "garbage"}).status_code == 400
+
+
+def test_order_history_pages_newest_first(client):
+    headers = login(client)
+    order_ids = []
+    for _ in range(5):
+        add_to_cart(client, headers, client.products["Book 0"], 1)
+        order_ids.append(client.post("/api/v1/orders/checkout", json={}, headers=headers).json()["id"])
+
+    pages, after = [], None
+    while True:
+        response = client.get("/api/v1/orders/", params={"limit": 2, **({"after": after} if after else {})},
+                              headers=headers)
+        pages.append([order["id"] for order in response.json()])
+        after = response.headers.get(NEXT_CURSOR_HEADER)
+        if after is None:
+            break
+
+    assert [len(page) for page in pages] == [2, 2, 1]
+    assert [order_id for page in pages for order_id in page] == order_ids[::-1]
@@ -0,0 +1,39 @@
+"""Password hashing pool: fail-fast limit and pending-job accounting."""
+
+from app.core.security import PasswordHasher, PasswordHasherBusy
+import asyncio
+import threading
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_hash_round_trip():
+    hasher = PasswordHasher(workers=1, max_pending=4)
+    hashed = await hasher.hash("secret-password")
+    assert await hasher.verify_and_update("secret-password", hashed) == (True, None)
+    assert (await hasher.verify_and_update("wrong", hashed))[0] is False
+    assert hasher.pending == 0
+
+
+async def test_cancelled_caller_keeps_its_job_counted():
+    hasher = PasswordHasher(workers=1, max_pending=1)
+    release = threading.Event()
+    caller = asyncio.create_task(hasher._run(release.wait))
+    try:
+        await asyncio.sleep(0.01)
+        caller.cancel()
+        await asyncio.sleep(0.01)
+
+        # The job still runs on the pool, so it still takes the only slot
+        assert hasher.pending == 1
+        with pytest.raises(PasswordHasherBusy):
+            await hasher.hash("secret-password")
+    finally:
+        release.set()
+    for _ in range(100):
+        if hasher.pending == 0:
+            break
+        await asyncio.sleep(0.01)
+    assert hasher.pending == 0
+    assert caller.cancelled()
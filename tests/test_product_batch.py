@@ -0,0 +1,9 @@
+"""Batch product lookup via GET /products/?ids=."""
+
+
+def test_batch_lookup_by_ids(client):
+    book, phone = client.products["Book 1"], client.products["Galaxy Phone"]
+    response = client.get("/api/v1/products/", params={"ids": f"{phone},999,{book}"})
+    assert response.status_code == 200
+    assert [(item["id"], item["found"]) for item in response.json()] == [(phone, True), (999, False), (book, True)]
+    assert client.get("/api/v1/products/", params={"ids": "a,b"}).status_code == 400
@@ -0,0 +1,33 @@
+"""Catalog import: chunked upserts by SKU."""
+
+from sqlalchemy import func, select
+from app.models.product import Category, Product
+from app.schemas.product import ProductImportRow
+from app.services.product_import_service import IMPORT_CHUNK_SIZE, MAX_BIND_PARAMETERS, ProductImportService
+import json
+import pytest
+
+
+def test_chunk_fits_the_bound_parameter_limit():
+    assert IMPORT_CHUNK_SIZE * len(ProductImportRow.model_fields) <= MAX_BIND_PARAMETERS
+
+
+async def stream(lines):
+    yield "\n".join(lines).encode()
+
+
+@pytest.mark.anyio
+async def test_import_spanning_several_chunks(session):
+    category_id = (await session.execute(select(Category.id).where(Category.slug == "books"))).scalar_one()
+    rows = [
+        json.dumps({"sku": f"SKU-{i}", "name": f"Imported {i}", "price": 10 + i, "category_id": category_id})
+        for i in range(IMPORT_CHUNK_SIZE * 2 + 10)
+    ]
+    progress = []
+
+    report = await ProductImportService().import_stream(stream(rows), "ndjson", on_progress=progress.append)
+
+    assert (report.created, report.updated, report.failed) == (len(rows), 0, 0)
+    assert len(progress) == 3   # Once per chunk
+    count = await session.scalar(select(func.count()).select_from(Product).where(Product.sku.like("SKU-%")))
+    assert count == len(rows)
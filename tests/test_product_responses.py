@@ -0,0 +1,51 @@
+"""Product responses cached as encoded JSON with a content ETag."""
+
+from app.core.cache import CachedResponse, cache_manager
+from tests.conftest import login
+
+
+def test_detail_is_cached_as_encoded_json(client):
+    book = client.products["Book 0"]
+    first = client.get(f"/api/v1/products/{book}")
+    assert first.status_code == 200
+    assert first.json()["name"] == "Book 0"
+
+    cached = cache_manager.get("product_detail", str(book))
+    assert isinstance(cached, CachedResponse)
+    assert cached.body == first.content
+    assert cached.etag == first.headers["etag"]
+    # A hit sends the same bytes
+    assert client.get(f"/api/v1/products/{book}").content == first.content
+
+
+def test_current_etag_is_answered_with_304(client):
+    book = client.products["Book 0"]
+    etag = client.get(f"/api/v1/products/{book}").headers["etag"]
+
+    response = client.get(f"/api/v1/products/{book}", headers={"If-None-Match": f'"stale", {etag}'})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+
+    assert client.get(f"/api/v1/products/{book}", headers={"If-None-Match": '"stale"'}).status_code == 200
+
+
+def test_listing_keeps_its_headers_in_the_cache(client):
+    first = client.get("/api/v1/products/", params={"limit": 2})
+    second = client.get("/api/v1/products/", params={"limit": 2})
+    assert second.content == first.content
+    assert second.headers["etag"] == first.headers["etag"]
+    assert second.headers["x-next-cursor"] == first.headers["x-next-cursor"]
+
+
+def test_update_changes_the_body_and_etag(client):
+    headers = login(client)
+    book = client.products["Book 0"]
+    before = client.get(f"/api/v1/products/{book}")
+
+    assert client.put(f"/api/v1/products/{book}", json={"price": 1}, headers=headers).status_code == 200
+
+    after = client.get(f"/api/v1/products/{book}", headers={"If-None-Match": before.headers["etag"]})
+    assert after.status_code == 200
+    assert after.json()["price"] == 1
+    assert after.headers["etag"] != before.headers["etag"]
@@ -0,0 +1,76 @@
+"""Read replicas: shared caches are filled from the primary, and writers are pinned to it."""
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from starlette.requests import Request
+from app.core.database import ReadYourWritesGuard, engine, primary_read_session
+from app.models.product import Product
+from app.repositories.product_repo import ProductRepository
+from app.services.product_service import ProductService
+import json
+import shutil
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def lagging_replica(session, tmp_path):
+    """A replica session on a copy of the seeded database, so it misses every later commit."""
+    path = tmp_path / "replica.db"
+    shutil.copyfile(engine.url.database, path)
+    replica = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    factory = sessionmaker(bind=replica, class_=AsyncSession, expire_on_commit=False, info={"replica": True})
+    async with factory() as replica_session:
+        yield replica_session
+    await replica.dispose()
+
+
+async def reprice(session, name: str, price: float) -> int:
+    product_id = (await session.execute(select(Product.id).where(Product.name == name))).scalar_one()
+    await session.execute(update(Product).where(Product.id == product_id).values(price=price))
+    await session.commit()
+    return product_id
+
+
+async def test_primary_session_is_used_as_is(session):
+    async with primary_read_session(session) as primary:
+        assert primary is session
+
+
+async def test_replica_session_is_swapped_for_the_primary(lagging_replica):
+    async with primary_read_session(lagging_replica) as primary:
+        assert primary is not lagging_replica
+        assert not primary.info.get("replica")
+
+
+async def test_detail_miss_is_loaded_from_the_primary(session, lagging_replica):
+    phone = await reprice(session, "Galaxy Phone", 999)
+    service = ProductService(ProductRepository(lagging_replica))
+
+    cached = await service.get_product(phone)
+
+    assert json.loads(cached.body)["price"] == 999
+    assert (await service.get_product_bodies([phone]))[phone] == cached.body
+
+
+async def test_listing_miss_is_loaded_from_the_primary(session, lagging_replica):
+    phone = await reprice(session, "Galaxy Phone", 999)
+    service = ProductService(ProductRepository(lagging_replica))
+
+    listing = json.loads((await service.get_all_products()).body)
+
+    assert {product["id"]: product["price"] for product in listing}[phone] == 999
+
+
+def request_with(authorization: str) -> Request:
+    return Request({"type": "http", "headers": [(b"authorization", authorization.encode())]})
+
+
+async def test_writer_is_pinned_to_the_primary():
+    guard = ReadYourWritesGuard(seconds=5)
+    writer, reader = request_with("Bearer writer"), request_with("Bearer reader")
+    guard.pin(writer)
+    assert await guard.is_pinned(writer)
+    assert not await guard.is_pinned(reader)
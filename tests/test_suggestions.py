@@ -0,0 +1,34 @@
+"""Autocomplete prefix index."""
+
+from app.core.search import SuggestionIndex
+import pytest
+
+
+@pytest.fixture
+def index():
+    index = SuggestionIndex()
+    index.replace([
+        ("product", 1, "Red  Shoes"),   # Stored with a double space
+        ("product", 2, "Red Shirt"),
+        ("product", 3, "Blue Running Shoes"),
+        ("category", 1, "Shoes"),
+    ])
+    return index
+
+
+@pytest.mark.parametrize("typed", ["red sh", "red  sh", " RED\tSH"])
+def test_prefix_is_normalized_like_the_names(index, typed):
+    assert [item_id for _, item_id, _ in index.suggest(typed)] == [2, 1]
+
+
+def test_name_starts_come_before_later_words(index):
+    assert index.suggest("shoes") == [("category", 1, "Shoes"), ("product", 1, "Red  Shoes"),
+                                      ("product", 3, "Blue Running Shoes")]
+
+
+def test_renamed_item_is_found_by_its_new_name_only(index):
+    index.add("product", 2, "Green Shirt")
+    assert [item_id for _, item_id, _ in index.suggest("red")] == [1]
+    assert index.suggest("green") == [("product", 2, "Green Shirt")]
+    index.remove("product", 2)
+    assert index.suggest("green") == []